@@ -0,0 +1,178 @@
+"""
+Benchmark de vazão com perguntas concorrentes: caminho síncrono (`SearchSession.ask`)
+contra o caminho assíncrono (`SearchSession.aask`).
+
+Os provedores são substituídos por modelos falsos com latência artificial
+(`--embed-ms` e `--llm-ms`), simulando as chamadas de rede aos provedores. Os caches
+(consultas, semântico e de respostas) são desativados para que toda pergunta pague
+embeddings, busca e geração.
+
+Caminhos medidos:
+
+- `sync`: perguntas em sequência com `ask`;
+- `threads`: `ask` em um `ThreadPoolExecutor` com `--concurrency` workers;
+- `async`: `aask` com `asyncio.gather`, limitado por um semáforo de `--concurrency`.
+
+Usa uma coleção própria (padrão: `bench_async_search`), populada com trechos sintéticos.
+Requer apenas `DATABASE_URL` apontando para um PostgreSQL com pgvector (e o driver psycopg 3).
+
+Uso:
+    python bench/bench_async_search.py --questions 200 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from config import Config  # noqa: E402
+from database import VectorStoreRepository  # noqa: E402
+from db_pool import EngineManager  # noqa: E402
+from embeddings_manager import EmbeddingsManager, get_embeddings  # noqa: E402
+from llm_manager import LLMManager  # noqa: E402
+from search import SearchSession  # noqa: E402
+
+
+class _SlowFakeEmbedding(DeterministicFakeEmbedding):
+    """Embeddings determinísticos com latência de rede simulada."""
+
+    delay: float = 0.0
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.delay)
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.delay)
+        return super().embed_query(text)
+
+
+def _slow_llm(delay: float) -> RunnableLambda:
+    """LLM falsa com latência simulada, com versões síncrona e assíncrona."""
+
+    def invoke(prompt: Any) -> AIMessage:
+        time.sleep(delay)
+        return AIMessage(content="Resposta sintética.")
+
+    async def ainvoke(prompt: Any) -> AIMessage:
+        await asyncio.sleep(delay)
+        return AIMessage(content="Resposta sintética.")
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def _seed(repo: VectorStoreRepository, rows: int) -> None:
+    texts = [f"Trecho sintético {i}: faturamento, clientes e resultados do trimestre {i % 12}." for i in range(rows)]
+    vectors = repo.embeddings.embed_documents(texts)
+    metadatas = [{"source": "bench/synthetic.pdf", "filename": "synthetic.pdf", "page": i // 4} for i in range(rows)]
+    ids = [f"bench-async-{i}" for i in range(rows)]
+    repo.bulk_add_embeddings(texts, vectors, metadatas, ids)
+
+
+def _run_sync(session: SearchSession, questions: list[str]) -> float:
+    t0 = time.perf_counter()
+    for question in questions:
+        session.ask(question)
+    return time.perf_counter() - t0
+
+
+def _run_threads(session: SearchSession, questions: list[str], concurrency: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(session.ask, questions))
+    return time.perf_counter() - t0
+
+
+async def _run_async(session: SearchSession, questions: list[str], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question: str) -> None:
+        async with semaphore:
+            await session.aask(question)
+
+    await session.aask(questions[0])  # abre o pool assíncrono fora da medição
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: vazão síncrona vs. assíncrona com perguntas concorrentes")
+    parser.add_argument("--questions", type=int, default=200, help="Perguntas por caminho (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Perguntas simultâneas (default: 16)")
+    parser.add_argument("--rows", type=int, default=2000, help="Trechos sintéticos na coleção (default: 2000)")
+    parser.add_argument("--dim", type=int, default=768, help="Dimensão dos vetores (default: 768)")
+    parser.add_argument("--embed-ms", type=float, default=50.0, help="Latência simulada dos embeddings (default: 50)")
+    parser.add_argument("--llm-ms", type=float, default=500.0, help="Latência simulada da LLM (default: 500)")
+    parser.add_argument("--top-k", type=int, default=Config.TOP_K)
+    parser.add_argument("--collection", default="bench_async_search", help="Coleção usada no benchmark")
+    parser.add_argument("--skip-sync", action="store_true", help="Não mede o caminho sequencial (lento)")
+    parser.add_argument("--output", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        print("❌ DATABASE_URL não configurada.")
+        sys.exit(1)
+
+    Config.PG_VECTOR_COLLECTION_NAME = args.collection
+    Config.QUERY_CACHE_SIZE = 0
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.LLM_CACHE_ENABLED = False
+    # O pool precisa comportar as perguntas simultâneas dos dois caminhos
+    Config.DB_POOL_SIZE = max(Config.DB_POOL_SIZE, args.concurrency)
+    EngineManager.reset()
+
+    embeddings = _SlowFakeEmbedding(size=args.dim)
+    EmbeddingsManager._instance = embeddings
+    LLMManager._instance = _slow_llm(args.llm_ms / 1000)
+
+    repo = VectorStoreRepository(get_embeddings())
+    _ = repo.vector_store  # cria a coleção
+    repo.clear()
+    _seed(repo, args.rows)
+
+    embeddings.delay = args.embed_ms / 1000
+    questions = [f"Qual o faturamento do trimestre {i % 12}?" for i in range(args.questions)]
+    session = SearchSession(top_k=args.top_k)
+    session.warm_up()
+
+    timings: dict[str, float] = {}
+    if not args.skip_sync:
+        timings["sync"] = _run_sync(session, questions)
+    timings["threads"] = _run_threads(session, questions, args.concurrency)
+    timings["async"] = asyncio.run(_run_async(session, questions, args.concurrency))
+
+    results: list[dict[str, Any]] = []
+    for name, elapsed in timings.items():
+        rate = len(questions) / elapsed if elapsed > 0 else 0.0
+        results.append({
+            "path": name,
+            "questions": len(questions),
+            "concurrency": 1 if name == "sync" else args.concurrency,
+            "seconds": elapsed,
+            "questions_per_second": rate,
+        })
+        print(f"⏱️  {name:<8} {elapsed:8.2f}s ({rate:6.1f} perguntas/s)")
+
+    repo.clear()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark do caminho de escrita em massa (COPY + merge) contra o caminho atual (PGVector).
+
+Gera vetores sintéticos (sem chamar nenhum provedor) e mede o tempo de gravação em
+`langchain_pg_embedding` pelos dois caminhos do `VectorStoreRepository`:
+
+- `add_embeddings`: INSERTs do ORM do PGVector, em lotes de `DEFAULT_BATCH_SIZE`;
+- `bulk_add_embeddings`: COPY para tabela temporária + um único `INSERT ... ON CONFLICT`
+  por bloco de `BULK_WRITE_SIZE`.
+
+Usa uma coleção própria (padrão: `bench_bulk_writer`), que é limpa antes de cada medição.
+Requer apenas `DATABASE_URL` apontando para um PostgreSQL com pgvector.
+
+Uso:
+    python bench/bench_bulk_writer.py --rows 10000 100000 1000000 --dim 768
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config  # noqa: E402
+from database import VectorStoreRepository  # noqa: E402
+from ingest import DEFAULT_BATCH_SIZE  # noqa: E402
+
+
+class _NoopEmbeddings:
+    """Embeddings de mentira: o benchmark grava vetores já prontos e nunca consulta o provedor."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("O benchmark não deve gerar embeddings.")
+
+    def embed_query(self, text: str) -> list[float]:
+        raise RuntimeError("O benchmark não deve gerar embeddings.")
+
+
+def _synthetic_rows(start: int, count: int, dim: int, rng: np.random.Generator) -> tuple[list, list, list, list]:
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"bench-{start + i}" for i in range(count)]
+    texts = [f"Trecho sintético {start + i} " + "lorem ipsum " * 60 for i in range(count)]
+    metadatas = [
+        {"source": "bench/synthetic.pdf", "filename": "synthetic.pdf", "page": (start + i) // 4, "chunk_index": start + i}
+        for i in range(count)
+    ]
+    return texts, vectors.tolist(), metadatas, ids
+
+
+def _run(
+    write: Callable[[list, list, list, list], Any],
+    rows: int,
+    dim: int,
+    block: int,
+    seed: int,
+) -> float:
+    rng = np.random.default_rng(seed)
+    elapsed = 0.0
+    for start in range(0, rows, block):
+        texts, vectors, metadatas, ids = _synthetic_rows(start, min(block, rows - start), dim, rng)
+        t0 = time.perf_counter()
+        write(texts, vectors, metadatas, ids)
+        elapsed += time.perf_counter() - t0
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: escrita em massa (COPY) vs. PGVector")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768, help="Dimensão dos vetores (default: 768)")
+    parser.add_argument("--collection", default="bench_bulk_writer", help="Coleção usada no benchmark")
+    parser.add_argument(
+        "--baseline-max-rows", type=int, default=100_000,
+        help="Não mede o caminho PGVector acima deste volume (muito lento)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        print("❌ DATABASE_URL não configurada.")
+        sys.exit(1)
+
+    Config.PG_VECTOR_COLLECTION_NAME = args.collection
+    repo = VectorStoreRepository(_NoopEmbeddings())
+    _ = repo.vector_store  # cria a coleção
+
+    def orm_write(texts: list, vectors: list, metadatas: list, ids: list) -> None:
+        for i in range(0, len(ids), DEFAULT_BATCH_SIZE):
+            repo.add_embeddings(
+                texts[i : i + DEFAULT_BATCH_SIZE],
+                vectors[i : i + DEFAULT_BATCH_SIZE],
+                metadatas[i : i + DEFAULT_BATCH_SIZE],
+                ids[i : i + DEFAULT_BATCH_SIZE],
+            )
+
+    results: list[dict[str, Any]] = []
+    for rows in args.rows:
+        for name, write in (("pgvector", orm_write), ("copy", repo.bulk_add_embeddings)):
+            if name == "pgvector" and rows > args.baseline_max_rows:
+                print(f"⏭️  {name:<8} {rows:>9} linhas: ignorado (acima de --baseline-max-rows)")
+                continue
+            repo.clear()
+            elapsed = _run(write, rows, args.dim, Config.BULK_WRITE_SIZE, args.seed)
+            rate = rows / elapsed if elapsed > 0 else 0.0
+            results.append({"path": name, "rows": rows, "dim": args.dim, "seconds": elapsed, "rows_per_second": rate})
+            print(f"⏱️  {name:<8} {rows:>9} linhas: {elapsed:8.2f}s ({rate:,.0f} linhas/s)")
+
+    repo.clear()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
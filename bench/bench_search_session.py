@@ -0,0 +1,143 @@
+"""
+Benchmark do custo fixo por pergunta: caminho antigo (tudo recriado a cada pergunta)
+contra `SearchSession` (criada uma vez e reutilizada).
+
+Os provedores são substituídos por modelos falsos do `langchain_core` (embeddings
+determinísticos e uma LLM de respostas fixas), de modo que o tempo medido é apenas o
+overhead local: criação de engine/pool, `PGVector`, leitura do template, construção do
+prompt e da chain, mais a busca no banco (igual nos dois caminhos).
+
+Usa uma coleção própria (padrão: `bench_search_session`), populada com trechos sintéticos.
+Requer apenas `DATABASE_URL` apontando para um PostgreSQL com pgvector.
+
+Uso:
+    python bench/bench_search_session.py --questions 50 --rows 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import sqlalchemy as sa  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+from langchain_core.output_parsers import StrOutputParser  # noqa: E402
+from langchain_core.prompts import PromptTemplate  # noqa: E402
+
+from config import Config  # noqa: E402
+from database import VectorStoreRepository  # noqa: E402
+from embeddings_manager import EmbeddingsManager, get_embeddings  # noqa: E402
+from llm_manager import LLMManager, get_llm  # noqa: E402
+from search import SearchSession, format_docs, load_prompt_template  # noqa: E402
+
+
+def _seed(repo: VectorStoreRepository, rows: int) -> None:
+    texts = [f"Trecho sintético {i}: faturamento, clientes e resultados do trimestre {i % 12}." for i in range(rows)]
+    vectors = repo.embeddings.embed_documents(texts)
+    metadatas = [{"source": "bench/synthetic.pdf", "filename": "synthetic.pdf", "page": i // 4} for i in range(rows)]
+    ids = [f"bench-session-{i}" for i in range(rows)]
+    repo.bulk_add_embeddings(texts, vectors, metadatas, ids)
+
+
+def legacy_ask(question: str, top_k: int, template_path: Optional[str]) -> str:
+    """Reproduz o caminho anterior: engine, PGVector, LLM, template e prompt recriados por pergunta."""
+    embeddings = get_embeddings()
+    repo = VectorStoreRepository(embeddings)
+    repo._engine = sa.create_engine(Config.DATABASE_URL)  # type: ignore[arg-type]
+    try:
+        docs = repo.vector_store.similarity_search(question, k=top_k)
+        llm = get_llm()
+        prompt = PromptTemplate(template=load_prompt_template(template_path), input_variables=["contexto", "pergunta"])
+        chain = prompt | llm | StrOutputParser()
+        return chain.invoke({"contexto": format_docs(docs), "pergunta": question})
+    finally:
+        repo.engine.dispose()
+
+
+def _measure(ask: Callable[[str], Any], questions: list[str]) -> list[float]:
+    timings: list[float] = []
+    for question in questions:
+        t0 = time.perf_counter()
+        ask(question)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def _summary(name: str, timings: list[float]) -> dict[str, Any]:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "path": name,
+        "questions": len(timings),
+        "mean_ms": statistics.mean(timings),
+        "median_ms": statistics.median(timings),
+        "p95_ms": p95,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: overhead por pergunta (legado vs. SearchSession)")
+    parser.add_argument("--questions", type=int, default=50, help="Perguntas por caminho (default: 50)")
+    parser.add_argument("--rows", type=int, default=2000, help="Trechos sintéticos na coleção (default: 2000)")
+    parser.add_argument("--dim", type=int, default=768, help="Dimensão dos vetores (default: 768)")
+    parser.add_argument("--top-k", type=int, default=Config.TOP_K)
+    parser.add_argument("--collection", default="bench_search_session", help="Coleção usada no benchmark")
+    parser.add_argument("--prompt-template", help="Template customizado (inclui a leitura do arquivo no custo)")
+    parser.add_argument("--output", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        print("❌ DATABASE_URL não configurada.")
+        sys.exit(1)
+
+    Config.PG_VECTOR_COLLECTION_NAME = args.collection
+    EmbeddingsManager._instance = DeterministicFakeEmbedding(size=args.dim)
+    LLMManager._instance = FakeListChatModel(responses=["Resposta sintética."])
+
+    repo = VectorStoreRepository(get_embeddings())
+    _ = repo.vector_store  # cria a coleção
+    repo.clear()
+    _seed(repo, args.rows)
+
+    questions = [f"Qual o faturamento do trimestre {i % 12}?" for i in range(args.questions)]
+
+    t0 = time.perf_counter()
+    session = SearchSession(top_k=args.top_k, template_path=args.prompt_template)
+    session.warm_up()
+    setup_ms = (time.perf_counter() - t0) * 1000
+
+    # Uma pergunta de aquecimento em cada caminho (imports preguiçosos, planos de consulta)
+    legacy_ask(questions[0], args.top_k, args.prompt_template)
+    session.ask(questions[0])
+
+    legacy = _summary("legacy", _measure(lambda q: legacy_ask(q, args.top_k, args.prompt_template), questions))
+    warm = _summary("session", _measure(session.ask, questions))
+    warm["setup_ms"] = setup_ms
+
+    for result in (legacy, warm):
+        print(
+            f"⏱️  {result['path']:<8} média {result['mean_ms']:7.2f}ms | "
+            f"mediana {result['median_ms']:7.2f}ms | p95 {result['p95_ms']:7.2f}ms"
+        )
+    saved = legacy["mean_ms"] - warm["mean_ms"]
+    print(f"⚙️  Criação da sessão (uma vez): {setup_ms:.2f}ms")
+    print(f"🚀 Overhead removido por pergunta: {saved:.2f}ms ({legacy['mean_ms'] / warm['mean_ms']:.1f}x)")
+
+    repo.clear()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([legacy, warm], f, indent=2)
+        print(f"💾 Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Suíte offline de benchmarks dos caminhos quentes de ingestão e de busca.
+
+Nenhum provedor é chamado: os embeddings vêm de um modelo falso determinístico e a
+LLM é falsa, ambos com latência artificial configurável (`--embed-ms`, `--llm-ms`;
+0 = mede apenas o custo local). Para cada tamanho de corpus (`--sizes`, em páginas)
+a suíte:
+
+1. gera um PDF sintético determinístico (mesmo conteúdo para a mesma semente);
+2. mede a ingestão com `ingest_pdf` (chunks/s, páginas/s e pico de memória RSS);
+3. mede a latência de `search_with_sources` (p50/p95/p99);
+4. mede o tempo das consultas ao banco (busca vetorial e textual do repositório).
+
+Os caches (embeddings, perguntas, respostas e LLM) são desativados para que toda
+operação pague o caminho completo. Os resultados são gravados em JSON e podem ser
+comparados com um baseline guardado (`--baseline`); variações piores que
+`--tolerance` são apontadas como regressão.
+
+Usa uma coleção própria (padrão: `bench_suite`), limpa antes de cada tamanho.
+Requer apenas `DATABASE_URL` apontando para um PostgreSQL com pgvector (ex: o
+container do `docker compose up -d`).
+
+Uso:
+    python bench/bench_suite.py --sizes 10 50 200 --output bench_results.json
+    python bench/bench_suite.py --baseline bench_results.json --fail-on-regression
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from config import Config  # noqa: E402
+from database import VectorStoreRepository  # noqa: E402
+from db_pool import EngineManager  # noqa: E402
+from embeddings_manager import EmbeddingsManager, get_embeddings  # noqa: E402
+from ingest import ingest_pdf  # noqa: E402
+from llm_manager import LLMManager  # noqa: E402
+from search import search_with_sources  # noqa: E402
+
+DEFAULT_SIZES = [10, 50, 200]
+
+# Métricas comparadas com o baseline: nome -> True se maior for melhor
+COMPARED_METRICS: dict[str, bool] = {
+    "chunks_per_second": True,
+    "rss_delta_mb": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+# Vocabulário do texto sintético (ASCII, para a extração não depender de encoding)
+_SUBJECTS = ["o faturamento", "o lucro liquido", "a receita recorrente", "o custo operacional", "a margem bruta",
+             "o numero de clientes", "o investimento em marketing", "a despesa com pessoal", "o ticket medio"]
+_UNITS = ["da filial Norte", "da filial Sul", "da unidade Centro", "da operacao digital", "do canal de parceiros"]
+_VERBS = ["cresceu", "caiu", "ficou estavel", "superou a meta", "ficou abaixo da meta"]
+
+
+class _FakeEmbedding(DeterministicFakeEmbedding):
+    """Embeddings determinísticos com latência de rede simulada (por chamada)."""
+
+    delay: float = 0.0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.delay)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.delay)
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.delay)
+        return super().embed_query(text)
+
+
+def _fake_llm(delay: float) -> RunnableLambda:
+    """LLM falsa com latência simulada, com versões síncrona e assíncrona."""
+
+    def invoke(prompt: Any) -> AIMessage:
+        time.sleep(delay)
+        return AIMessage(content="Resposta sintética.")
+
+    async def ainvoke(prompt: Any) -> AIMessage:
+        await asyncio.sleep(delay)
+        return AIMessage(content="Resposta sintética.")
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def _page_lines(page: int, rng: random.Random, lines: int = 48) -> list[str]:
+    text: list[str] = [f"Relatorio sintetico - pagina {page}"]
+    while len(text) < lines:
+        text.append(
+            f"No trimestre {rng.randint(1, 4)} de {rng.randint(2019, 2024)}, {rng.choice(_SUBJECTS)} "
+            f"{rng.choice(_UNITS)} {rng.choice(_VERBS)}, somando R$ {rng.randint(10, 990)} mil."
+        )
+    return text
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path: str, pages: int, seed: int = 42) -> None:
+    """
+    Grava um PDF de texto com `pages` páginas (gerador mínimo, sem dependências).
+
+    Args:
+        path: Arquivo de saída.
+        pages: Número de páginas.
+        seed: Semente do texto; a mesma semente gera o mesmo PDF.
+    """
+    rng = random.Random(seed)
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # /Pages, preenchido depois de conhecer os IDs das páginas
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids: list[str] = []
+    for page in range(1, pages + 1):
+        body = " T* ".join(f"({_pdf_string(line)}) Tj" for line in _page_lines(page, rng))
+        stream = f"BT /F1 9 Tf 14 TL 40 800 Td {body} ET".encode("latin-1")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            + f"/Contents {len(objects) + 2} 0 R >>".encode("ascii")
+        )
+        kids.append(f"{len(objects)} 0 R")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("ascii") + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("ascii")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets: list[int] = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("ascii")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def _questions(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"Qual foi {rng.choice(_SUBJECTS)} {rng.choice(_UNITS)} no trimestre {rng.randint(1, 4)}?"
+        for _ in range(count)
+    ]
+
+
+def _rss_mb() -> float:
+    """RSS atual do processo em MB (Linux via /proc; em outros sistemas, o pico via `resource`)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class _PeakMemory:
+    """Amostra o RSS em uma thread durante o bloco e guarda o pico (sem o custo do tracemalloc)."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def __enter__(self) -> "_PeakMemory":
+        self.start_mb = self.peak_mb = _rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+
+
+def _latency_stats(timings: list[float]) -> dict[str, float]:
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        "samples": len(timings),
+        "mean_ms": float(np.mean(timings)),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def _measure(run: Callable[[str], Any], questions: list[str]) -> dict[str, float]:
+    run(questions[0])  # aquecimento (imports preguiçosos, planos de consulta)
+    timings: list[float] = []
+    for question in questions:
+        t0 = time.perf_counter()
+        run(question)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return _latency_stats(timings)
+
+
+def _bench_ingest(pdf_path: str, pages: int, repo: VectorStoreRepository) -> dict[str, Any]:
+    with _PeakMemory() as memory:
+        t0 = time.perf_counter()
+        if not ingest_pdf(pdf_path, quiet=True, use_cache=False):
+            raise RuntimeError(f"Falha na ingestão de {pdf_path}")
+        elapsed = time.perf_counter() - t0
+    chunks = repo.count()
+    return {
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": elapsed,
+        "chunks_per_second": chunks / elapsed if elapsed > 0 else 0.0,
+        "pages_per_second": pages / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": memory.peak_mb,
+        "rss_delta_mb": memory.peak_mb - memory.start_mb,
+    }
+
+
+def _bench_db(repo: VectorStoreRepository, embeddings: _FakeEmbedding, questions: list[str], top_k: int) -> dict[str, Any]:
+    vectors = {question: DeterministicFakeEmbedding.embed_query(embeddings, question) for question in questions}
+    return {
+        "vector": _measure(lambda q: repo.similarity_search_by_vector_with_score(vectors[q], k=top_k), questions),
+        "lexical": _measure(lambda q: repo.lexical_search_with_score(q, top_k), questions),
+    }
+
+
+def run_size(
+    pages: int,
+    workdir: str,
+    repo: VectorStoreRepository,
+    embeddings: _FakeEmbedding,
+    questions: list[str],
+    top_k: int,
+    seed: int,
+) -> dict[str, Any]:
+    """Gera o corpus de `pages` páginas, ingere e mede busca e consultas ao banco."""
+    pdf_path = os.path.join(workdir, f"synthetic_{pages:05d}.pdf")
+    write_synthetic_pdf(pdf_path, pages, seed)
+    repo.clear()
+
+    ingest = _bench_ingest(pdf_path, pages, repo)
+    search = _measure(lambda q: search_with_sources(q, top_k=top_k), questions)
+    db = _bench_db(repo, embeddings, questions, top_k)
+    return {"ingest": ingest, "search": search, "db": db}
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat: dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif key in COMPARED_METRICS and isinstance(value, (int, float)):
+            flat[path] = float(value)
+    return flat
+
+
+def compare_with_baseline(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+) -> list[dict[str, Any]]:
+    """
+    Compara as métricas de `COMPARED_METRICS` dos dois resultados.
+
+    Args:
+        current: Resultado desta execução.
+        baseline: Resultado guardado.
+        tolerance: Piora relativa aceita (ex: 0.2 = 20%).
+
+    Returns:
+        Uma entrada por métrica presente nos dois resultados, com `change` (variação
+        relativa, positiva = melhor) e `regression`.
+    """
+    now = _flatten(current["corpora"])
+    before = _flatten(baseline.get("corpora", {}))
+    comparison: list[dict[str, Any]] = []
+    for path in sorted(now.keys() & before.keys()):
+        if before[path] == 0:
+            continue
+        change = (now[path] - before[path]) / abs(before[path])
+        if not COMPARED_METRICS[path.rsplit(".", 1)[-1]]:
+            change = -change
+        comparison.append({
+            "metric": path,
+            "baseline": before[path],
+            "current": now[path],
+            "change": change,
+            "regression": change < -tolerance,
+        })
+    return comparison
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline: ingestão, busca e consultas ao banco")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"Páginas de cada corpus (default: {DEFAULT_SIZES})")
+    parser.add_argument("--questions", type=int, default=100, help="Perguntas medidas por corpus (default: 100)")
+    parser.add_argument("--dim", type=int, default=768, help="Dimensão dos vetores (default: 768)")
+    parser.add_argument("--embed-ms", type=float, default=0.0, help="Latência simulada por chamada de embeddings (default: 0)")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Latência simulada da LLM (default: 0)")
+    parser.add_argument("--top-k", type=int, default=Config.TOP_K)
+    parser.add_argument("--seed", type=int, default=42, help="Semente do texto e das perguntas (default: 42)")
+    parser.add_argument("--collection", default="bench_suite", help="Coleção usada no benchmark")
+    parser.add_argument("--workdir", help="Diretório dos PDFs sintéticos (default: temporário)")
+    parser.add_argument("--output", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--baseline", help="Resultados anteriores (JSON) para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Piora relativa aceita na comparação (default: 0.2)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressão")
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        print("❌ DATABASE_URL não configurada.")
+        sys.exit(1)
+
+    baseline: Optional[dict[str, Any]] = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    Config.VECTOR_BACKEND = "pgvector"
+    Config.PG_VECTOR_COLLECTION_NAME = args.collection
+    # ingest_pdf valida a configuração; os provedores falsos não usam a chave
+    if not (Config.GOOGLE_API_KEY or Config.OPENAI_API_KEY):
+        Config.GOOGLE_API_KEY = "bench-offline"
+    Config.EMBEDDING_CACHE_ENABLED = False
+    Config.QUERY_CACHE_SIZE = 0
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.LLM_CACHE_ENABLED = False
+    EngineManager.reset()
+
+    embeddings = _FakeEmbedding(size=args.dim)
+    embeddings.delay = args.embed_ms / 1000
+    EmbeddingsManager._instance = embeddings
+    LLMManager._instance = _fake_llm(args.llm_ms / 1000)
+
+    repo = VectorStoreRepository(get_embeddings())
+    _ = repo.vector_store  # cria a coleção
+    questions = _questions(args.questions, args.seed)
+
+    settings = {key: getattr(args, key) for key in ("questions", "dim", "embed_ms", "llm_ms", "top_k", "seed")}
+    settings.update({
+        "chunk_size": Config.CHUNK_SIZE,
+        "chunk_overlap": Config.CHUNK_OVERLAP,
+        "hybrid": Config.HYBRID_SEARCH,
+        "diversify": Config.DIVERSIFY_RESULTS,
+    })
+    results: dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+        "corpora": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for pages in args.sizes:
+            print(f"📄 Corpus de {pages} páginas...")
+            size = run_size(pages, workdir, repo, embeddings, questions, args.top_k, args.seed)
+            results["corpora"][str(pages)] = size
+            ingest, search, db = size["ingest"], size["search"], size["db"]
+            print(f"   📥 Ingestão: {ingest['chunks']} chunks em {ingest['seconds']:.2f}s "
+                  f"({ingest['chunks_per_second']:.1f} chunks/s) | pico RSS +{ingest['rss_delta_mb']:.1f}MB")
+            print(f"   🔍 search_with_sources: p50 {search['p50_ms']:.2f}ms | p95 {search['p95_ms']:.2f}ms | p99 {search['p99_ms']:.2f}ms")
+            for name, stats in db.items():
+                print(f"   🗄️  Consulta {name:<8} p50 {stats['p50_ms']:.2f}ms | p95 {stats['p95_ms']:.2f}ms | p99 {stats['p99_ms']:.2f}ms")
+
+    repo.clear()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados gravados em {args.output}")
+
+    if baseline is None:
+        return
+    if baseline.get("settings") != settings:
+        print("⚠️  Configuração diferente da do baseline: a comparação pode não ser equivalente.")
+    comparison = compare_with_baseline(results, baseline, args.tolerance)
+    regressions = [entry for entry in comparison if entry["regression"]]
+    print(f"📊 Comparação com {args.baseline} (tolerância {args.tolerance:.0%}):")
+    for entry in comparison:
+        marker = "🔴" if entry["regression"] else ("🟢" if entry["change"] > args.tolerance else "⚪")
+        print(f"   {marker} {entry['metric']:<40} {entry['baseline']:10.2f} -> {entry['current']:10.2f} ({entry['change']:+.1%})")
+    if regressions:
+        print(f"❌ {len(regressions)} regressões acima da tolerância.")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("✅ Nenhuma regressão acima da tolerância.")
+
+
+if __name__ == "__main__":
+    main()
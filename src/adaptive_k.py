@@ -0,0 +1,111 @@
+"""
+Módulo de Top-k Adaptativo
+
+Com `TOP_K` fixo, perguntas fáceis (um ou dois trechos muito similares e o resto
+irrelevante) levam trechos inúteis ao prompt, e perguntas amplas (muitos trechos
+com similaridade parecida) ficam cortadas. No modo adaptativo (`ADAPTIVE_TOP_K`)
+a busca traz `ADAPTIVE_MAX_K` candidatos e o `k` de cada pergunta é escolhido pela
+curva de similaridades, entre `ADAPTIVE_MIN_K` e `ADAPTIVE_MAX_K`:
+
+- `knee`: ponto de "cotovelo" da curva (Kneedle), o candidato mais abaixo da reta
+  entre o primeiro e o último; os trechos antes dele são mantidos. Uma queda no
+  último candidato não forma cotovelo (o ponto final está sempre sobre a reta),
+  então a queda destacada do método `gap` também é considerada e vale o menor corte;
+- `gap`: maior queda entre candidatos consecutivos, se ela se destacar das demais
+  (pelo menos `GAP_FACTOR` vezes a queda média); caso contrário, todos são mantidos.
+
+A curva sem cotovelo nem queda destacada (similaridades parecidas) mantém
+`ADAPTIVE_MAX_K` trechos.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, TypedDict
+
+import numpy as np
+
+from config import Config
+
+ADAPTIVE_K_METHODS = ("knee", "gap")
+
+# Quantas vezes a maior queda precisa superar a queda média para cortar a lista (método `gap`)
+GAP_FACTOR = 2.0
+
+
+class AdaptiveKStats(TypedDict):
+    k: int
+    candidates: int
+    method: str
+
+
+def choose_k(
+    similarities: Sequence[float],
+    min_k: Optional[int] = None,
+    max_k: Optional[int] = None,
+    method: Optional[str] = None,
+) -> int:
+    """
+    Escolhe quantos candidatos manter a partir da curva de similaridades.
+
+    Args:
+        similarities: Similaridades dos candidatos com a pergunta, em ordem decrescente.
+        min_k: Mínimo de trechos mantidos (None usa `Config.ADAPTIVE_MIN_K`).
+        max_k: Máximo de trechos mantidos (None usa `Config.ADAPTIVE_MAX_K`).
+        method: 'knee' ou 'gap' (None usa `Config.ADAPTIVE_K_METHOD`).
+
+    Returns:
+        Número de candidatos a manter, entre `min_k` e `max_k` (ou todos, se houver menos que `min_k`).
+
+    Raises:
+        ValueError: Se o método for desconhecido.
+
+    Examples:
+        >>> choose_k([0.91, 0.89, 0.88, 0.52, 0.50, 0.49, 0.47], min_k=1, max_k=7, method="knee")
+        3
+        >>> choose_k([0.91, 0.89, 0.88, 0.52, 0.50, 0.49, 0.47], min_k=1, max_k=7, method="gap")
+        3
+        >>> choose_k([0.80, 0.79, 0.78, 0.77, 0.76], min_k=1, max_k=5, method="gap")
+        5
+        >>> choose_k([0.90, 0.89, 0.88, 0.87, 0.30], min_k=1, max_k=5, method="knee")
+        4
+    """
+    lower = max(1, Config.ADAPTIVE_MIN_K if min_k is None else min_k)
+    upper = max(lower, Config.ADAPTIVE_MAX_K if max_k is None else max_k)
+    method = method or Config.ADAPTIVE_K_METHOD
+    if method not in ADAPTIVE_K_METHODS:
+        raise ValueError(f"Método de top-k adaptativo inválido: '{method}' (use {', '.join(ADAPTIVE_K_METHODS)})")
+
+    scores = np.asarray(similarities[:upper], dtype=np.float64)
+    n = scores.shape[0]
+    if n <= lower:
+        return n
+
+    gap_k = _gap_cut(scores, lower)
+    if method == "gap":
+        return n if gap_k is None else gap_k
+
+    knee_k = _knee_cut(scores, lower)
+    cuts = [cut for cut in (knee_k, gap_k) if cut is not None]
+    return min(cuts) if cuts else n
+
+
+def _knee_cut(scores: np.ndarray, lower: int) -> Optional[int]:
+    """Candidatos mantidos até o cotovelo da curva, ou None se ela não tiver cotovelo."""
+    n = scores.shape[0]
+    # Distância de cada ponto até a reta entre o primeiro e o último candidato
+    chord = np.linspace(scores[0], scores[-1], num=n)
+    depth = chord - scores
+    # O ponto mais abaixo da reta é o primeiro depois da queda: mantém os anteriores
+    knee = int(np.argmax(depth[lower:])) + lower
+    return knee if depth[knee] > 0 else None
+
+
+def _gap_cut(scores: np.ndarray, lower: int) -> Optional[int]:
+    """Candidatos mantidos até a maior queda, ou None se ela não se destacar das demais."""
+    drops = scores[:-1] - scores[1:]
+    mean_drop = float(drops.mean())
+    # Corte depois da posição i mantém i + 1 candidatos (pelo menos `lower`)
+    cut = int(np.argmax(drops[lower - 1:])) + lower - 1
+    if mean_drop <= 0 or drops[cut] < GAP_FACTOR * mean_drop:
+        return None
+    return cut + 1
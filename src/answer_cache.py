@@ -0,0 +1,165 @@
+"""
+Módulo de Cache Semântico de Respostas
+
+Guarda (embedding da pergunta, resposta, fontes) e reaproveita a resposta quando uma
+nova pergunta tem embedding suficientemente próximo (similaridade de cosseno acima de
+um limiar), evitando nova recuperação e nova geração pela LLM.
+
+As entradas são válidas apenas para uma versão do corpus (`VectorStoreRepository.corpus_version`):
+qualquer ingestão, remoção de fonte ou limpeza da coleção invalida o cache inteiro.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional, Sequence, TypedDict
+
+import numpy as np
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CachedAnswer(TypedDict):
+    answer: str
+    sources: list[Any]
+    similarity: float
+
+
+class AnswerCacheStats(TypedDict):
+    hits: int
+    misses: int
+    size: int
+    corpus_version: Optional[int]
+
+
+class SemanticAnswerCache:
+    """
+    Cache em memória de respostas indexado pelo embedding da pergunta.
+
+    A busca é uma multiplicação matriz × vetor sobre os embeddings normalizados,
+    barata mesmo com centenas de entradas. Ao atingir `max_size`, as entradas mais
+    antigas são descartadas primeiro.
+    """
+
+    def __init__(self, threshold: float, max_size: int) -> None:
+        """
+        Args:
+            threshold: Similaridade de cosseno mínima (0 a 1) para reaproveitar uma resposta.
+            max_size: Número máximo de respostas guardadas.
+        """
+        self.threshold: float = threshold
+        self.max_size: int = max(1, max_size)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: list[tuple[int, str, str, list[Any]]] = []
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else array
+
+    def _sync_version(self, corpus_version: int) -> None:
+        if corpus_version != self._version:
+            if self._entries:
+                logger.info(f"Corpus alterado (versão {self._version} → {corpus_version}); cache de respostas invalidado.")
+            self._vectors = None
+            self._entries = []
+            self._version = corpus_version
+
+    def lookup(
+        self,
+        vector: Sequence[float],
+        corpus_version: int,
+        top_k: int,
+        scope: str = "",
+    ) -> Optional[CachedAnswer]:
+        """
+        Procura uma resposta para uma pergunta semanticamente equivalente.
+
+        Args:
+            vector: Embedding da nova pergunta.
+            corpus_version: Versão atual do corpus.
+            top_k: Número de documentos usados na recuperação (só reaproveita respostas com o mesmo `top_k`).
+            scope: Restrição da recuperação (ex: `filters.filter_scope`); só reaproveita respostas do mesmo escopo.
+
+        Returns:
+            `CachedAnswer` da entrada mais similar acima do limiar, ou None.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            self._sync_version(corpus_version)
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors @ query
+            for idx in np.argsort(similarities)[::-1]:
+                similarity = float(similarities[idx])
+                if similarity < self.threshold:
+                    break
+                entry_top_k, entry_scope, answer, sources = self._entries[idx]
+                if entry_top_k == top_k and entry_scope == scope:
+                    self.hits += 1
+                    return {"answer": answer, "sources": list(sources), "similarity": similarity}
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        vector: Sequence[float],
+        corpus_version: int,
+        top_k: int,
+        answer: str,
+        sources: list[Any],
+        scope: str = "",
+    ) -> None:
+        """
+        Guarda a resposta de uma pergunta.
+
+        Args:
+            vector: Embedding da pergunta.
+            corpus_version: Versão do corpus usada para gerar a resposta.
+            top_k: Número de documentos usados na recuperação.
+            answer: Resposta gerada.
+            sources: Fontes da resposta.
+            scope: Restrição da recuperação usada (ver `lookup`).
+        """
+        row = self._normalize(vector)[np.newaxis, :]
+        with self._lock:
+            self._sync_version(corpus_version)
+            if self._vectors is not None and self._vectors.shape[1] != row.shape[1]:
+                # Modelo de embeddings trocado: dimensões incompatíveis
+                self._vectors = None
+                self._entries = []
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._entries.append((top_k, scope, answer, list(sources)))
+
+            overflow = len(self._entries) - self.max_size
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                self._entries = self._entries[overflow:]
+
+    def clear(self) -> None:
+        """Remove todas as respostas."""
+        with self._lock:
+            self._vectors = None
+            self._entries = []
+
+    def stats(self) -> AnswerCacheStats:
+        """Retorna os contadores do cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "corpus_version": self._version,
+        }
@@ -0,0 +1,363 @@
+"""
+Módulo de Perguntas em Lote
+
+Executa um arquivo de perguntas (uma por linha, ex: conjuntos de regressão) sobre
+uma `SearchSession`, sem passar pelo chat interativo:
+
+- embeddings das perguntas calculados por bloco (`BATCH_EMBED_SIZE`), sempre com o tipo de tarefa de consulta;
+- busca e geração de várias perguntas em paralelo (`ThreadPoolExecutor`);
+- um registro JSON por pergunta no arquivo de saída (JSONL), com resposta, fontes
+  e o tempo de cada etapa.
+
+A execução pode ser retomada: perguntas já respondidas no arquivo de saída são
+puladas, e registros incompletos (ex: última linha truncada por uma queda) ou com
+erro são descartados e refeitos. Respostas de fallback (LLM indisponível) contam
+como erro.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional, Sequence, TypedDict
+
+from config import Config
+from embedding_cache import embed_queries_batch
+from filters import MetadataFilter, parse_inline_filters
+from logger import get_logger
+from search import SearchSession, SourceSpec, StageTimings
+
+logger = get_logger(__name__)
+
+DISPLAY_WIDTH = 70
+
+
+class BatchRecord(TypedDict):
+    index: int
+    question: str
+    answer: str
+    sources: list[SourceSpec]
+    cached: bool
+    llm_cached: bool
+    no_information: bool
+    timings: StageTimings
+    total_ms: float
+    error: Optional[str]
+
+
+class BatchSummary(TypedDict):
+    questions: int
+    resumed: int
+    answered: int
+    failed: int
+    no_information: int
+    elapsed: float
+    questions_per_second: float
+
+
+def load_questions(path: str) -> list[str]:
+    """
+    Lê o arquivo de perguntas: uma por linha, ignorando linhas vazias e comentários (#).
+
+    Args:
+        path: Caminho do arquivo (UTF-8).
+
+    Returns:
+        Perguntas na ordem do arquivo; a posição na lista é o `index` do registro de saída.
+
+    Raises:
+        FileNotFoundError: Se o arquivo não existir.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Arquivo de perguntas não encontrado: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_completed(output_path: str, questions: Sequence[str]) -> set[int]:
+    """
+    Identifica as perguntas já respondidas em uma execução anterior.
+
+    Um registro conta como concluído se for JSON válido, sem erro, e seu `index`
+    apontar para a mesma pergunta no arquivo atual. Se houver linhas descartadas
+    (truncadas, com erro ou de outro arquivo de perguntas), o arquivo é regravado
+    só com os registros válidos, para que as novas linhas sejam anexadas a um JSONL íntegro.
+
+    Args:
+        output_path: Arquivo JSONL de saída.
+        questions: Perguntas do arquivo atual.
+
+    Returns:
+        Conjunto de `index` já concluídos.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    completed: set[int] = set()
+    kept: list[str] = []
+    discarded = 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                index = int(record["index"])
+                valid = (
+                    line.endswith("\n")
+                    and 0 <= index < len(questions)
+                    and record.get("question") == questions[index]
+                    and not record.get("error")
+                    and index not in completed
+                )
+            except (ValueError, KeyError, TypeError):
+                valid = False
+
+            if valid:
+                completed.add(index)
+                kept.append(line)
+            elif line.strip():
+                discarded += 1
+
+    if discarded:
+        logger.warning(f"Descartando {discarded} registro(s) incompleto(s) ou com erro em {output_path}")
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, output_path)
+
+    return completed
+
+
+def embed_questions(embeddings: Any, questions: list[str]) -> list[list[float]]:
+    """
+    Vetoriza várias perguntas de uma vez, com o tipo de tarefa de consulta.
+
+    Com o cache de perguntas ativo (`CachedQueryEmbeddings`), os níveis em memória e
+    persistente são consultados antes; as demais vão ao provedor via
+    `embedding_cache.embed_queries_batch`.
+
+    Args:
+        embeddings: Modelo de embeddings da sessão.
+        questions: Perguntas do bloco.
+
+    Returns:
+        Vetores na mesma ordem das perguntas.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(questions)
+    return embed_queries_batch(embeddings, questions)
+
+
+def _answer(
+    session: SearchSession,
+    index: int,
+    question: str,
+    embedding: Optional[list[float]],
+    embed_ms: float,
+    top_k: Optional[int],
+    ef_search: Optional[int],
+    probes: Optional[int],
+    metadata_filter: Optional[MetadataFilter],
+) -> BatchRecord:
+    start = time.perf_counter()
+    try:
+        result = session.ask(
+            question, top_k=top_k, ef_search=ef_search, probes=probes,
+            embedding=embedding, metadata_filter=metadata_filter,
+        )
+        error = result["answer"] if result.get("error") else None
+        if result.get("fallback"):
+            # LLM indisponível: a resposta são só os trechos recuperados, refeita no --resume
+            error = "Falha na LLM: resposta de fallback com os trechos recuperados"
+    except Exception as e:
+        logger.error(f"Erro inesperado na pergunta #{index}: {e}")
+        result = {"answer": "", "sources": []}
+        error = str(e)
+
+    timings: StageTimings = {"embed_ms": 0.0, "retrieve_ms": 0.0, "generate_ms": 0.0}
+    timings.update(result.get("timings") or {})
+    if embedding is not None:
+        # Parcela da chamada em lote atribuída a esta pergunta
+        timings["embed_ms"] = embed_ms
+    return {
+        "index": index,
+        "question": question,
+        "answer": result["answer"],
+        "sources": result["sources"],
+        "cached": bool(result.get("cached")),
+        "llm_cached": bool(result.get("llm_cached")),
+        "no_information": bool(result.get("no_information")),
+        "timings": timings,
+        "total_ms": embed_ms + (time.perf_counter() - start) * 1000,
+        "error": error,
+    }
+
+
+def run_batch(
+    session: SearchSession,
+    questions_path: str,
+    output_path: str,
+    concurrency: Optional[int] = None,
+    embed_batch_size: Optional[int] = None,
+    top_k: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    quiet: bool = False,
+    metadata_filter: Optional[MetadataFilter] = None,
+) -> BatchSummary:
+    """
+    Responde todas as perguntas de um arquivo e grava um registro JSONL por pergunta.
+
+    As perguntas pendentes são vetorizadas em blocos de `embed_batch_size`; cada bloco
+    é entregue a `concurrency` threads que fazem busca + geração pela mesma sessão,
+    enquanto o bloco seguinte é vetorizado. Os registros são gravados (com flush) à
+    medida que ficam prontos, fora de ordem; use o campo `index` para ordenar.
+
+    Args:
+        session: Sessão de busca já criada (compartilhada pelas threads).
+        questions_path: Arquivo com uma pergunta por linha.
+        output_path: Arquivo JSONL de saída (anexado; perguntas já presentes são puladas).
+        concurrency: Perguntas simultâneas (None usa `Config.BATCH_CONCURRENCY`).
+        embed_batch_size: Perguntas vetorizadas por bloco (None usa `Config.BATCH_EMBED_SIZE`).
+        top_k: Número de documentos a recuperar (None usa o da sessão).
+        ef_search: `hnsw.ef_search` das consultas (opcional).
+        probes: `ivfflat.probes` das consultas (opcional).
+        quiet: Se True, desabilita a barra de progresso e o resumo.
+        metadata_filter: Filtro de fontes/páginas aplicado a todas as perguntas;
+            `in:`/`pag:` escritos em uma pergunta têm precedência para ela.
+
+    Returns:
+        `BatchSummary` da execução.
+
+    Raises:
+        FileNotFoundError: Se o arquivo de perguntas não existir.
+        ValueError: Se `concurrency` ou `embed_batch_size` forem menores que 1.
+
+    Examples:
+        >>> from batch import run_batch
+        >>> from search import create_search_session
+        >>> summary = run_batch(create_search_session(), "perguntas.txt", "resultados.jsonl", concurrency=8)
+        >>> summary["failed"]
+        0
+    """
+    workers = concurrency if concurrency is not None else Config.BATCH_CONCURRENCY
+    block = embed_batch_size if embed_batch_size is not None else Config.BATCH_EMBED_SIZE
+    if workers < 1:
+        raise ValueError("A concorrência deve ser pelo menos 1.")
+    if block < 1:
+        raise ValueError("O tamanho do bloco de embeddings deve ser pelo menos 1.")
+
+    questions = load_questions(questions_path)
+    completed = load_completed(output_path, questions)
+    pending = [i for i in range(len(questions)) if i not in completed]
+    logger.info(f"{len(questions)} pergunta(s), {len(completed)} já respondida(s), {len(pending)} pendente(s)")
+
+    from tqdm import tqdm
+
+    answered = 0
+    failed = 0
+    no_information = 0
+    stage_totals = {"embed_ms": 0.0, "retrieve_ms": 0.0, "generate_ms": 0.0}
+    start_time = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool, \
+            tqdm(total=len(pending), desc="Perguntas", unit="pergunta", disable=quiet) as progress:
+
+        def write(done: set[Future[BatchRecord]]) -> None:
+            nonlocal answered, failed, no_information
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if record["error"]:
+                    failed += 1
+                else:
+                    answered += 1
+                    no_information += int(record["no_information"])
+                    for stage, value in record["timings"].items():
+                        stage_totals[stage] += value
+                progress.update(1)
+
+        in_flight: set[Future[BatchRecord]] = set()
+        for offset in range(0, len(pending), block):
+            indices = pending[offset:offset + block]
+            t0 = time.perf_counter()
+            try:
+                # Os filtros embutidos (in:/pag:) não fazem parte do texto vetorizado
+                texts = [parse_inline_filters(questions[i])[0] for i in indices]
+                vectors: list[Optional[list[float]]] = list(embed_questions(session.embeddings, texts))
+            except Exception as e:
+                # Sem o lote, cada pergunta gera o próprio embedding (e reporta o próprio erro)
+                logger.warning(f"Falha nos embeddings em lote: {e}. Vetorizando pergunta a pergunta.")
+                vectors = [None] * len(indices)
+            embed_ms = (time.perf_counter() - t0) * 1000 / len(indices)
+
+            for index, vector in zip(indices, vectors):
+                in_flight.add(pool.submit(
+                    _answer, session, index, questions[index], vector,
+                    embed_ms if vector is not None else 0.0, top_k, ef_search, probes, metadata_filter,
+                ))
+
+            # Limita o quanto os embeddings avançam à frente da geração
+            while len(in_flight) > workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                write(done)
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            write(done)
+
+    elapsed = time.perf_counter() - start_time
+    summary: BatchSummary = {
+        "questions": len(questions),
+        "resumed": len(completed),
+        "answered": answered,
+        "failed": failed,
+        "no_information": no_information,
+        "elapsed": elapsed,
+        "questions_per_second": (answered + failed) / elapsed if elapsed > 0 else 0.0,
+    }
+
+    if not quiet:
+        display_batch_summary(summary, stage_totals, workers, output_path)
+
+    return summary
+
+
+def display_batch_summary(
+    summary: BatchSummary,
+    stage_totals: dict[str, float],
+    workers: int,
+    output_path: str,
+) -> None:
+    """
+    Exibe o resultado de uma execução em lote e o tempo médio de cada etapa.
+
+    Args:
+        summary: Resumo retornado por `run_batch`.
+        stage_totals: Soma dos tempos por etapa (ms) das perguntas respondidas.
+        workers: Perguntas simultâneas utilizadas.
+        output_path: Arquivo JSONL de saída.
+    """
+    answered = summary["answered"]
+
+    print("\n" + "=" * DISPLAY_WIDTH)
+    print("📊 ESTATÍSTICAS DAS PERGUNTAS EM LOTE")
+    print("=" * DISPLAY_WIDTH)
+    print(f"❓ Perguntas:          {summary['questions']} ({summary['resumed']} já respondidas antes)")
+    print(f"✅ Respondidas:        {answered}")
+    print(f"❌ Com erro:           {summary['failed']} (refeitas na próxima execução)")
+    if summary["no_information"]:
+        print(f"🚫 Sem informações:    {summary['no_information']} (respondidas sem chamar a LLM)")
+    if answered:
+        print(f"🧮 Embeddings (média): {stage_totals['embed_ms'] / answered:.1f}ms")
+        print(f"🔍 Busca (média):      {stage_totals['retrieve_ms'] / answered:.1f}ms")
+        print(f"🤖 Geração (média):    {stage_totals['generate_ms'] / answered:.1f}ms")
+    print(f"🧵 Paralelismo:        {workers} pergunta(s) simultânea(s)")
+    print(f"⏱️  Tempo Total:        {summary['elapsed']:.2f}s")
+    print(f"⚡ Throughput:         {summary['questions_per_second']:.2f} perguntas/s")
+    print(f"💾 Resultados:         {output_path}")
+    print("=" * DISPLAY_WIDTH + "\n")
@@ -11,7 +11,8 @@ import logging
 from typing import Any, Optional
 
 from config import Config
-from search import search_prompt
+from search import SearchSession, create_search_session
+from filters import MetadataFilter, build_filter
 from logger import get_logger, set_global_log_level
 
 # Importação dos novos módulos CLI
@@ -23,6 +24,7 @@ from cli.validators import (
     is_clear_command,
     is_stats_command,
     is_remove_command,
+    is_index_command,
     is_history_command,
     parse_repeat_command
 )
@@ -32,6 +34,7 @@ from cli.commands import (
     handle_clear_command,
     handle_stats_command,
     handle_remove_command,
+    handle_index_command,
     process_question
 )
 from cli.history import ChatHistory
@@ -40,14 +43,20 @@ logger = get_logger(__name__, level=logging.WARNING)
 
 
 def chat_loop(
-    chain: Any,
+    session: SearchSession,
     quiet: bool = False,
     verbose: bool = False,
     top_k: Optional[int] = None,
-    temperature: Optional[float] = None,
     chunk_size: Optional[int] = None,
     chunk_overlap: Optional[int] = None,
     search_timeout: Optional[int] = None,
+    ingest_concurrency: Optional[int] = None,
+    stream_ingest: Optional[bool] = None,
+    incremental_ingest: Optional[bool] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    stream: Optional[bool] = None,
+    metadata_filter: Optional[MetadataFilter] = None,
 ) -> None:
     """
     Loop principal do chat interativo.
@@ -104,7 +113,15 @@ def chat_loop(
                 history_manager.display()
             
             elif is_add_command(user_input):
-                handle_add_command(user_input, quiet=quiet, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+                handle_add_command(
+                    user_input,
+                    quiet=quiet,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    concurrency=ingest_concurrency,
+                    streaming=stream_ingest,
+                    incremental=incremental_ingest,
+                )
             
             elif is_clear_command(user_input):
                 handle_clear_command()
@@ -115,6 +132,9 @@ def chat_loop(
             elif is_remove_command(user_input):
                 handle_remove_command(user_input)
             
+            elif is_index_command(user_input):
+                handle_index_command(user_input)
+            
             else:
                 # Verificar se há documentos antes de perguntar
                 num_chunks, _ = check_database_status()
@@ -125,7 +145,7 @@ def chat_loop(
                     continue
                 
                 # Processar como pergunta normal
-                process_question(chain, user_input, quiet=quiet, verbose=verbose, top_k=top_k, temperature=temperature, search_timeout=search_timeout)
+                process_question(session, user_input, quiet=quiet, verbose=verbose, top_k=top_k, search_timeout=search_timeout, ef_search=ef_search, probes=probes, stream=stream, metadata_filter=metadata_filter)
 
     
     except KeyboardInterrupt:
@@ -172,8 +192,24 @@ def main() -> None:
     parser.add_argument('--temperature', type=float, help='Temperatura para geração (default: conforme Config)')
     parser.add_argument('--chunk-size', type=int, help=f'Tamanho do chunk para novas ingestões (default: {Config.CHUNK_SIZE})')
     parser.add_argument('--chunk-overlap', type=int, help=f'Sobreposição do chunk para novas ingestões (default: {Config.CHUNK_OVERLAP})')
+    parser.add_argument('--ingest-concurrency', type=int, help=f'Lotes de embedding simultâneos na ingestão (default: {Config.INGEST_CONCURRENCY})')
+    parser.add_argument('--stream-ingest', action='store_true', default=None, help='Ingestão em streaming (página a página, memória constante)')
+    parser.add_argument('--incremental-ingest', action='store_true', default=None, help='Re-ingestão incremental: grava apenas os trechos alterados')
+    parser.add_argument('--ef-search', type=int, help=f'Candidatos por busca no índice HNSW (default: {Config.HNSW_EF_SEARCH})')
+    parser.add_argument('--probes', type=int, help=f'Listas visitadas por busca no índice IVFFlat (default: {Config.IVFFLAT_PROBES})')
+    parser.add_argument('--hybrid', action=argparse.BooleanOptionalAction, default=None, help=f'Busca textual + vetorial combinadas por RRF (default: {Config.HYBRID_SEARCH})')
+    parser.add_argument('--diversify', action=argparse.BooleanOptionalAction, default=None, help=f'MMR, remoção de trechos duplicados e junção de chunks vizinhos (default: {Config.DIVERSIFY_RESULTS})')
+    parser.add_argument('--context-tokens', type=int, help=f'Tokens máximos do contexto enviado à LLM, 0 = sem limite (default: {Config.CONTEXT_TOKEN_BUDGET})')
+    parser.add_argument('--min-similarity', type=float, help=f'Similaridade mínima dos trechos; abaixo dela a resposta padrão é dada sem a LLM, 0 = desativado (default: {Config.MIN_SIMILARITY})')
+    parser.add_argument('--adaptive-k', action=argparse.BooleanOptionalAction, default=None, help=f'Escolhe o número de trechos de cada pergunta pela curva de similaridades, entre ADAPTIVE_MIN_K e ADAPTIVE_MAX_K (default: {Config.ADAPTIVE_TOP_K})')
+    parser.add_argument('--stream', action=argparse.BooleanOptionalAction, default=None, help=f'Imprime a resposta à medida que é gerada (default: {Config.STREAM_ANSWERS})')
+    parser.add_argument('--source', action='append', metavar='FILE', help='Restringe a busca a este documento (caminho ou nome do arquivo; pode repetir)')
+    parser.add_argument('--pages', type=str, metavar='RANGE', help='Restringe a busca a um intervalo de páginas (ex: 3-7, 5, 10-)')
     parser.add_argument('--search-timeout', type=int, help=f'Timeout para buscas em segundos (default: {Config.SEARCH_TIMEOUT})')
     parser.add_argument('--prompt-template', type=str, help='Caminho para arquivo de template de prompt customizado')
+    parser.add_argument('--batch', type=str, metavar='QUESTIONS_TXT', help='Responde as perguntas do arquivo (uma por linha) sem abrir o chat interativo')
+    parser.add_argument('--concurrency', type=int, help=f'Perguntas simultâneas no modo --batch (default: {Config.BATCH_CONCURRENCY})')
+    parser.add_argument('--output', type=str, metavar='RESULTS_JSONL', help='Arquivo JSONL de saída do modo --batch (default: <arquivo>.results.jsonl)')
     
     args = parser.parse_args()
     
@@ -196,6 +232,13 @@ def main() -> None:
             print(f"\n❌ Erro ao configurar provedor: {e}\n")
             sys.exit(1)
 
+    # Filtro de documentos/páginas aplicado a todas as perguntas
+    try:
+        metadata_filter = build_filter(args.source, args.pages)
+    except ValueError as e:
+        print(f"\n❌ Erro no filtro: {e}\n")
+        sys.exit(1)
+
     # Validar configuração
     try:
         Config.validate_config()
@@ -207,46 +250,88 @@ def main() -> None:
     if args.file:
         if not args.quiet:
             print(f"\n📄 Arquivo especificado via argumento: {args.file}")
-        if not handle_add_command(f"add {args.file}", quiet=args.quiet, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap):
+        if not handle_add_command(
+            f"add {args.file}",
+            quiet=args.quiet,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            concurrency=args.ingest_concurrency,
+            streaming=args.stream_ingest,
+            incremental=args.incremental_ingest,
+        ):
             if not args.quiet:
                 print("⚠️  Continuando mesmo com falha na ingestão...\n")
     
     # Verificar status do banco
     counts = check_database_status()
     
-    # Exibir boas-vindas (apenas se não estiver em modo silencioso)
-    if not args.quiet:
+    # Exibir boas-vindas (apenas se não estiver em modo silencioso nem em lote)
+    if not args.quiet and not args.batch:
         display_welcome(counts)
     
-    # Inicializar chain de busca
+    # Inicializar sessão de busca (embeddings, LLM, prompt e pool criados uma única vez)
     if not args.quiet:
         print("🔧 Inicializando sistema de busca...\n")
     
-    # Criar kwargs para search_prompt
+    # Criar kwargs para create_search_session
     search_kwargs: dict[str, Any] = {}
     if args.top_k is not None: search_kwargs['top_k'] = args.top_k
     if args.temperature is not None: search_kwargs['temperature'] = args.temperature
     if args.prompt_template is not None: search_kwargs['template_path'] = args.prompt_template
+    if args.ef_search is not None: search_kwargs['ef_search'] = args.ef_search
+    if args.probes is not None: search_kwargs['probes'] = args.probes
+    if args.hybrid is not None: search_kwargs['hybrid'] = args.hybrid
+    if args.diversify is not None: search_kwargs['diversify'] = args.diversify
+    if args.context_tokens is not None: search_kwargs['context_budget'] = args.context_tokens
+    if args.min_similarity is not None: search_kwargs['min_similarity'] = args.min_similarity
+    if args.adaptive_k is not None: search_kwargs['adaptive_k'] = args.adaptive_k
     
-    chain = search_prompt(**search_kwargs)
+    session = create_search_session(**search_kwargs)
     
-    if not chain:
+    if not session:
         print("❌ Não foi possível iniciar o chat. Verifique as configurações no .env\n")
         sys.exit(1)
     
     if not args.quiet:
         print("✅ Sistema pronto!\n")
     
+    # Modo em lote: responde o arquivo de perguntas e encerra
+    if args.batch:
+        from batch import run_batch
+        output_path = args.output or f"{os.path.splitext(args.batch)[0]}.results.jsonl"
+        try:
+            summary = run_batch(
+                session,
+                args.batch,
+                output_path,
+                concurrency=args.concurrency,
+                top_k=args.top_k,
+                ef_search=args.ef_search,
+                probes=args.probes,
+                quiet=args.quiet,
+                metadata_filter=metadata_filter,
+            )
+        except (FileNotFoundError, ValueError) as e:
+            print(f"\n❌ Erro no modo em lote: {e}\n")
+            sys.exit(2)
+        sys.exit(0 if summary["failed"] == 0 else 1)
+    
     # Iniciar loop de chat
     chat_loop(
-        chain, 
+        session, 
         quiet=args.quiet, 
         verbose=args.verbose, 
         top_k=args.top_k, 
-        temperature=args.temperature,
         chunk_size=args.chunk_size,
         chunk_overlap=args.chunk_overlap,
-        search_timeout=args.search_timeout
+        search_timeout=args.search_timeout,
+        ingest_concurrency=args.ingest_concurrency,
+        stream_ingest=args.stream_ingest,
+        incremental_ingest=args.incremental_ingest,
+        ef_search=args.ef_search,
+        probes=args.probes,
+        stream=args.stream,
+        metadata_filter=metadata_filter,
     )
 
 
@@ -254,5 +339,9 @@ if __name__ == "__main__":
     try:
         main()
         os._exit(0)
-    except (KeyboardInterrupt, SystemExit):
+    except KeyboardInterrupt:
         os._exit(0)
+    except SystemExit as e:
+        # os._exit não esvazia os buffers (saída redirecionada, ex: execuções em lote agendadas)
+        sys.stdout.flush()
+        os._exit(e.code if isinstance(e.code, int) else 0)
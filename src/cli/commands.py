@@ -6,10 +6,12 @@ import signal
 from contextlib import contextmanager
 
 from sqlalchemy.exc import SQLAlchemyError
-from search import search_prompt, search_with_sources
+from search import SearchSession
+from filters import MetadataFilter, describe_filter
 from database import get_vector_store
 from ingest import ingest_pdf
 from config import Config
+from db_pool import get_pool_stats
 from cli.ui import SECTION_LINE, HEADER_LINE, display_help
 
 logger = logging.getLogger(__name__)
@@ -58,8 +60,8 @@ def check_database_status() -> tuple[int, int]:
         tuple: (num_chunks, num_sources)
     """
     try:
-        from database import VectorStoreRepository
-        repo = VectorStoreRepository()
+        from database import get_repository
+        repo = get_repository()
         num_chunks = repo.count()
         num_sources = repo.count_sources()
         
@@ -82,6 +84,9 @@ def handle_add_command(
     quiet: bool = False,
     chunk_size: Optional[int] = None,
     chunk_overlap: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    incremental: Optional[bool] = None,
 ) -> bool:
     """
     Processa comando de adição de PDF ao banco.
@@ -91,6 +96,9 @@ def handle_add_command(
         quiet: Se True, oculta mensagens de progresso
         chunk_size: Tamanho do chunk (opcional)
         chunk_overlap: Sobreposição do chunk (opcional)
+        concurrency: Lotes de embedding simultâneos (opcional)
+        streaming: Ingestão página a página com memória constante (opcional)
+        incremental: Grava apenas os chunks alterados em re-ingestões (opcional)
         
     Returns:
         bool: True se processado com sucesso, False caso contrário
@@ -100,12 +108,43 @@ def handle_add_command(
     if len(parts) < 2:
         if not quiet:
             print("❌ Erro: Você deve especificar o caminho do PDF.")
-            print("   Uso: add <caminho_pdf>")
+            print("   Uso: add <caminho_pdf | diretório | glob | manifesto.txt>")
             print("   Exemplo: add document.pdf\n")
         return False
     
-    from ingest import normalize_pdf_path
-    pdf_path = normalize_pdf_path(parts[1].strip())
+    from ingest import ingest_pdfs, is_multi_input, normalize_pdf_path
+    raw_path = parts[1].strip()
+
+    # Diretório, glob ou manifesto: ingestão em lote (sem confirmação por arquivo)
+    if is_multi_input(raw_path):
+        if not quiet:
+            print(f"\n📚 Iniciando ingestão em lote: {raw_path}")
+            print(SECTION_LINE)
+        try:
+            results = ingest_pdfs(
+                [raw_path],
+                quiet=quiet,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                concurrency=concurrency,
+                incremental=incremental,
+            )
+        except (ValueError, FileNotFoundError) as e:
+            if not quiet:
+                print(f"❌ Erro: {e}\n")
+            return False
+        except SQLAlchemyError as e:
+            if not quiet:
+                print(f"❌ Erro de banco de dados na ingestão em lote: {e}\n")
+            return False
+        except Exception as e:
+            if not quiet:
+                print(f"❌ Erro inesperado na ingestão em lote: {e}\n")
+            logger.error(f"Erro inesperado na ingestão em lote: {e}", exc_info=True)
+            return False
+        return all(r["success"] for r in results)
+
+    pdf_path = normalize_pdf_path(raw_path)
     
     # Validar se arquivo existe
     if not os.path.exists(pdf_path):
@@ -125,8 +164,8 @@ def handle_add_command(
     
     try:
         # 1. Inicializar Repositório para verificar existência
-        from database import VectorStoreRepository
-        repo = VectorStoreRepository()
+        from database import get_repository
+        repo = get_repository()
         
         # 2. Verificar se o arquivo já foi ingerido
         if repo.source_exists(pdf_path):
@@ -136,11 +175,22 @@ def handle_add_command(
                 if confirm != 'sim':
                     print("Operação cancelada pelo usuário.\n")
                     return False
-                print("Limpando dados antigos e re-ingerindo...\n")
+                if incremental or (incremental is None and Config.INGEST_INCREMENTAL):
+                    print("Atualizando apenas os trechos alterados...\n")
+                else:
+                    print("Limpando dados antigos e re-ingerindo...\n")
             # Se quiet=True, prossegue sem perguntar (sobrescreve por padrão)
 
         # 3. Reutilizar lógica do ingest.py
-        success = ingest_pdf(pdf_path, quiet=quiet, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        success = ingest_pdf(
+            pdf_path,
+            quiet=quiet,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            concurrency=concurrency,
+            streaming=streaming,
+            incremental=incremental,
+        )
         
         if success:
             if not quiet:
@@ -186,8 +236,8 @@ def handle_remove_command(user_input: str) -> None:
     
     source_name = parts[1].strip()
     
-    from database import VectorStoreRepository
-    repo = VectorStoreRepository()
+    from database import get_repository
+    repo = get_repository()
     
     # Verificar se o arquivo existe na base
     # O source no metadados pode ser o caminho completo ou apenas o nome
@@ -221,8 +271,8 @@ def handle_stats_command() -> None:
     """
     Exibe estatísticas detalhadas do banco de dados.
     """
-    from database import VectorStoreRepository
-    repo = VectorStoreRepository()
+    from database import get_repository
+    repo = get_repository()
     
     num_chunks = repo.count()
     sources = repo.list_sources()
@@ -244,9 +294,108 @@ def handle_stats_command() -> None:
                 # Tentar extrair apenas o nome do arquivo se for um caminho
                 filename = os.path.basename(src)
                 print(f"   {i}. {filename} ({src})")
+
+    missing = repo.missing_indexes()
+    if missing:
+        print("\n⚠️  Índices ausentes (consultas por fonte fazem varredura completa):")
+        for name in missing:
+            print(f"   • {name}")
+        print("💡 Eles são criados automaticamente na próxima ingestão ('add <caminho_pdf>').")
+
+    pool = get_pool_stats()
+    if pool:
+        print("\n🔌 Pool de conexões:")
+        print(f"   Em uso: {pool['checked_out']}/{pool['size'] + pool['max_overflow']} "
+              f"({pool['utilization']:.0%}) | pico: {pool['peak_checked_out']} | overflow: {pool['overflow']}")
+        print(f"   Checkouts: {pool['checkouts']} | latência média: {pool['avg_checkout_ms']:.1f}ms "
+              f"| máx: {pool['max_checkout_ms']:.1f}ms | timeouts: {pool['timeouts']}")
     
     print(HEADER_LINE + "\n")
 
+def _display_ann_index(info: dict[str, Any]) -> None:
+    size_mb = info["size_bytes"] / (1024 * 1024)
+    status = "válido" if info["valid"] else "INVÁLIDO (reconstrua com 'index rebuild')"
+    print(f"🔹 Índice:    {info['name']}")
+    print(f"🔹 Método:    {info['method'].upper()} ({info['dimension']} dimensões)")
+    print(f"🔹 Tamanho:   {size_mb:.1f} MB")
+    print(f"🔹 Status:    {status}")
+    if info.get("build_seconds") is not None:
+        print(f"⏱️  Construção: {info['build_seconds']:.2f}s")
+
+
+def handle_index_command(user_input: str) -> None:
+    """
+    Gerencia o índice ANN (HNSW/IVFFlat) da coleção.
+
+    Subcomandos:
+        index                          Mostra o índice atual
+        index create [hnsw|ivfflat]    Cria (ou substitui) o índice
+        index rebuild                  Reconstrói o índice existente
+        index drop                     Remove o índice (busca exata)
+
+    Args:
+        user_input: Comando completo digitado pelo usuário
+    """
+    from database import get_repository
+    from embeddings_manager import get_embeddings
+
+    parts = user_input.strip().split()
+    action = parts[1].lower() if len(parts) > 1 else "status"
+    method = parts[2].lower() if len(parts) > 2 else "hnsw"
+
+    try:
+        if action == "status":
+            repo = get_repository()
+            info = repo.ann_index_info(refresh=True)
+            print("\n" + HEADER_LINE)
+            print("🧭 ÍNDICE VETORIAL (ANN)")
+            print(HEADER_LINE)
+            if info is None:
+                print("Nenhum índice ANN: as buscas fazem varredura exata da coleção.")
+                print("💡 Crie um com 'index create hnsw' ou 'index create ivfflat'.")
+            else:
+                _display_ann_index(info)
+            print(HEADER_LINE + "\n")
+
+        elif action == "create":
+            if method not in ("hnsw", "ivfflat"):
+                print("❌ Método inválido. Use: index create hnsw | index create ivfflat\n")
+                return
+            repo = get_repository(get_embeddings())
+            print(f"🏗️  Construindo índice {method.upper()} (pode levar alguns minutos)...")
+            info = repo.create_ann_index(method)
+            print("✅ Índice criado!")
+            _display_ann_index(info)
+            print()
+
+        elif action == "rebuild":
+            repo = get_repository()
+            print("🏗️  Reconstruindo índice...")
+            info = repo.rebuild_ann_index()
+            if info is None:
+                print("💡 Não há índice ANN para reconstruir.\n")
+                return
+            print("✅ Índice reconstruído!")
+            _display_ann_index(info)
+            print()
+
+        elif action == "drop":
+            repo = get_repository()
+            if repo.drop_ann_index():
+                print("✅ Índice removido. As buscas voltam a ser exatas.\n")
+            else:
+                print("💡 Não há índice ANN para remover.\n")
+
+        else:
+            print("❌ Uso: index [create hnsw|create ivfflat|rebuild|drop]\n")
+
+    except ValueError as e:
+        print(f"❌ {e}\n")
+    except SQLAlchemyError as e:
+        print(f"❌ Erro de banco de dados ao gerenciar o índice: {e}\n")
+        logger.error(f"Erro de banco no comando index: {e}")
+
+
 def handle_clear_command() -> bool:
     """
     Processa o comando de limpeza da base de dados com confirmação.
@@ -254,8 +403,8 @@ def handle_clear_command() -> bool:
     Returns:
         bool: True se a base foi limpa, False caso contrário
     """
-    from database import VectorStoreRepository
-    repo = VectorStoreRepository()
+    from database import get_repository
+    repo = get_repository()
     
     # Verificar se já não está vazio para evitar confirmação desnecessária
     if repo.count() == 0:
@@ -275,31 +424,40 @@ def handle_clear_command() -> bool:
         return False
 
 def process_question(
-    chain: Any,
+    session: SearchSession,
     question: str,
     quiet: bool = False,
     verbose: bool = False,
     top_k: Optional[int] = None,
-    temperature: Optional[float] = None,
     search_timeout: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    stream: Optional[bool] = None,
+    metadata_filter: Optional[MetadataFilter] = None,
 ) -> None:
     """
-    Processa uma pergunta usando a chain do RAG.
+    Processa uma pergunta usando a sessão de busca do RAG.
     
     Args:
-        chain: Chain do LangChain configurada
+        session: Sessão de busca criada no início do chat
         question: Pergunta do usuário
         quiet: Se True, oculta indicadores de progresso
         verbose: Se True, mostra estatísticas detalhadas da resposta
         top_k: Número de documentos a recuperar (opcional)
-        temperature: Temperatura para geração (opcional)
         search_timeout: Timeout em segundos (opcional, padrão: Config.SEARCH_TIMEOUT)
+        ef_search: `hnsw.ef_search` por consulta (opcional, padrão: Config.HNSW_EF_SEARCH)
+        probes: `ivfflat.probes` por consulta (opcional, padrão: Config.IVFFLAT_PROBES)
+        stream: Se True, imprime a resposta à medida que é gerada (padrão: Config.STREAM_ANSWERS)
+        metadata_filter: Restringe a busca a documentos/páginas (ex: flags --source/--pages);
+            `in:<arquivo>` e `pag:<intervalo>` na pergunta têm precedência
     """
     timeout_seconds = search_timeout or Config.SEARCH_TIMEOUT
+    use_stream = Config.STREAM_ANSWERS if stream is None else stream
     
     try:
         import time
         start_time = time.time()
+        first_token_time: Optional[float] = None
         
         if not quiet:
             # Mostrar etapas do processo
@@ -308,37 +466,93 @@ def process_question(
                 print("🧠 Gerando resposta baseada nos documentos (modo detalhado)...\n")
             else:
                 print("🧠 Gerando resposta baseada nos documentos...\n")
+
+        def on_token(piece: str) -> None:
+            nonlocal first_token_time
+            if first_token_time is None:
+                first_token_time = time.time()
+                if not quiet:
+                    print(SECTION_LINE)
+                    print(f"PERGUNTA: {question}")
+                    print(SECTION_LINE)
+                    print("RESPOSTA: ", end="")
+            print(piece, end="", flush=True)
         
         # Aplicar timeout à operação de busca
         with timeout(timeout_seconds):
-            # Sempre usar search_with_sources para garantir resiliência/fallback
-            # A função retorna dict com keys 'answer' e 'sources'
-            kwargs: dict[str, Any] = {}
-            if top_k is not None: kwargs['top_k'] = top_k
-            if temperature is not None: kwargs['temperature'] = temperature
-            
-            result = search_with_sources(question, **kwargs)
+            # A sessão garante resiliência/fallback e retorna dict com keys 'answer' e 'sources'
+            result = session.ask(
+                question,
+                top_k=top_k,
+                ef_search=ef_search,
+                probes=probes,
+                on_token=on_token if use_stream else None,
+                metadata_filter=metadata_filter,
+            )
             response = result["answer"]
             
-            # Se verbose, pega as sources; senão lista vazia
+            # Se verbose, pega as sources e os contadores de cache; senão vazios
             if verbose:
                 sources = result["sources"]
+                cache_stats = session.cache_stats()
             else:
                 sources = []
+                cache_stats = {}
             
             end_time = time.time()
             elapsed_time = end_time - start_time
+
+        streamed = first_token_time is not None
+        if streamed:
+            print()
         
         if not quiet:
-            print(SECTION_LINE)
-            print(f"PERGUNTA: {question}")
-            print(SECTION_LINE)
-            print(f"RESPOSTA: {response}")
+            if not streamed:
+                print(SECTION_LINE)
+                print(f"PERGUNTA: {question}")
+                print(SECTION_LINE)
+            if result.get("cached"):
+                print(f"♻️  Resposta reaproveitada do cache semântico "
+                      f"(similaridade {result.get('cache_similarity', 0.0):.3f} com uma pergunta anterior)")
+            if not streamed:
+                print(f"RESPOSTA: {response}")
+            if result.get("no_information") and verbose:
+                print("🚫 Nenhum trecho acima do limiar de similaridade: resposta dada sem chamar a LLM")
             
             if verbose:
                 print(SECTION_LINE)
                 print(f"📊 ESTATÍSTICAS DA RESPOSTA:")
+                if streamed:
+                    print(f"⚡ Tempo até o primeiro token: {first_token_time - start_time:.2f}s")
                 print(f"⏱️  Tempo de execução: {elapsed_time:.2f}s")
+                if result.get("filter"):
+                    print(f"🔎 Filtro: {describe_filter(result['filter'])}")
+                adaptive = result.get("adaptive_k")
+                if adaptive:
+                    print(f"🎯 Top-k adaptativo: {adaptive['k']} de {adaptive['candidates']} candidatos ({adaptive['method']})")
+                context = result.get("context")
+                if context:
+                    dropped = f", {context['dropped']} fora do orçamento" if context["dropped"] else ""
+                    print(f"🧩 Contexto: {context['tokens']} tokens ({context['documents']} trechos{dropped}, "
+                          f"{context['tokenizer']}) | economizados: {context['tokens_saved']} tokens")
+                query_cache = cache_stats.get("query_embeddings")
+                if query_cache:
+                    print(f"🧠 Embedding da pergunta: {query_cache['last'] or '-'} "
+                          f"(memória: {query_cache['memory_hits']} | banco: {query_cache['persistent_hits']} "
+                          f"| provedor: {query_cache['misses']})")
+                answer_cache = cache_stats.get("answers")
+                if answer_cache:
+                    print(f"♻️  Cache semântico: {answer_cache['hits']} hits / {answer_cache['misses']} misses "
+                          f"({answer_cache['size']} respostas, corpus v{answer_cache['corpus_version']})")
+                no_information = cache_stats.get("no_information")
+                if no_information and no_information["hits"]:
+                    print(f"🚫 Respostas sem LLM (sem trechos relevantes): {no_information['hits']} "
+                          f"de {no_information['questions']} perguntas")
+                llm_cache = cache_stats.get("llm_responses")
+                if llm_cache:
+                    status = "hit" if result.get("llm_cached") else "miss"
+                    print(f"💾 Cache da LLM: {status} ({llm_cache['hits']} hits / {llm_cache['misses']} misses) | "
+                          f"economizados: {llm_cache['tokens_saved']} tokens, {llm_cache['latency_saved_ms'] / 1000:.2f}s")
                 if sources:
                     print(f"📚 Fontes utilizadas ({len(sources)}):")
                     for spec in sources:
@@ -348,10 +562,30 @@ def process_question(
             print(SECTION_LINE + "\n")
         else:
             # Em modo quieto, mostra apenas a resposta pura para facilitar automação
-            print(response)
+            if not streamed:
+                print(response)
             if verbose:
                 # Se for verbose E quiet, mostra estatísticas mínimas
-                print(f"--- Stats: {elapsed_time:.2f}s | {len(sources)} sources ---")
+                query_cache = cache_stats.get("query_embeddings")
+                cache_info = ""
+                if streamed:
+                    cache_info += f" | ttft {first_token_time - start_time:.2f}s"
+                if query_cache:
+                    hits = query_cache["memory_hits"] + query_cache["persistent_hits"]
+                    cache_info += f" | query cache {hits} hits/{query_cache['misses']} misses"
+                if result.get("filter"):
+                    cache_info += f" | filter {describe_filter(result['filter'])}"
+                if result.get("adaptive_k"):
+                    cache_info += f" | k {result['adaptive_k']['k']}/{result['adaptive_k']['candidates']}"
+                if result.get("context"):
+                    cache_info += f" | context {result['context']['tokens']} tokens (-{result['context']['tokens_saved']})"
+                if result.get("no_information"):
+                    cache_info += " | no information (llm skipped)"
+                if result.get("cached"):
+                    cache_info += " | cached answer"
+                elif result.get("llm_cached"):
+                    cache_info += " | cached llm response"
+                print(f"--- Stats: {elapsed_time:.2f}s | {len(sources)} sources{cache_info} ---")
     
     except TimeoutError as e:
         print(f"\n⏱️  {e}")
@@ -40,10 +40,14 @@ def display_help() -> None:
     print("\n🔍 FAZER PERGUNTAS:")
     print("   Digite sua pergunta diretamente (ex: 'Qual o faturamento da Empresa SuperTechIABrazil?')")
     print("   O sistema buscará respostas baseadas nos PDFs ingeridos.")
+    print("   Restrinja a busca com 'in:<arquivo>' e 'pag:<intervalo>' na pergunta")
+    print("   (ex: 'Qual o lucro? in:balanco.pdf pag:3-5')")
     
     print("\n📄 GERENCIAR DOCUMENTOS:")
     print("   add <caminho_pdf>      Adicionar novo PDF ao banco de dados (atalho: 'a')")
     print("   ingest <caminho_pdf>   (Mesmo que 'add')")
+    print("   add <diretório|glob>   Ingestão em lote (ex: 'add arquivo/' ou 'add docs/**/*.pdf')")
+    print("   add <manifesto.txt>    Ingestão em lote a partir de uma lista de caminhos")
     print("   remove <nome_arquivo>  Remove um arquivo específico da base (atalho: 'r')")
     print("   Exemplo: remove document.pdf")
     
@@ -64,6 +68,12 @@ def display_help() -> None:
     print("\n📊 ESTATÍSTICAS:")
     print("   stats                  Mostra estatísticas detalhadas do banco (atalho: 's')")
 
+    print("\n🧭 ÍNDICE VETORIAL (ANN):")
+    print("   index                  Mostra o índice ANN da coleção")
+    print("   index create hnsw      Cria índice HNSW (ou 'index create ivfflat')")
+    print("   index rebuild          Reconstrói o índice existente")
+    print("   index drop             Remove o índice (busca exata)")
+
     print("\n📜 HISTÓRICO:")
     print("   history                Mostra últimos comandos (atalho: 'hist')")
     print("   !N                     Repete o comando número N (ex: !3)")
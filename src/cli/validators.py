@@ -66,6 +66,20 @@ def is_stats_command(text: str) -> bool:
     return text.lower().strip() in ['stats', 's']
 
 
+def is_index_command(text: str) -> bool:
+    """
+    Verifica se o comando é de gerenciamento do índice vetorial (ANN).
+    
+    Args:
+        text: Texto do usuário
+        
+    Returns:
+        bool: True se for comando de índice
+    """
+    cleaned = text.lower().strip()
+    return cleaned == 'index' or cleaned.startswith('index ')
+
+
 def is_remove_command(text: str) -> bool:
     """
     Verifica se o comando é de remover um arquivo.
@@ -22,6 +22,14 @@ PROJECT_ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(PROJECT_ROOT, ".env"))
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    """Lê uma variável de ambiente booleana ('1', 'true', 'yes', 'sim' → True)."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "sim", "on")
+
+
 class Config:
     """
     Classe centralizada de configuração do projeto.
@@ -48,16 +56,67 @@ class Config:
     # === Configurações do Banco de Dados ===
     DATABASE_URL: ClassVar[Optional[str]] = os.getenv("DATABASE_URL")
     PG_VECTOR_COLLECTION_NAME: ClassVar[Optional[str]] = os.getenv("PG_VECTOR_COLLECTION_NAME")
+    DB_POOL_SIZE: ClassVar[int] = int(os.getenv("DB_POOL_SIZE", "5"))  # Conexões mantidas abertas no pool
+    DB_MAX_OVERFLOW: ClassVar[int] = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Conexões extras sob pico
+    DB_POOL_RECYCLE: ClassVar[int] = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Segundos até reciclar uma conexão
+    DB_POOL_TIMEOUT: ClassVar[int] = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Espera máxima por conexão livre
+    DB_POOL_PRE_PING: ClassVar[bool] = _env_bool("DB_POOL_PRE_PING", True)  # Testa a conexão antes do uso
+    VECTOR_BACKEND: ClassVar[str] = os.getenv("VECTOR_BACKEND", "pgvector").lower()  # 'pgvector' ou 'numpy' (em memória)
+    NUMPY_STORE_DIR: ClassVar[str] = os.getenv("NUMPY_STORE_DIR", os.path.join(PROJECT_ROOT, ".vector_store"))  # Snapshots do backend numpy
     
     # === Configurações de Ingestão ===
     PDF_PATH: ClassVar[Optional[str]] = os.getenv("PDF_PATH")
     CHUNK_SIZE: ClassVar[int] = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: ClassVar[int] = int(os.getenv("CHUNK_OVERLAP", "150"))
+    INGEST_CONCURRENCY: ClassVar[int] = int(os.getenv("INGEST_CONCURRENCY", "1"))  # Lotes de embedding simultâneos
+    INGEST_WORKERS: ClassVar[int] = int(os.getenv("INGEST_WORKERS", "0"))  # Processos de extração (0 = núcleos)
+    INGEST_STREAMING: ClassVar[bool] = _env_bool("INGEST_STREAMING", False)  # Pipeline página a página
+    INGEST_INCREMENTAL: ClassVar[bool] = _env_bool("INGEST_INCREMENTAL", False)  # Diff por hash em re-ingestões
+    INGEST_BULK_WRITE: ClassVar[bool] = _env_bool("INGEST_BULK_WRITE", False)  # COPY + merge em vez de INSERTs
+    BULK_WRITE_SIZE: ClassVar[int] = int(os.getenv("BULK_WRITE_SIZE", "1000"))  # Chunks por COPY
+    EMBEDDING_CACHE_ENABLED: ClassVar[bool] = _env_bool("EMBEDDING_CACHE_ENABLED", True)  # Cache persistente de embeddings
     
     # === Configurações de Busca/Retrieval ===
     TOP_K: ClassVar[int] = int(os.getenv("TOP_K", "10"))
     RETRIEVAL_TEMPERATURE: ClassVar[float] = float(os.getenv("RETRIEVAL_TEMPERATURE", "0"))
     SEARCH_TIMEOUT: ClassVar[int] = int(os.getenv("SEARCH_TIMEOUT", "30"))  # Timeout em segundos
+    HNSW_EF_SEARCH: ClassVar[int] = int(os.getenv("HNSW_EF_SEARCH", "40"))  # Candidatos por busca no índice HNSW
+    IVFFLAT_PROBES: ClassVar[int] = int(os.getenv("IVFFLAT_PROBES", "10"))  # Listas visitadas no índice IVFFlat
+    HYBRID_SEARCH: ClassVar[bool] = _env_bool("HYBRID_SEARCH", False)  # Busca textual + vetorial combinadas por RRF
+    FULLTEXT_CONFIG: ClassVar[str] = os.getenv("FULLTEXT_CONFIG", "portuguese")  # Configuração de idioma do full-text do PostgreSQL
+    HYBRID_CANDIDATES: ClassVar[int] = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Candidatos por busca antes da fusão
+    RRF_K: ClassVar[int] = int(os.getenv("RRF_K", "60"))  # Constante de suavização do Reciprocal Rank Fusion
+    DIVERSIFY_RESULTS: ClassVar[bool] = _env_bool("DIVERSIFY_RESULTS", False)  # MMR + remoção de duplicados + junção de chunks vizinhos
+    DIVERSITY_CANDIDATES: ClassVar[int] = int(os.getenv("DIVERSITY_CANDIDATES", "20"))  # Candidatos buscados antes da diversificação
+    MMR_LAMBDA: ClassVar[float] = float(os.getenv("MMR_LAMBDA", "0.7"))  # Peso da relevância no MMR (1.0 = só relevância)
+    DEDUP_THRESHOLD: ClassVar[float] = float(os.getenv("DEDUP_THRESHOLD", "0.95"))  # Similaridade de cosseno de quase-duplicatas
+    MERGE_ADJACENT_CHUNKS: ClassVar[bool] = _env_bool("MERGE_ADJACENT_CHUNKS", True)  # Junta chunks consecutivos da mesma página
+    MIN_SIMILARITY: ClassVar[float] = float(os.getenv("MIN_SIMILARITY", "0"))  # Similaridade de cosseno mínima dos trechos (0 = desativado)
+    SCORE_GAP_CUTOFF: ClassVar[float] = float(os.getenv("SCORE_GAP_CUTOFF", "0"))  # Queda relativa máxima em relação ao melhor trecho (0 = desativado)
+    ADAPTIVE_TOP_K: ClassVar[bool] = _env_bool("ADAPTIVE_TOP_K", False)  # Escolhe o k de cada pergunta pela curva de similaridades
+    ADAPTIVE_MIN_K: ClassVar[int] = int(os.getenv("ADAPTIVE_MIN_K", "2"))  # Mínimo de trechos no modo adaptativo
+    ADAPTIVE_MAX_K: ClassVar[int] = int(os.getenv("ADAPTIVE_MAX_K", "20"))  # Candidatos buscados e máximo de trechos no modo adaptativo
+    ADAPTIVE_K_METHOD: ClassVar[str] = os.getenv("ADAPTIVE_K_METHOD", "knee")  # Regra de corte: 'knee' (cotovelo) ou 'gap' (maior queda)
+    CONTEXT_TOKEN_BUDGET: ClassVar[int] = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # Tokens máximos do contexto no prompt (0 = sem limite)
+    QUERY_CACHE_SIZE: ClassVar[int] = int(os.getenv("QUERY_CACHE_SIZE", "1000"))  # Perguntas no LRU de embeddings (0 = desativado)
+    QUERY_CACHE_TTL: ClassVar[int] = int(os.getenv("QUERY_CACHE_TTL", "86400"))  # Validade no LRU em segundos (0 = sem expiração)
+    QUERY_CACHE_PERSISTENT: ClassVar[bool] = _env_bool("QUERY_CACHE_PERSISTENT", True)  # Nível persistente no PostgreSQL
+    ANSWER_CACHE_ENABLED: ClassVar[bool] = _env_bool("ANSWER_CACHE_ENABLED", True)  # Cache semântico de respostas
+    ANSWER_CACHE_THRESHOLD: ClassVar[float] = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Similaridade de cosseno mínima
+    ANSWER_CACHE_SIZE: ClassVar[int] = int(os.getenv("ANSWER_CACHE_SIZE", "500"))  # Respostas guardadas por sessão
+    STREAM_ANSWERS: ClassVar[bool] = _env_bool("STREAM_ANSWERS", False)  # Imprime a resposta token a token
+    LLM_CACHE_ENABLED: ClassVar[bool] = _env_bool("LLM_CACHE_ENABLED", True)  # Cache exato de respostas (temperatura 0)
+    LLM_CACHE_ANY_TEMPERATURE: ClassVar[bool] = _env_bool("LLM_CACHE_ANY_TEMPERATURE", False)  # Usa o cache com temperatura > 0
+    LLM_CACHE_MAX_ENTRIES: ClassVar[int] = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))  # Respostas persistidas (LRU)
+    LLM_CACHE_TTL: ClassVar[int] = int(os.getenv("LLM_CACHE_TTL", "604800"))  # Validade em segundos (0 = sem expiração)
+    BATCH_CONCURRENCY: ClassVar[int] = int(os.getenv("BATCH_CONCURRENCY", "4"))  # Perguntas simultâneas no modo --batch
+    BATCH_EMBED_SIZE: ClassVar[int] = int(os.getenv("BATCH_EMBED_SIZE", "100"))  # Perguntas por chamada de embeddings no modo --batch
+
+    # === Configurações do Serviço HTTP ===
+    SERVER_HOST: ClassVar[str] = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT: ClassVar[int] = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_MAX_CONCURRENCY: ClassVar[int] = int(os.getenv("SERVER_MAX_CONCURRENCY", "4"))  # Perguntas executadas simultaneamente
+    SERVER_MAX_QUEUE: ClassVar[int] = int(os.getenv("SERVER_MAX_QUEUE", "64"))  # Perguntas aguardando vaga antes de 503
     
     # === Controle de Provedor ===
     _FORCED_PROVIDER: ClassVar[Optional[str]] = None
@@ -109,6 +168,26 @@ class Config:
             )
         return key
     
+    @classmethod
+    @property
+    def PROVIDER(cls) -> str:
+        """
+        Retorna o provedor ativo ('google' ou 'openai').
+        """
+        # 1. Verificar provedor forçado
+        if cls._FORCED_PROVIDER:
+            return cls._FORCED_PROVIDER
+
+        # 2. Detecção automática (Google > OpenAI)
+        if cls.GOOGLE_API_KEY:
+            return 'google'
+        elif cls.OPENAI_API_KEY:
+            return 'openai'
+        else:
+            raise ValueError(
+                "Nenhuma API key configurada. Configure GOOGLE_API_KEY ou OPENAI_API_KEY no arquivo .env"
+            )
+
     @classmethod
     @property
     def EMBEDDING_MODEL(cls) -> str:
@@ -167,8 +246,14 @@ class Config:
         if not cls.GOOGLE_API_KEY and not cls.OPENAI_API_KEY:
             missing_vars.append("GOOGLE_API_KEY ou OPENAI_API_KEY (pelo menos uma)")
         
-        # Validar configurações do banco de dados
-        if not cls.DATABASE_URL:
+        # Validar configurações do banco de dados (o backend numpy não exige PostgreSQL)
+        if cls.VECTOR_BACKEND not in ("pgvector", "numpy"):
+            missing_vars.append(f"VECTOR_BACKEND válido ('pgvector' ou 'numpy', recebido '{cls.VECTOR_BACKEND}')")
+
+        if cls.ADAPTIVE_K_METHOD not in ("knee", "gap"):
+            missing_vars.append(f"ADAPTIVE_K_METHOD válido ('knee' ou 'gap', recebido '{cls.ADAPTIVE_K_METHOD}')")
+
+        if not cls.DATABASE_URL and cls.VECTOR_BACKEND != "numpy":
             missing_vars.append("DATABASE_URL")
         
         if not cls.PG_VECTOR_COLLECTION_NAME:
@@ -196,10 +281,30 @@ class Config:
         print(f"Google LLM Model: {cls.GOOGLE_LLM_MODEL}")
         print(f"OpenAI Embedding Model: {cls.OPENAI_EMBEDDING_MODEL}")
         print(f"Database Collection: {cls.PG_VECTOR_COLLECTION_NAME}")
+        print(f"Vector Backend: {cls.VECTOR_BACKEND}" + (f" ({cls.NUMPY_STORE_DIR})" if cls.VECTOR_BACKEND == "numpy" else ""))
+        print(f"DB Pool: size={cls.DB_POOL_SIZE} overflow={cls.DB_MAX_OVERFLOW} recycle={cls.DB_POOL_RECYCLE}s pre_ping={cls.DB_POOL_PRE_PING}")
         print(f"Chunk Size: {cls.CHUNK_SIZE}")
         print(f"Chunk Overlap: {cls.CHUNK_OVERLAP}")
+        print(f"Ingest Concurrency: {cls.INGEST_CONCURRENCY}")
+        print(f"Ingest Workers: {cls.INGEST_WORKERS or os.cpu_count()}")
+        print(f"Ingest Streaming: {cls.INGEST_STREAMING}")
+        print(f"Ingest Incremental: {cls.INGEST_INCREMENTAL}")
+        print(f"Ingest Bulk Write: {cls.INGEST_BULK_WRITE} (blocos de {cls.BULK_WRITE_SIZE})")
+        print(f"Embedding Cache: {'✅ Ativo' if cls.EMBEDDING_CACHE_ENABLED else '❌ Desativado'}")
         print(f"Top K Results: {cls.TOP_K}")
         print(f"Retrieval Temperature: {cls.RETRIEVAL_TEMPERATURE}")
+        print(f"HNSW ef_search: {cls.HNSW_EF_SEARCH} | IVFFlat probes: {cls.IVFFLAT_PROBES}")
+        print(f"Hybrid Search: {'✅ Ativo' if cls.HYBRID_SEARCH else '❌ Desativado'} (fts={cls.FULLTEXT_CONFIG}, candidatos={cls.HYBRID_CANDIDATES}, rrf_k={cls.RRF_K})")
+        print(f"Diversify Results: {'✅ Ativo' if cls.DIVERSIFY_RESULTS else '❌ Desativado'} (candidatos={cls.DIVERSITY_CANDIDATES}, mmr_lambda={cls.MMR_LAMBDA}, dedup={cls.DEDUP_THRESHOLD}, merge={cls.MERGE_ADJACENT_CHUNKS})")
+        print(f"Score Threshold: min_similarity={cls.MIN_SIMILARITY or 'desativado'} gap_cutoff={cls.SCORE_GAP_CUTOFF or 'desativado'}")
+        print(f"Adaptive Top-K: {'✅ Ativo' if cls.ADAPTIVE_TOP_K else '❌ Desativado'} (k={cls.ADAPTIVE_MIN_K}-{cls.ADAPTIVE_MAX_K}, método={cls.ADAPTIVE_K_METHOD})")
+        print(f"Context Token Budget: {cls.CONTEXT_TOKEN_BUDGET or 'sem limite'}")
+        print(f"Query Cache: size={cls.QUERY_CACHE_SIZE} ttl={cls.QUERY_CACHE_TTL}s persistent={cls.QUERY_CACHE_PERSISTENT}")
+        print(f"Answer Cache: {'✅ Ativo' if cls.ANSWER_CACHE_ENABLED else '❌ Desativado'} (limiar={cls.ANSWER_CACHE_THRESHOLD}, size={cls.ANSWER_CACHE_SIZE})")
+        print(f"Stream Answers: {'✅ Ativo' if cls.STREAM_ANSWERS else '❌ Desativado'}")
+        print(f"LLM Response Cache: {'✅ Ativo' if cls.LLM_CACHE_ENABLED else '❌ Desativado'} (max={cls.LLM_CACHE_MAX_ENTRIES}, ttl={cls.LLM_CACHE_TTL}s)")
+        print(f"Batch Mode: concurrency={cls.BATCH_CONCURRENCY} embed_size={cls.BATCH_EMBED_SIZE}")
+        print(f"HTTP Service: {cls.SERVER_HOST}:{cls.SERVER_PORT} (concurrency={cls.SERVER_MAX_CONCURRENCY}, queue={cls.SERVER_MAX_QUEUE})")
         print(f"Google API Key: {'✅ Configurada' if cls.GOOGLE_API_KEY else '❌ Ausente'}")
         print(f"OpenAI API Key: {'✅ Configurada' if cls.OPENAI_API_KEY else '❌ Ausente'}")
         print(f"Database URL: {'✅ Configurada' if cls.DATABASE_URL else '❌ Ausente'}")
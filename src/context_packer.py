@@ -0,0 +1,215 @@
+"""
+Módulo de Montagem do Contexto com Orçamento de Tokens
+
+Concatenar todos os `top_k` trechos faz o tamanho do prompt (e o custo e a latência
+da LLM) variar com `CHUNK_SIZE` e `TOP_K`. Aqui o contexto é montado até um
+orçamento fixo de tokens (`CONTEXT_TOKEN_BUDGET`):
+
+- os trechos entram em ordem de relevância; os que não cabem são pulados e o
+  primeiro que não cabe inteiro é cortado, se ainda não houver nenhum trecho;
+- a sobreposição entre chunks vizinhos (`chunk_index` consecutivo) já incluídos
+  é removida antes da contagem;
+- a contagem usa o tokenizer do provedor quando há um local (`tiktoken` para
+  OpenAI) e, caso contrário, uma estimativa por caracteres.
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Optional, Sequence, TypedDict
+
+from langchain_core.documents import Document
+
+from config import Config
+from diversity import overlap_length
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Média de caracteres por token usada na estimativa (texto em português/inglês)
+CHARS_PER_TOKEN = 4.0
+
+CONTEXT_SEPARATOR = "\n\n"
+
+
+class ContextStats(TypedDict):
+    tokens: int
+    tokens_unpacked: int
+    tokens_saved: int
+    documents: int
+    dropped: int
+    truncated: bool
+    tokenizer: str
+
+
+class PackedContext(TypedDict):
+    context: str
+    docs: list[Document]
+    stats: ContextStats
+
+
+class TokenCounter:
+    """Estimativa de tokens por número de caracteres (sem dependências, para qualquer provedor)."""
+
+    name: str = "estimativa"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Corta o texto para no máximo `max_tokens`, preferindo terminar em um espaço."""
+        if max_tokens <= 0:
+            return ""
+        limit = int(max_tokens * CHARS_PER_TOKEN)
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+        space = cut.rfind(" ")
+        return cut[:space] if space > limit // 2 else cut
+
+
+class TiktokenCounter(TokenCounter):
+    """Contagem exata com o encoding `tiktoken` do modelo OpenAI."""
+
+    def __init__(self, encoding: object) -> None:
+        self.encoding = encoding
+        self.name = f"tiktoken:{getattr(encoding, 'name', '?')}"
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))  # type: ignore[attr-defined]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        tokens = self.encoding.encode(text, disallowed_special=())  # type: ignore[attr-defined]
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])  # type: ignore[attr-defined]
+
+
+@lru_cache(maxsize=8)
+def get_token_counter(provider: Optional[str] = None, model: Optional[str] = None) -> TokenCounter:
+    """
+    Retorna o contador de tokens adequado ao provedor da LLM.
+
+    OpenAI usa o encoding `tiktoken` do modelo (`o200k_base` para modelos que o
+    tiktoken não conhece). O Gemini não tem tokenizer local (a contagem exata é uma
+    chamada à API), então usa a estimativa por caracteres, assim como qualquer
+    falha ao carregar o `tiktoken` (ex: sem acesso à rede para baixar o encoding).
+
+    Args:
+        provider: 'google' ou 'openai' (None usa `Config.PROVIDER`).
+        model: Modelo da LLM (None usa `Config.LLM_MODEL`).
+
+    Returns:
+        Contador compartilhado (um por provedor/modelo).
+    """
+    provider = provider or Config.PROVIDER
+    model = model or Config.LLM_MODEL
+    if provider != "openai":
+        return TokenCounter()
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return TiktokenCounter(encoding)
+    except Exception as e:
+        logger.warning(f"Tokenizer do modelo '{model}' indisponível ({e}). Usando estimativa por caracteres.")
+        return TokenCounter()
+
+
+def _chunk_key(doc: Document) -> Optional[tuple[str, object, int]]:
+    index = doc.metadata.get("chunk_index")
+    if not isinstance(index, int) or doc.metadata.get("source") is None:
+        return None
+    return doc.metadata["source"], doc.metadata.get("page"), index
+
+
+def _trim_overlap(doc: Document, packed: dict[tuple[str, object, int], str]) -> str:
+    """Remove do trecho o que ele repete dos vizinhos (chunk anterior/seguinte) já incluídos."""
+    text = doc.page_content
+    key = _chunk_key(doc)
+    if key is None:
+        return text
+    source, page, index = key
+    previous = packed.get((source, page, index - 1))
+    if previous:
+        text = text[overlap_length(previous, text):]
+    following = packed.get((source, page, index + 1))
+    if following:
+        overlap = overlap_length(text, following)
+        if overlap:
+            text = text[:-overlap]
+    return text.strip()
+
+
+def pack_context(
+    docs: Sequence[Document],
+    budget: Optional[int] = None,
+    counter: Optional[TokenCounter] = None,
+) -> PackedContext:
+    """
+    Monta o contexto do prompt dentro de um orçamento de tokens.
+
+    Args:
+        docs: Trechos recuperados, do mais para o menos relevante.
+        budget: Máximo de tokens do contexto (None usa `Config.CONTEXT_TOKEN_BUDGET`; 0 = sem limite).
+        counter: Contador de tokens (None usa `get_token_counter()`).
+
+    Returns:
+        `PackedContext` com o texto, os trechos incluídos (na ordem de relevância,
+        para extrair as fontes) e a contagem de tokens antes e depois (`stats`).
+
+    Examples:
+        >>> from langchain_core.documents import Document
+        >>> docs = [Document(page_content="a" * 400), Document(page_content="b" * 400)]
+        >>> packed = pack_context(docs, budget=120, counter=TokenCounter())
+        >>> packed["stats"]["tokens"], packed["stats"]["dropped"]
+        (100, 1)
+    """
+    counter = counter or get_token_counter()
+    limit = Config.CONTEXT_TOKEN_BUDGET if budget is None else budget
+    separator_tokens = counter.count(CONTEXT_SEPARATOR)
+
+    tokens_unpacked = sum(counter.count(doc.page_content) for doc in docs) + separator_tokens * max(0, len(docs) - 1)
+    texts: dict[int, str] = {}
+    by_chunk: dict[tuple[str, object, int], str] = {}
+    used = 0
+    truncated = False
+    for position, doc in enumerate(docs):
+        text = _trim_overlap(doc, by_chunk)
+        if not text:
+            continue
+        cost = counter.count(text) + (separator_tokens if texts else 0)
+        if limit > 0 and used + cost > limit:
+            if texts:
+                continue
+            # Nem o trecho mais relevante cabe: entra cortado
+            text = counter.truncate(text, limit)
+            cost = counter.count(text)
+            truncated = True
+        texts[position] = text
+        used += cost
+        key = _chunk_key(doc)
+        if key is not None:
+            by_chunk[key] = doc.page_content
+
+    context = CONTEXT_SEPARATOR.join(texts.values())
+    tokens = counter.count(context) if context else 0
+    return {
+        "context": context,
+        "docs": [docs[position] for position in texts],
+        "stats": {
+            "tokens": tokens,
+            "tokens_unpacked": tokens_unpacked,
+            "tokens_saved": max(0, tokens_unpacked - tokens),
+            "documents": len(texts),
+            "dropped": len(docs) - len(texts),
+            "truncated": truncated,
+            "tokenizer": counter.name,
+        },
+    }
@@ -1,21 +1,128 @@
 from __future__ import annotations
 
-from typing import Any, Optional, Sequence
+import csv
+import io
+import json
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence, TypedDict
+
+from langchain_core.documents import Document
 
 from langchain_postgres.vectorstores import PGVector
 from config import Config
 import sqlalchemy as sa
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from db_pool import get_async_engine, get_engine
+from filters import MetadataFilter
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+# Tabela temporária usada pelo caminho de escrita em massa (COPY + merge)
+STAGING_TABLE_NAME = "rag_embedding_staging"
+
+# Versão do corpus por coleção: incrementada a cada ingestão, remoção de fonte ou limpeza.
+# Caches derivados do conteúdo (ex: `SemanticAnswerCache`) são válidos para uma única versão.
+CORPUS_VERSION_TABLE_NAME = "rag_corpus_version"
+
+# Configuração de busca textual do PostgreSQL (ex: 'portuguese', 'simple'); usada como literal no SQL
+FULLTEXT_CONFIG = Config.FULLTEXT_CONFIG if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", Config.FULLTEXT_CONFIG) else "simple"
+# Expressão do `tsvector` dos chunks: idêntica no índice GIN e nas consultas, para que o planner use o índice
+FULLTEXT_VECTOR_EXPR = f"to_tsvector('{FULLTEXT_CONFIG}'::regconfig, document)"
+FULLTEXT_INDEX_NAME = f"ix_rag_embedding_fts_{FULLTEXT_CONFIG.lower()}"
+
+# Página do chunk como número (NULL se ausente ou não numérica), para filtros por intervalo
+PAGE_EXPR = "CASE WHEN jsonb_typeof(cmetadata->'page') = 'number' THEN CAST(cmetadata->>'page' AS numeric) END"
+# Busca ANN filtrada só por páginas: vizinhos lidos do índice (k × fator) antes do filtro.
+# Se sobrarem menos de k, a busca é refeita de forma exata.
+FILTERED_ANN_OVERFETCH = 10
+MAX_FILTERED_ANN_CANDIDATES = 1000  # Limite de `hnsw.ef_search` no pgvector
+
+# Índices de suporte criados/verificados por `VectorStoreRepository.ensure_schema` (nome → DDL).
+# O índice de expressão cobre todos os filtros por fonte (`cmetadata->>'source'`) dentro da coleção;
+# o índice GIN atende a busca textual da recuperação híbrida (um por configuração de idioma).
+SCHEMA_INDEXES: dict[str, str] = {
+    "ix_rag_embedding_collection_source": (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_rag_embedding_collection_source "
+        "ON langchain_pg_embedding (collection_id, (cmetadata->>'source'))"
+    ),
+    FULLTEXT_INDEX_NAME: (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {FULLTEXT_INDEX_NAME} "
+        f"ON langchain_pg_embedding USING gin ({FULLTEXT_VECTOR_EXPR})"
+    ),
+}
+
+# Prefixo dos índices ANN (HNSW/IVFFlat) por coleção; o sufixo é o UUID da coleção
+ANN_INDEX_PREFIX = "ix_rag_ann_"
+ANN_METHODS = ("hnsw", "ivfflat")
+
+
+COLLECTION_UUID_QUERY = "SELECT uuid FROM langchain_pg_collection WHERE name = :name"
+
+ANN_INDEX_INFO_QUERY = """
+    SELECT c.relname, pg_get_indexdef(c.oid), pg_relation_size(c.oid), i.indisvalid
+    FROM pg_class c
+    JOIN pg_index i ON i.indexrelid = c.oid
+    WHERE c.relname = :name
+"""
+
+EMBEDDINGS_BY_IDS_QUERY = """
+    SELECT id, CAST(embedding AS real[])
+    FROM langchain_pg_embedding
+    WHERE collection_id = :collection_id AND id = ANY(:ids)
+"""
+
+
+class AnnIndexInfo(TypedDict):
+    name: str
+    method: str
+    dimension: int
+    size_bytes: int
+    valid: bool
+    build_seconds: Optional[float]
+
+
+# Fontes distintas via "loose index scan": cada passo da recursão é uma busca no índice
+# (collection_id, source) pela próxima fonte, em vez de agrupar todos os chunks da coleção.
+DISTINCT_SOURCES_CTE = """
+    WITH RECURSIVE col AS (
+        SELECT uuid FROM langchain_pg_collection WHERE name = :collection
+    ),
+    sources AS (
+        (
+            SELECT e.cmetadata->>'source' AS source
+            FROM langchain_pg_embedding e, col
+            WHERE e.collection_id = col.uuid AND e.cmetadata->>'source' IS NOT NULL
+            ORDER BY e.cmetadata->>'source'
+            LIMIT 1
+        )
+        UNION ALL
+        SELECT (
+            SELECT e.cmetadata->>'source'
+            FROM langchain_pg_embedding e, col
+            WHERE e.collection_id = col.uuid AND e.cmetadata->>'source' > s.source
+            ORDER BY e.cmetadata->>'source'
+            LIMIT 1
+        )
+        FROM sources s
+        WHERE s.source IS NOT NULL
+    )
+"""
+
 class VectorStoreRepository:
     """
     Repositório centralizado para operações no banco de dados vetorial (PGVector).
     Implementa o padrão Repository para abstrair o acesso aos dados.
     """
+
+    # Incrementado a cada criação/remoção de índice ANN no processo; invalida o
+    # `ann_index_info` em cache de todas as instâncias (ex: a de uma `SearchSession`)
+    _ann_generation: int = 0
     
     def __init__(self, embeddings: Optional[Any] = None) -> None:
         """
@@ -29,6 +136,11 @@ class VectorStoreRepository:
         self.embeddings: Optional[Any] = embeddings
         self._vector_store: Optional[PGVector] = None
         self._engine: Optional[Engine] = None
+        self._ann_info: Optional[AnnIndexInfo] = None
+        self._ann_info_generation: int = -1
+        self._corpus_table_ready: bool = False
+        # UUID da coleção (consultado na primeira busca; invalidado por `clear`)
+        self._collection_uuid_cache: Optional[str] = None
 
     @property
     def vector_store(self) -> PGVector:
@@ -52,7 +164,7 @@ class VectorStoreRepository:
             self._vector_store = PGVector(
                 embeddings=self.embeddings,
                 collection_name=Config.PG_VECTOR_COLLECTION_NAME,
-                connection=Config.DATABASE_URL,
+                connection=self.engine,
                 use_jsonb=True,
             )
         return self._vector_store
@@ -60,16 +172,144 @@ class VectorStoreRepository:
     @property
     def engine(self) -> Engine:
         """
-        Retorna o engine do SQLAlchemy, inicializando-o se necessário.
+        Retorna o engine do SQLAlchemy compartilhado pelo processo.
+
+        Todos os repositórios (e o `PGVector`) usam o mesmo pool de conexões
+        para `Config.DATABASE_URL` (ver `db_pool`).
 
         Returns:
             `sqlalchemy.engine.Engine` apontando para `Config.DATABASE_URL`.
         """
         if self._engine is None:
-            # Config.DATABASE_URL é Optional[str]; em runtime isso deve estar configurado.
-            self._engine = sa.create_engine(Config.DATABASE_URL)  # type: ignore[arg-type]
+            self._engine = get_engine()
         return self._engine
 
+    def missing_indexes(self) -> list[str]:
+        """
+        Lista os índices de suporte (`SCHEMA_INDEXES`) ausentes ou inválidos.
+
+        Um índice criado com `CONCURRENTLY` que falhou fica marcado como inválido e
+        não é usado pelo planner, por isso também é reportado como ausente.
+
+        Returns:
+            list: Nomes dos índices ausentes (todos, se o banco não puder ser consultado)
+        """
+        query = text("""
+            SELECT c.relname
+            FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = ANY(:names) AND i.indisvalid
+        """)
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {"names": list(SCHEMA_INDEXES)})
+                valid = {row[0] for row in result}
+                return [name for name in SCHEMA_INDEXES if name not in valid]
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao verificar índices: {e}")
+            return list(SCHEMA_INDEXES)
+        except Exception as e:
+            logger.error(f"Erro inesperado ao verificar índices: {e}")
+            return list(SCHEMA_INDEXES)
+
+    def ensure_schema(self) -> list[str]:
+        """
+        Cria os índices de suporte ausentes (`SCHEMA_INDEXES`).
+
+        Os índices são criados com `CREATE INDEX CONCURRENTLY` (fora de transação), para
+        não bloquear escritas em coleções grandes. Índices inválidos são recriados.
+        Requer que as tabelas do PGVector já existam.
+
+        Returns:
+            list: Nomes dos índices criados nesta chamada
+        """
+        created: list[str] = []
+        for name in self.missing_indexes():
+            try:
+                with self.engine.connect() as conn:
+                    conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                    logger.info(f"Criando índice de suporte: {name}")
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    conn.execute(text(SCHEMA_INDEXES[name]))
+                    created.append(name)
+            except sa.exc.SQLAlchemyError as e:
+                logger.error(f"Erro de banco de dados ao criar índice {name}: {e}")
+            except Exception as e:
+                logger.error(f"Erro inesperado ao criar índice {name}: {e}")
+        return created
+
+    def _bump_corpus_version(self, conn: sa.Connection) -> None:
+        """Incrementa a versão do corpus dentro da transação de `conn`."""
+        if not self._corpus_table_ready:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {CORPUS_VERSION_TABLE_NAME} (
+                    collection TEXT PRIMARY KEY,
+                    version BIGINT NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            self._corpus_table_ready = True
+        conn.execute(text(f"""
+            INSERT INTO {CORPUS_VERSION_TABLE_NAME} (collection, version)
+            VALUES (:collection, 1)
+            ON CONFLICT (collection) DO UPDATE
+            SET version = {CORPUS_VERSION_TABLE_NAME}.version + 1, updated_at = now()
+        """), {"collection": Config.PG_VECTOR_COLLECTION_NAME})
+
+    def bump_corpus_version(self) -> bool:
+        """
+        Registra que o conteúdo da coleção mudou (invalida caches de respostas).
+
+        `delete_by_source` e `clear` já incrementam a versão; a ingestão chama este
+        método ao concluir a gravação de cada fonte.
+
+        Returns:
+            bool: True se a versão foi incrementada, False em caso de erro
+        """
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    self._bump_corpus_version(conn)
+            return True
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao atualizar versão do corpus: {e}")
+            return False
+
+    @contextmanager
+    def deferred_saves(self) -> Iterator[None]:
+        """
+        Sem efeito no PGVector: cada escrita já é confirmada na sua transação.
+        Existe para manter a interface do `NumpyVectorRepository`.
+        """
+        yield
+
+    def corpus_version(self) -> Optional[int]:
+        """
+        Retorna a versão atual do corpus da coleção.
+
+        Returns:
+            int: Versão (0 se a coleção nunca foi alterada desde a criação da tabela),
+            ou None em caso de erro
+        """
+        query = text(f"""
+            SELECT COALESCE(
+                (SELECT version FROM {CORPUS_VERSION_TABLE_NAME} WHERE collection = :collection), 0
+            )
+        """)
+        try:
+            with self.engine.connect() as conn:
+                if not self._corpus_table_ready:
+                    exists = conn.execute(
+                        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": CORPUS_VERSION_TABLE_NAME}
+                    ).scalar()
+                    if not exists:
+                        return 0
+                    self._corpus_table_ready = True
+                return int(conn.execute(query, {"collection": Config.PG_VECTOR_COLLECTION_NAME}).scalar() or 0)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao ler versão do corpus: {e}")
+            return None
+
     def count(self) -> int:
         """
         Conta o número de documentos na coleção atual de forma eficiente via SQL.
@@ -108,11 +348,8 @@ class VectorStoreRepository:
         Returns:
             int: Número de fontes (0 se vazio ou erro)
         """
-        query = text("""
-            SELECT COUNT(DISTINCT e.cmetadata->>'source') 
-            FROM langchain_pg_embedding e
-            JOIN langchain_pg_collection c ON e.collection_id = c.uuid
-            WHERE c.name = :collection
+        query = text(DISTINCT_SOURCES_CTE + """
+            SELECT COUNT(*) FROM sources WHERE source IS NOT NULL
         """)
         
         try:
@@ -134,12 +371,8 @@ class VectorStoreRepository:
         Returns:
             list: Lista de nomes de arquivos/fontes
         """
-        query = text("""
-            SELECT DISTINCT e.cmetadata->>'source'
-            FROM langchain_pg_embedding e
-            JOIN langchain_pg_collection c ON e.collection_id = c.uuid
-            WHERE c.name = :collection
-            ORDER BY e.cmetadata->>'source'
+        query = text(DISTINCT_SOURCES_CTE + """
+            SELECT source FROM sources WHERE source IS NOT NULL
         """)
         
         try:
@@ -164,6 +397,7 @@ class VectorStoreRepository:
         Returns:
             bool: True se removido com sucesso, False caso contrário
         """
+        self._collection_uuid_cache = None
         try:
             # O PGVector tem um método para deletar a coleção, mas aqui queremos 
             # limpar apenas os documentos da coleção específica.
@@ -180,6 +414,7 @@ class VectorStoreRepository:
                     collection_uuid = result.scalar()
                     if collection_uuid:
                         conn.execute(query_delete, {"uuid": collection_uuid})
+                        self._bump_corpus_version(conn)
                         logger.info(f"Coleção '{Config.PG_VECTOR_COLLECTION_NAME}' limpa com sucesso.")
                         return True
             return False
@@ -202,8 +437,8 @@ class VectorStoreRepository:
         """
         query = text("""
             DELETE FROM langchain_pg_embedding 
-            WHERE cmetadata->>'source' = :source
-            AND collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+            WHERE collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+            AND cmetadata->>'source' = :source
         """)
         
         try:
@@ -215,6 +450,8 @@ class VectorStoreRepository:
                         "collection": Config.PG_VECTOR_COLLECTION_NAME
                     })
                     logger.info(f"Removidos {result.rowcount} chunks antigos de '{source}'.")
+                    if result.rowcount:
+                        self._bump_corpus_version(conn)
                     return True
         except sa.exc.SQLAlchemyError as e:
             logger.error(f"Erro de banco de dados ao deletar por fonte ({source}): {e}")
@@ -236,8 +473,8 @@ class VectorStoreRepository:
         query = text("""
             SELECT EXISTS (
                 SELECT 1 FROM langchain_pg_embedding 
-                WHERE cmetadata->>'source' = :source
-                AND collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+                WHERE collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+                AND cmetadata->>'source' = :source
             )
         """)
         try:
@@ -254,14 +491,994 @@ class VectorStoreRepository:
             logger.error(f"Erro inesperado ao verificar existência ({source}): {e}")
             return False
 
+    def get_source_chunks(self, source: str) -> Optional[dict[str, dict[str, Any]]]:
+        """
+        Retorna os IDs e metadados de todos os chunks já gravados de uma fonte.
+
+        Usado pela ingestão incremental para comparar os chunks novos com os existentes
+        sem ler os embeddings.
+
+        Args:
+            source (str): O caminho/nome do arquivo (metadata['source'])
+
+        Returns:
+            Dicionário id → metadados, ou None em caso de erro (para que o chamador
+            não confunda falha de leitura com fonte vazia).
+        """
+        query = text("""
+            SELECT id, cmetadata
+            FROM langchain_pg_embedding
+            WHERE collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+            AND cmetadata->>'source' = :source
+        """)
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {
+                    "source": source,
+                    "collection": Config.PG_VECTOR_COLLECTION_NAME
+                })
+                return {row[0]: dict(row[1] or {}) for row in result}
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao listar chunks da fonte ({source}): {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro inesperado ao listar chunks da fonte ({source}): {e}")
+            return None
+
+    def delete_by_ids(self, ids: Sequence[str]) -> int:
+        """
+        Remove chunks específicos da coleção atual.
+
+        Args:
+            ids: IDs dos chunks a remover
+
+        Returns:
+            int: Número de chunks removidos (0 se nada a remover ou erro)
+        """
+        if not ids:
+            return 0
+
+        query = text("""
+            DELETE FROM langchain_pg_embedding
+            WHERE id = ANY(:ids)
+            AND collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+        """)
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    result = conn.execute(query, {
+                        "ids": list(ids),
+                        "collection": Config.PG_VECTOR_COLLECTION_NAME
+                    })
+                    logger.info(f"Removidos {result.rowcount} chunks obsoletos.")
+                    return result.rowcount
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao deletar chunks por ID: {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Erro inesperado ao deletar chunks por ID: {e}")
+            return 0
+
+    def update_metadata(self, entries: dict[str, dict[str, Any]]) -> int:
+        """
+        Substitui apenas os metadados (JSONB) de chunks existentes, sem tocar nos embeddings.
+
+        Args:
+            entries: Dicionário id → novos metadados
+
+        Returns:
+            int: Número de chunks atualizados (0 se nada a atualizar ou erro)
+        """
+        if not entries:
+            return 0
+
+        query = text("""
+            UPDATE langchain_pg_embedding
+            SET cmetadata = CAST(:metadata AS jsonb)
+            WHERE id = :id
+            AND collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+        """)
+        rows = [
+            {"id": chunk_id, "metadata": json.dumps(meta), "collection": Config.PG_VECTOR_COLLECTION_NAME}
+            for chunk_id, meta in entries.items()
+        ]
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(query, rows)
+                    return len(rows)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao atualizar metadados: {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Erro inesperado ao atualizar metadados: {e}")
+            return 0
+
+    # === Índices ANN (pgvector) ===
+
+    def _collection_uuid(self, conn: sa.Connection) -> Optional[str]:
+        """
+        Retorna o UUID da coleção configurada (validado, seguro para uso literal no SQL).
+
+        O valor fica em cache na instância depois que a coleção existe; enquanto ela
+        não existir, cada chamada consulta o banco novamente.
+        """
+        if self._collection_uuid_cache is None:
+            value = conn.execute(text(COLLECTION_UUID_QUERY), {"name": Config.PG_VECTOR_COLLECTION_NAME}).scalar()
+            self._collection_uuid_cache = str(uuid.UUID(str(value))) if value else None
+        return self._collection_uuid_cache
+
+    @staticmethod
+    def _parse_ann_index_row(row: Any) -> AnnIndexInfo:
+        method = re.search(r"USING (\w+)", row[1])
+        dim = re.search(r"vector\((\d+)\)", row[1])
+        return {
+            "name": row[0],
+            "method": method.group(1) if method else "?",
+            "dimension": int(dim.group(1)) if dim else 0,
+            "size_bytes": int(row[2] or 0),
+            "valid": bool(row[3]),
+            "build_seconds": None,
+        }
+
+    @staticmethod
+    def _ann_index_name(collection_uuid: str) -> str:
+        return ANN_INDEX_PREFIX + collection_uuid.replace("-", "")[:24]
+
+    def embedding_dimension(self) -> Optional[int]:
+        """
+        Descobre a dimensão dos embeddings da coleção.
+
+        Usa um vetor já gravado; se a coleção estiver vazia, consulta o modelo de
+        embeddings (uma chamada ao provedor).
+
+        Returns:
+            int ou None: Dimensão dos vetores, ou None se não puder ser determinada
+        """
+        query = text("""
+            SELECT vector_dims(embedding)
+            FROM langchain_pg_embedding
+            WHERE collection_id = (SELECT uuid FROM langchain_pg_collection WHERE name = :collection)
+            LIMIT 1
+        """)
+        try:
+            with self.engine.connect() as conn:
+                dim = conn.execute(query, {"collection": Config.PG_VECTOR_COLLECTION_NAME}).scalar()
+                if dim:
+                    return int(dim)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao obter dimensão dos embeddings: {e}")
+            return None
+
+        if self.embeddings is not None:
+            return len(self.embeddings.embed_query("dimensão"))
+        return None
+
+    def ann_index_info(self, refresh: bool = False) -> Optional[AnnIndexInfo]:
+        """
+        Retorna informações do índice ANN da coleção, se existir.
+
+        O resultado fica em cache na instância (a busca consulta este método a cada
+        pergunta). Criar, reconstruir ou remover o índice por qualquer repositório do
+        processo invalida o cache; `refresh=True` força a consulta.
+
+        Args:
+            refresh: Ignora o valor em cache e consulta o catálogo novamente.
+
+        Returns:
+            `AnnIndexInfo` ou None se a coleção não tiver índice ANN
+        """
+        generation = VectorStoreRepository._ann_generation
+        if self._ann_info_generation == generation and not refresh:
+            return self._ann_info
+
+        info: Optional[AnnIndexInfo] = None
+        try:
+            with self.engine.connect() as conn:
+                collection_uuid = self._collection_uuid(conn)
+                if collection_uuid:
+                    row = conn.execute(
+                        text(ANN_INDEX_INFO_QUERY), {"name": self._ann_index_name(collection_uuid)}
+                    ).first()
+                    if row:
+                        info = self._parse_ann_index_row(row)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao consultar índice ANN: {e}")
+            return None
+
+        self._ann_info = info
+        self._ann_info_generation = generation
+        return info
+
+    def create_ann_index(
+        self,
+        method: str = "hnsw",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+    ) -> AnnIndexInfo:
+        """
+        Cria (ou substitui) o índice ANN da coleção configurada.
+
+        A coluna `embedding` do PGVector não tem dimensão fixa, então o índice é
+        parcial (apenas a coleção atual) sobre a expressão `embedding::vector(dim)`,
+        com a dimensão do modelo de embeddings e operador de cosseno (o mesmo do PGVector).
+        A construção usa `CREATE INDEX CONCURRENTLY` e não bloqueia escritas.
+
+        Args:
+            method: 'hnsw' ou 'ivfflat'.
+            m: Conexões por nó do HNSW.
+            ef_construction: Tamanho da lista de candidatos na construção do HNSW.
+            lists: Número de listas do IVFFlat (None = linhas/1000 até 1M, sqrt(linhas) acima).
+
+        Returns:
+            `AnnIndexInfo` com tamanho e tempo de construção.
+
+        Raises:
+            ValueError: Se o método for desconhecido, a coleção não existir ou a dimensão
+                não puder ser determinada.
+            sqlalchemy.exc.SQLAlchemyError: Em falhas de banco.
+        """
+        method = method.lower().strip()
+        if method not in ANN_METHODS:
+            raise ValueError(f"Método de índice desconhecido: '{method}'. Use 'hnsw' ou 'ivfflat'.")
+
+        dim = self.embedding_dimension()
+        if not dim:
+            raise ValueError("Não foi possível determinar a dimensão dos embeddings da coleção.")
+
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            collection_uuid = self._collection_uuid(conn)
+            if not collection_uuid:
+                raise ValueError(f"Coleção '{Config.PG_VECTOR_COLLECTION_NAME}' não existe no banco.")
+            name = self._ann_index_name(collection_uuid)
+
+            if method == "hnsw":
+                options = f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+            else:
+                if lists is None:
+                    rows = self.count()
+                    lists = max(10, rows // 1000) if rows <= 1_000_000 else int(rows ** 0.5)
+                options = f"WITH (lists = {int(lists)})"
+
+            logger.info(f"Construindo índice {method.upper()} ({dim} dimensões) para a coleção...")
+            start = time.perf_counter()
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"""
+                CREATE INDEX CONCURRENTLY {name}
+                ON langchain_pg_embedding
+                USING {method} ((CAST(embedding AS vector({dim}))) vector_cosine_ops)
+                {options}
+                WHERE collection_id = '{collection_uuid}'
+            """))
+            elapsed = time.perf_counter() - start
+
+        VectorStoreRepository._ann_generation += 1
+        info = self.ann_index_info(refresh=True)
+        if info is None:
+            raise ValueError("Índice criado, mas não encontrado no catálogo.")
+        info["build_seconds"] = elapsed
+        logger.info(f"Índice {name} construído em {elapsed:.2f}s ({info['size_bytes']} bytes).")
+        return info
+
+    def rebuild_ann_index(self) -> Optional[AnnIndexInfo]:
+        """
+        Reconstrói o índice ANN existente com `REINDEX CONCURRENTLY`.
+
+        Útil após grandes ingestões (em especial para IVFFlat, cujas listas são
+        calculadas a partir dos dados existentes na construção).
+
+        Returns:
+            `AnnIndexInfo` atualizado, ou None se não houver índice.
+        """
+        info = self.ann_index_info(refresh=True)
+        if info is None:
+            return None
+
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            start = time.perf_counter()
+            conn.execute(text(f"REINDEX INDEX CONCURRENTLY {info['name']}"))
+            elapsed = time.perf_counter() - start
+
+        VectorStoreRepository._ann_generation += 1
+        info = self.ann_index_info(refresh=True)
+        if info is not None:
+            info["build_seconds"] = elapsed
+        return info
+
+    def drop_ann_index(self) -> bool:
+        """
+        Remove o índice ANN da coleção (a busca volta a ser exata).
+
+        Returns:
+            bool: True se um índice foi removido, False se não havia índice
+        """
+        info = self.ann_index_info(refresh=True)
+        if info is None:
+            return False
+
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {info['name']}"))
+
+        VectorStoreRepository._ann_generation += 1
+        self.ann_index_info(refresh=True)
+        return True
+
+    # === Busca vetorial ===
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca os `k` chunks mais próximos da pergunta (distância de cosseno).
+
+        Args:
+            query: Texto da pergunta (vetorizado com `self.embeddings`).
+            k: Número de documentos a retornar.
+            ef_search: `hnsw.ef_search` para esta consulta (None usa `Config.HNSW_EF_SEARCH`).
+            probes: `ivfflat.probes` para esta consulta (None usa `Config.IVFFLAT_PROBES`).
+            metadata_filter: Restringe a busca a fontes/páginas (opcional).
+
+        Returns:
+            Lista de `(Document, distância)`, da mais próxima para a mais distante.
+        """
+        if self.embeddings is None:
+            raise ValueError("Embeddings não fornecidos. Necessário para operações de Vector Store.")
+        return self.similarity_search_by_vector_with_score(
+            self.embeddings.embed_query(query), k=k, ef_search=ef_search, probes=probes,
+            metadata_filter=metadata_filter,
+        )
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca os `k` chunks mais próximos de um vetor já calculado.
+
+        Se a coleção tiver índice ANN válido, a consulta usa a mesma expressão do índice
+        (`embedding::vector(dim)`) e o literal da coleção do índice parcial, e aplica
+        `ef_search`/`probes` com `SET LOCAL` (apenas nesta transação). Sem índice, a
+        busca é exata (varredura sequencial), equivalente à do PGVector.
+
+        Com `metadata_filter`, o filtro entra no WHERE: por fonte, a busca é exata sobre
+        as linhas das fontes pedidas; só por páginas, o índice ANN continua em uso com
+        mais candidatos (ver `_vector_search_sql`).
+
+        Args:
+            embedding: Vetor da consulta.
+            k: Número de documentos a retornar.
+            ef_search: `hnsw.ef_search` para esta consulta.
+            probes: `ivfflat.probes` para esta consulta.
+            metadata_filter: Restringe a busca a fontes (caminhos gravados em `source`) e páginas.
+
+        Returns:
+            Lista de `(Document, distância)`, da mais próxima para a mais distante.
+        """
+        rows = self._vector_search_rows(embedding, k, ef_search, probes, metadata_filter)
+        return [self._scored_document(row) for row in rows]
+
+    def similarity_search_with_embeddings(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float, list[float]]]:
+        """
+        Igual a `similarity_search_by_vector_with_score`, trazendo também o embedding
+        gravado de cada chunk na mesma consulta (ex: para MMR sem vetorizar de novo).
+
+        Returns:
+            Lista de `(Document, distância, embedding)`, da mais próxima para a mais distante.
+        """
+        rows = self._vector_search_rows(embedding, k, ef_search, probes, metadata_filter, with_embeddings=True)
+        return [(*self._scored_document(row), list(row[4])) for row in rows]
+
+    def _vector_search_rows(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+        metadata_filter: Optional[MetadataFilter],
+        with_embeddings: bool = False,
+    ) -> list[Any]:
+        if metadata_filter is not None and metadata_filter.get("sources") == []:
+            return []
+        vector_literal = "[" + ",".join(repr(float(v)) for v in embedding) + "]"
+        info = self.ann_index_info()
+        filter_clause, filter_params = self._filter_sql(metadata_filter)
+
+        with self.engine.connect() as conn:
+            with conn.begin():
+                collection_uuid = self._collection_uuid(conn)
+                if not collection_uuid:
+                    return []
+
+                use_ann = self._ann_usable(info, len(embedding), metadata_filter)
+                settings, query = self._vector_search_sql(
+                    info, len(embedding), collection_uuid, ef_search, probes, filter_clause, with_embeddings,
+                    k=k, exact=not use_ann,
+                )
+                for statement in settings:
+                    conn.execute(text(statement))
+                params = {"embedding": vector_literal, "k": k, **filter_params}
+                rows = list(conn.execute(text(query), params))
+                if use_ann and filter_clause and len(rows) < k:
+                    # Poucas linhas das páginas pedidas entre os vizinhos do índice
+                    _, query = self._vector_search_sql(
+                        info, len(embedding), collection_uuid, ef_search, probes, filter_clause, with_embeddings,
+                        exact=True,
+                    )
+                    rows = list(conn.execute(text(query), params))
+                return rows
+
+    def get_embeddings_by_ids(self, ids: Sequence[str]) -> dict[str, list[float]]:
+        """
+        Lê os embeddings gravados de chunks específicos.
+
+        Args:
+            ids: IDs dos chunks (ex: resultados da busca textual, que não trazem o vetor).
+
+        Returns:
+            Dicionário `id -> embedding`; IDs inexistentes ficam de fora (vazio em caso de erro).
+        """
+        if not ids:
+            return {}
+        try:
+            with self.engine.connect() as conn:
+                collection_uuid = self._collection_uuid(conn)
+                if not collection_uuid:
+                    return {}
+                result = conn.execute(text(EMBEDDINGS_BY_IDS_QUERY), {"collection_id": collection_uuid, "ids": list(ids)})
+                return {row[0]: list(row[1]) for row in result}
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao ler embeddings: {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"Erro inesperado ao ler embeddings: {e}")
+            return {}
+
+    @staticmethod
+    def _scored_document(row: Any) -> tuple[Document, float]:
+        """Converte uma linha (document, cmetadata, score, id) em `(Document, score)`."""
+        return Document(id=row[3], page_content=row[0] or "", metadata=dict(row[1] or {})), float(row[2])
+
+    @staticmethod
+    def _filter_sql(metadata_filter: Optional[MetadataFilter]) -> tuple[str, dict[str, Any]]:
+        """
+        Converte um `MetadataFilter` em condições adicionais do WHERE.
+
+        As fontes usam `cmetadata->>'source' = ANY(...)`, a mesma expressão do índice
+        `(collection_id, (cmetadata->>'source'))`: o planner lê só as linhas das fontes pedidas.
+
+        Returns:
+            Tupla (trecho SQL iniciado por `AND`, ou vazio; parâmetros nomeados).
+        """
+        if not metadata_filter:
+            return "", {}
+
+        clauses: list[str] = []
+        params: dict[str, Any] = {}
+        if "sources" in metadata_filter:
+            clauses.append("cmetadata->>'source' = ANY(:filter_sources)")
+            params["filter_sources"] = list(metadata_filter["sources"])
+        if "page_min" in metadata_filter:
+            clauses.append(f"{PAGE_EXPR} >= :filter_page_min")
+            params["filter_page_min"] = int(metadata_filter["page_min"])
+        if "page_max" in metadata_filter:
+            clauses.append(f"{PAGE_EXPR} <= :filter_page_max")
+            params["filter_page_max"] = int(metadata_filter["page_max"])
+        return "".join(f"\n            AND {clause}" for clause in clauses), params
+
+    @staticmethod
+    def _lexical_search_sql(collection_uuid: str, filter_clause: str = "") -> str:
+        """
+        Monta a busca textual: os termos da pergunta são combinados com OU e os chunks
+        são ordenados por `ts_rank_cd` (mais termos e mais próximos = maior score).
+        """
+        return f"""
+            SELECT document, cmetadata, ts_rank_cd({FULLTEXT_VECTOR_EXPR}, query) AS rank, id
+            FROM langchain_pg_embedding,
+                 CAST(replace(CAST(plainto_tsquery('{FULLTEXT_CONFIG}'::regconfig, :query) AS text), ' & ', ' | ') AS tsquery) AS query
+            WHERE collection_id = '{collection_uuid}'
+            AND {FULLTEXT_VECTOR_EXPR} @@ query{filter_clause}
+            ORDER BY rank DESC
+            LIMIT :k
+        """
+
+    def lexical_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca textual (full-text do PostgreSQL) sobre o conteúdo dos chunks.
+
+        Complementa a busca vetorial em termos exatos (códigos, números, nomes de
+        empresas) que os embeddings nem sempre aproximam. Usa o índice GIN de
+        `SCHEMA_INDEXES` quando existe (criado por `ensure_schema`).
+
+        Args:
+            query: Texto da pergunta.
+            k: Número de documentos a retornar.
+            metadata_filter: Restringe a busca a fontes/páginas (opcional).
+
+        Returns:
+            Lista de `(Document, rank)`, do maior para o menor rank; vazia em caso de erro.
+        """
+        if metadata_filter is not None and metadata_filter.get("sources") == []:
+            return []
+        filter_clause, filter_params = self._filter_sql(metadata_filter)
+        try:
+            with self.engine.connect() as conn:
+                collection_uuid = self._collection_uuid(conn)
+                if not collection_uuid:
+                    return []
+                result = conn.execute(
+                    text(self._lexical_search_sql(collection_uuid, filter_clause)),
+                    {"query": query, "k": k, **filter_params},
+                )
+                return [self._scored_document(row) for row in result]
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados na busca textual: {e}")
+            return []
+        except Exception as e:
+            logger.error(f"Erro inesperado na busca textual: {e}")
+            return []
+
+    @staticmethod
+    def _ann_usable(
+        info: Optional[AnnIndexInfo], dimension: int, metadata_filter: Optional[MetadataFilter] = None
+    ) -> bool:
+        """
+        Indica se a busca vetorial pode usar o índice ANN da coleção.
+
+        Filtros por fonte são seletivos e lidos pelo índice `ix_rag_embedding_collection_source`:
+        a busca exata sobre as linhas das fontes pedidas é barata e não perde resultados.
+        Filtros só por páginas atingem todos os documentos e continuam usando o índice ANN.
+        """
+        if metadata_filter and metadata_filter.get("sources"):
+            return False
+        return info is not None and info["valid"] and info["dimension"] == dimension
+
+    @staticmethod
+    def _vector_search_sql(
+        info: Optional[AnnIndexInfo],
+        dimension: int,
+        collection_uuid: str,
+        ef_search: Optional[int],
+        probes: Optional[int],
+        filter_clause: str = "",
+        with_embeddings: bool = False,
+        k: int = Config.TOP_K,
+        exact: bool = False,
+    ) -> tuple[list[str], str]:
+        """
+        Monta a busca vetorial: comandos `SET LOCAL` do índice e o SELECT ordenado por distância.
+
+        Com índice ANN e filtro, o índice só devolve os vizinhos globais e o filtro aplicado
+        depois deles pode deixar menos de `k` resultados. Por isso a consulta lê
+        `k * FILTERED_ANN_OVERFETCH` candidatos do índice (com `hnsw.ef_search` ao menos
+        igual) e filtra depois; quem chama refaz a busca com `exact=True` se faltarem
+        linhas. Com `exact` (ex: filtro por fonte), a busca é exata sobre as linhas filtradas.
+
+        Com `with_embeddings`, a consulta traz uma quinta coluna com o embedding (`real[]`).
+
+        Returns:
+            Tupla (comandos de configuração, consulta com parâmetros `:embedding` e `:k`).
+        """
+        settings: list[str] = []
+        vector_column = ", CAST(embedding AS real[]) AS vector" if with_embeddings else ""
+        if exact or not VectorStoreRepository._ann_usable(info, dimension):
+            return settings, f"""
+            SELECT document, cmetadata, embedding <=> CAST(:embedding AS vector) AS distance, id{vector_column}
+            FROM langchain_pg_embedding
+            WHERE collection_id = '{collection_uuid}'{filter_clause}
+            ORDER BY distance
+            LIMIT :k
+        """
+
+        candidates = min(max(k, 1) * FILTERED_ANN_OVERFETCH, MAX_FILTERED_ANN_CANDIDATES) if filter_clause else 0
+        vector_expr = f"CAST(embedding AS vector({info['dimension']}))"
+        query_expr = f"CAST(:embedding AS vector({info['dimension']}))"
+        if info["method"] == "hnsw":
+            settings.append(f"SET LOCAL hnsw.ef_search = {max(int(ef_search or Config.HNSW_EF_SEARCH), candidates)}")
+        elif info["method"] == "ivfflat":
+            settings.append(f"SET LOCAL ivfflat.probes = {int(probes or Config.IVFFLAT_PROBES)}")
+
+        query = f"""
+            SELECT document, cmetadata, {vector_expr} <=> {query_expr} AS distance, id{vector_column}
+            FROM langchain_pg_embedding
+            WHERE collection_id = '{collection_uuid}'
+            ORDER BY distance
+            LIMIT {candidates or ':k'}
+        """
+        if filter_clause:
+            query = f"""
+            SELECT * FROM ({query}) AS candidates
+            WHERE TRUE{filter_clause}
+            ORDER BY distance
+            LIMIT :k
+        """
+        return settings, query
+
+    # === Caminho assíncrono ===
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """
+        Retorna o engine assíncrono compartilhado do event loop atual (ver `db_pool`).
+
+        Returns:
+            `sqlalchemy.ext.asyncio.AsyncEngine` apontando para `Config.DATABASE_URL`.
+        """
+        return get_async_engine()
+
+    async def _acollection_uuid(self, conn: AsyncConnection) -> Optional[str]:
+        """Versão assíncrona de `_collection_uuid` (compartilha o mesmo cache da instância)."""
+        if self._collection_uuid_cache is None:
+            result = await conn.execute(text(COLLECTION_UUID_QUERY), {"name": Config.PG_VECTOR_COLLECTION_NAME})
+            value = result.scalar()
+            self._collection_uuid_cache = str(uuid.UUID(str(value))) if value else None
+        return self._collection_uuid_cache
+
+    async def aann_index_info(self) -> Optional[AnnIndexInfo]:
+        """
+        Versão assíncrona de `ann_index_info` (compartilha o mesmo cache da instância).
+
+        Returns:
+            `AnnIndexInfo` ou None se a coleção não tiver índice ANN
+        """
+        generation = VectorStoreRepository._ann_generation
+        if self._ann_info_generation == generation:
+            return self._ann_info
+
+        info: Optional[AnnIndexInfo] = None
+        try:
+            async with self.async_engine.connect() as conn:
+                collection_uuid = await self._acollection_uuid(conn)
+                if collection_uuid:
+                    result = await conn.execute(
+                        text(ANN_INDEX_INFO_QUERY), {"name": self._ann_index_name(collection_uuid)}
+                    )
+                    row = result.first()
+                    if row:
+                        info = self._parse_ann_index_row(row)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao consultar índice ANN: {e}")
+            return None
+
+        self._ann_info = info
+        self._ann_info_generation = generation
+        return info
+
+    async def acorpus_version(self) -> Optional[int]:
+        """
+        Versão assíncrona de `corpus_version`.
+
+        Returns:
+            int: Versão atual do corpus, ou None em caso de erro
+        """
+        try:
+            async with self.async_engine.connect() as conn:
+                exists = (await conn.execute(
+                    text("SELECT to_regclass(:name) IS NOT NULL"), {"name": CORPUS_VERSION_TABLE_NAME}
+                )).scalar()
+                if not exists:
+                    return 0
+                result = await conn.execute(
+                    text(f"SELECT version FROM {CORPUS_VERSION_TABLE_NAME} WHERE collection = :collection"),
+                    {"collection": Config.PG_VECTOR_COLLECTION_NAME},
+                )
+                return int(result.scalar() or 0)
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao ler versão do corpus: {e}")
+            return None
+
+    async def asimilarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Versão assíncrona de `similarity_search_by_vector_with_score` (mesma SQL e
+        mesmo uso do índice ANN), executada no engine assíncrono.
+
+        Args:
+            embedding: Vetor da consulta.
+            k: Número de documentos a retornar.
+            ef_search: `hnsw.ef_search` para esta consulta.
+            probes: `ivfflat.probes` para esta consulta.
+            metadata_filter: Restringe a busca a fontes/páginas (opcional).
+
+        Returns:
+            Lista de `(Document, distância)`, da mais próxima para a mais distante.
+        """
+        rows = await self._avector_search_rows(embedding, k, ef_search, probes, metadata_filter)
+        return [self._scored_document(row) for row in rows]
+
+    async def asimilarity_search_with_embeddings(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float, list[float]]]:
+        """Versão assíncrona de `similarity_search_with_embeddings`."""
+        rows = await self._avector_search_rows(embedding, k, ef_search, probes, metadata_filter, with_embeddings=True)
+        return [(*self._scored_document(row), list(row[4])) for row in rows]
+
+    async def _avector_search_rows(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+        metadata_filter: Optional[MetadataFilter],
+        with_embeddings: bool = False,
+    ) -> list[Any]:
+        if metadata_filter is not None and metadata_filter.get("sources") == []:
+            return []
+        vector_literal = "[" + ",".join(repr(float(v)) for v in embedding) + "]"
+        info = await self.aann_index_info()
+        filter_clause, filter_params = self._filter_sql(metadata_filter)
+
+        async with self.async_engine.connect() as conn:
+            async with conn.begin():
+                collection_uuid = await self._acollection_uuid(conn)
+                if not collection_uuid:
+                    return []
+
+                use_ann = self._ann_usable(info, len(embedding), metadata_filter)
+                settings, query = self._vector_search_sql(
+                    info, len(embedding), collection_uuid, ef_search, probes, filter_clause, with_embeddings,
+                    k=k, exact=not use_ann,
+                )
+                for statement in settings:
+                    await conn.execute(text(statement))
+                params = {"embedding": vector_literal, "k": k, **filter_params}
+                rows = list(await conn.execute(text(query), params))
+                if use_ann and filter_clause and len(rows) < k:
+                    # Poucas linhas das páginas pedidas entre os vizinhos do índice
+                    _, query = self._vector_search_sql(
+                        info, len(embedding), collection_uuid, ef_search, probes, filter_clause, with_embeddings,
+                        exact=True,
+                    )
+                    rows = list(await conn.execute(text(query), params))
+                return rows
+
+    async def aget_embeddings_by_ids(self, ids: Sequence[str]) -> dict[str, list[float]]:
+        """
+        Versão assíncrona de `get_embeddings_by_ids`.
+
+        Returns:
+            Dicionário `id -> embedding`; vazio em caso de erro.
+        """
+        if not ids:
+            return {}
+        try:
+            async with self.async_engine.connect() as conn:
+                collection_uuid = await self._acollection_uuid(conn)
+                if not collection_uuid:
+                    return {}
+                result = await conn.execute(
+                    text(EMBEDDINGS_BY_IDS_QUERY), {"collection_id": collection_uuid, "ids": list(ids)}
+                )
+                return {row[0]: list(row[1]) for row in result}
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados ao ler embeddings: {e}")
+            return {}
+
+    async def alexical_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Versão assíncrona de `lexical_search_with_score`.
+
+        Returns:
+            Lista de `(Document, rank)`, do maior para o menor rank; vazia em caso de erro.
+        """
+        if metadata_filter is not None and metadata_filter.get("sources") == []:
+            return []
+        filter_clause, filter_params = self._filter_sql(metadata_filter)
+        try:
+            async with self.async_engine.connect() as conn:
+                collection_uuid = await self._acollection_uuid(conn)
+                if not collection_uuid:
+                    return []
+                result = await conn.execute(
+                    text(self._lexical_search_sql(collection_uuid, filter_clause)),
+                    {"query": query, "k": k, **filter_params},
+                )
+                return [self._scored_document(row) for row in result]
+        except sa.exc.SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados na busca textual: {e}")
+            return []
+
     def add_documents(self, documents: Sequence[Any], ids: Optional[Sequence[str]] = None) -> Any:
         """Adiciona documentos ao vector store."""
         return self.vector_store.as_upsert().add_documents(documents, ids=ids) if hasattr(self.vector_store, 'as_upsert') else self.vector_store.add_documents(documents, ids=ids)
 
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[list[float]],
+        metadatas: Sequence[dict[str, Any]],
+        ids: Sequence[str],
+    ) -> Any:
+        """
+        Adiciona textos cujos embeddings já foram calculados, sem nova chamada ao provedor.
+
+        Permite separar a geração de embeddings (que pode rodar em paralelo) da escrita
+        no banco, que permanece sequencial e ordenada.
+
+        Args:
+            texts: Conteúdo textual de cada chunk.
+            embeddings: Vetores correspondentes a cada texto.
+            metadatas: Metadados (JSONB) de cada chunk.
+            ids: IDs determinísticos de cada chunk (upsert por ID).
+
+        Returns:
+            Lista de IDs persistidos, conforme retornado pelo `PGVector`.
+        """
+        return self.vector_store.add_embeddings(
+            texts=list(texts),
+            embeddings=list(embeddings),
+            metadatas=list(metadatas),
+            ids=list(ids),
+        )
+
+    def bulk_add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[list[float]],
+        metadatas: Sequence[dict[str, Any]],
+        ids: Sequence[str],
+    ) -> int:
+        """
+        Grava muitos chunks de uma vez via `COPY` para uma tabela temporária + merge único.
+
+        Caminho alternativo ao `add_embeddings` (INSERTs do ORM por lote) para ingestões
+        grandes:
+
+        1. cria a tabela temporária `rag_embedding_staging` (descartada no commit);
+        2. envia IDs, textos, embeddings (`real[]`) e metadados (JSONB) com `COPY`
+           — formato binário com psycopg 3, CSV com psycopg2;
+        3. faz o merge em `langchain_pg_embedding` com um único
+           `INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE`.
+
+        Tudo ocorre em uma transação: ou o lote inteiro é gravado, ou nada é.
+
+        Args:
+            texts: Conteúdo textual de cada chunk.
+            embeddings: Vetores correspondentes a cada texto.
+            metadatas: Metadados (JSONB) de cada chunk.
+            ids: IDs de cada chunk (upsert por ID).
+
+        Returns:
+            int: Número de linhas inseridas ou atualizadas.
+
+        Raises:
+            ValueError: Se a coleção configurada ainda não existir.
+            sqlalchemy.exc.SQLAlchemyError: Em falhas de banco (a transação é desfeita).
+        """
+        if not ids:
+            return 0
+
+        rows = list(zip(ids, texts, embeddings, metadatas))
+
+        with self.engine.begin() as conn:
+            collection_uuid = conn.execute(
+                text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+                {"name": Config.PG_VECTOR_COLLECTION_NAME},
+            ).scalar()
+            if collection_uuid is None:
+                raise ValueError(f"Coleção '{Config.PG_VECTOR_COLLECTION_NAME}' não existe no banco.")
+
+            conn.execute(text(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE_NAME} (
+                    id VARCHAR NOT NULL,
+                    document TEXT,
+                    embedding REAL[] NOT NULL,
+                    cmetadata JSONB
+                ) ON COMMIT DROP
+            """))
+
+            self._copy_rows(conn, rows)
+
+            # DISTINCT ON evita atualizar a mesma linha duas vezes no mesmo comando
+            result = conn.execute(text(f"""
+                INSERT INTO langchain_pg_embedding (id, collection_id, embedding, document, cmetadata)
+                SELECT DISTINCT ON (s.id) s.id, :collection_uuid, CAST(s.embedding AS vector), s.document, s.cmetadata
+                FROM {STAGING_TABLE_NAME} s
+                ON CONFLICT (id) DO UPDATE SET
+                    collection_id = EXCLUDED.collection_id,
+                    embedding = EXCLUDED.embedding,
+                    document = EXCLUDED.document,
+                    cmetadata = EXCLUDED.cmetadata
+            """), {"collection_uuid": collection_uuid})
+
+            logger.debug(f"Escrita em massa: {result.rowcount} chunks gravados via COPY.")
+            return result.rowcount
+
+    @staticmethod
+    def _copy_rows(conn: sa.Connection, rows: Sequence[tuple[str, str, list[float], dict[str, Any]]]) -> None:
+        """Envia as linhas para a tabela temporária via COPY, conforme o driver em uso."""
+        columns = f"{STAGING_TABLE_NAME} (id, document, embedding, cmetadata)"
+        cursor = conn.connection.cursor()
+        try:
+            if hasattr(cursor, "copy"):
+                # psycopg 3: COPY binário, sem serialização textual dos vetores
+                from psycopg.types.json import Jsonb
+
+                with cursor.copy(f"COPY {columns} FROM STDIN (FORMAT BINARY)") as copy:
+                    copy.set_types(["varchar", "text", "float4[]", "jsonb"])
+                    for chunk_id, document, vector, meta in rows:
+                        copy.write_row((chunk_id, document, [float(v) for v in vector], Jsonb(meta)))
+            else:
+                # psycopg2: COPY em CSV a partir de um buffer em memória
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for chunk_id, document, vector, meta in rows:
+                    writer.writerow((
+                        chunk_id,
+                        document,
+                        "{" + ",".join(repr(float(v)) for v in vector) + "}",
+                        json.dumps(meta),
+                    ))
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {columns} FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
     def as_retriever(self, **kwargs: Any) -> Any:
         """Retorna o vector store como um retriever."""
         return self.vector_store.as_retriever(**kwargs)
 
+def get_repository(embeddings: Optional[Any] = None) -> Any:
+    """
+    Cria o repositório do backend vetorial configurado (`Config.VECTOR_BACKEND`).
+
+    Args:
+        embeddings: Modelo de embeddings (opcional, como em `VectorStoreRepository`).
+
+    Returns:
+        `VectorStoreRepository` (PGVector) ou `NumpyVectorRepository` (em memória);
+        ambos expõem a mesma interface usada pela ingestão, busca e comandos do chat.
+
+    Examples:
+        >>> from database import get_repository
+        >>> get_repository().count()
+        1234
+    """
+    if Config.VECTOR_BACKEND == "numpy":
+        from numpy_store import NumpyVectorRepository
+        return NumpyVectorRepository(embeddings)
+    return VectorStoreRepository(embeddings)
+
 # Funções de compatibilidade (Legacy) para não quebrar o código existente imediatamente
 def get_vector_store(embeddings: Any) -> PGVector:
     repo = VectorStoreRepository(embeddings)
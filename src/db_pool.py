@@ -0,0 +1,317 @@
+"""
+Módulo Manager de Engines do Banco de Dados
+
+Mantém um único `Engine` do SQLAlchemy (e portanto um único pool de conexões) por
+`DATABASE_URL` no processo. O `VectorStoreRepository`, o `PGVector` e o cache de
+embeddings compartilham esse pool em vez de abrir um novo a cada repositório criado.
+
+Também coleta métricas do pool (latência de checkout e utilização) para dimensioná-lo
+sob carga.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Optional, TypedDict
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from config import Config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolStats(TypedDict):
+    size: int
+    max_overflow: int
+    checked_out: int
+    overflow: int
+    peak_checked_out: int
+    utilization: float
+    checkouts: int
+    avg_checkout_ms: float
+    max_checkout_ms: float
+    timeouts: int
+
+
+class TimedQueuePool(QueuePool):
+    """
+    `QueuePool` que mede o tempo de espera de cada checkout.
+
+    O tempo inclui a espera por uma conexão livre e, quando o pool ainda não está
+    cheio, a abertura de uma conexão nova (handshake TCP/TLS + autenticação).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts: int = 0
+        self.timeouts: int = 0
+        self.total_checkout_seconds: float = 0.0
+        self.max_checkout_seconds: float = 0.0
+        self.peak_checked_out: int = 0
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except sa.exc.TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        elapsed = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.total_checkout_seconds += elapsed
+            self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+            self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return record
+
+    def stats(self) -> PoolStats:
+        """
+        Retorna um retrato das métricas do pool.
+
+        Returns:
+            `PoolStats` com ocupação atual, pico e latência de checkout.
+        """
+        capacity = self.size() + max(self._max_overflow, 0)
+        checked_out = self.checkedout()
+        with self._metrics_lock:
+            checkouts = self.checkouts
+            avg = self.total_checkout_seconds / checkouts if checkouts else 0.0
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": checked_out,
+                "overflow": max(self.overflow(), 0),
+                "peak_checked_out": self.peak_checked_out,
+                "utilization": checked_out / capacity if capacity else 0.0,
+                "checkouts": checkouts,
+                "avg_checkout_ms": avg * 1000,
+                "max_checkout_ms": self.max_checkout_seconds * 1000,
+                "timeouts": self.timeouts,
+            }
+
+
+def async_database_url(url: str) -> str:
+    """
+    Converte uma URL do PostgreSQL para o driver assíncrono (psycopg 3).
+
+    Args:
+        url: URL síncrona (ex: `postgresql://...` ou `postgresql+psycopg2://...`).
+
+    Returns:
+        URL com o driver `postgresql+psycopg`, que suporta asyncio.
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2", "postgres"):
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed.render_as_string(hide_password=False)
+
+
+class EngineManager:
+    """
+    Registro de engines compartilhados, um por URL de banco.
+    """
+    _engines: dict[str, Engine] = {}
+    _async_engines: dict[str, tuple[asyncio.AbstractEventLoop, AsyncEngine]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_engine(cls, url: Optional[str] = None) -> Engine:
+        """
+        Retorna o engine compartilhado para a URL, criando-o se necessário.
+
+        Args:
+            url: URL do banco (default: `Config.DATABASE_URL`).
+
+        Returns:
+            `sqlalchemy.engine.Engine` com pool `TimedQueuePool`.
+
+        Raises:
+            ValueError: Se nenhuma URL estiver configurada.
+
+        Examples:
+            >>> from db_pool import get_engine
+            >>> get_engine() is get_engine()
+            True
+        """
+        url = url or Config.DATABASE_URL
+        if not url:
+            raise ValueError("DATABASE_URL não configurada no .env")
+
+        engine = cls._engines.get(url)
+        if engine is not None:
+            return engine
+
+        with cls._lock:
+            engine = cls._engines.get(url)
+            if engine is None:
+                logger.info(
+                    f"Criando pool de conexões (size={Config.DB_POOL_SIZE}, "
+                    f"overflow={Config.DB_MAX_OVERFLOW}, recycle={Config.DB_POOL_RECYCLE}s)"
+                )
+                engine = sa.create_engine(
+                    url,
+                    poolclass=TimedQueuePool,
+                    pool_size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_MAX_OVERFLOW,
+                    pool_recycle=Config.DB_POOL_RECYCLE,
+                    pool_pre_ping=Config.DB_POOL_PRE_PING,
+                    pool_timeout=Config.DB_POOL_TIMEOUT,
+                )
+                cls._engines[url] = engine
+        return engine
+
+    @classmethod
+    def get_async_engine(cls, url: Optional[str] = None) -> AsyncEngine:
+        """
+        Retorna o engine assíncrono compartilhado para a URL e o event loop atuais.
+
+        As conexões de um `AsyncEngine` pertencem ao event loop em que foram abertas;
+        um novo engine é criado quando o chamador está em outro loop (ex: chamadas
+        sucessivas a `asyncio.run`), e o pool do loop anterior é fechado.
+
+        Args:
+            url: URL do banco (default: `Config.DATABASE_URL`).
+
+        Returns:
+            `AsyncEngine` com os mesmos limites de pool do engine síncrono.
+
+        Raises:
+            ValueError: Se nenhuma URL estiver configurada.
+            RuntimeError: Se chamado fora de um event loop.
+        """
+        url = url or Config.DATABASE_URL
+        if not url:
+            raise ValueError("DATABASE_URL não configurada no .env")
+
+        loop = asyncio.get_running_loop()
+        entry = cls._async_engines.get(url)
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+
+        with cls._lock:
+            entry = cls._async_engines.get(url)
+            if entry is None or entry[0] is not loop:
+                logger.info(f"Criando pool de conexões assíncrono (size={Config.DB_POOL_SIZE})")
+                engine = create_async_engine(
+                    async_database_url(url),
+                    pool_size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_MAX_OVERFLOW,
+                    pool_recycle=Config.DB_POOL_RECYCLE,
+                    pool_pre_ping=Config.DB_POOL_PRE_PING,
+                    pool_timeout=Config.DB_POOL_TIMEOUT,
+                )
+                if entry is not None:
+                    # O engine do loop anterior (ex: `asyncio.run` já encerrado) não será mais usado
+                    cls._dispose_async_engine(*entry)
+                entry = (loop, engine)
+                cls._async_engines[url] = entry
+        return entry[1]
+
+    @staticmethod
+    def _dispose_async_engine(loop: asyncio.AbstractEventLoop, engine: AsyncEngine) -> None:
+        """
+        Fecha o pool de um engine assíncrono no event loop dono das suas conexões.
+
+        Com o loop ainda ativo, `engine.dispose()` é agendado nele. Com o loop já
+        encerrado, as conexões não podem mais ser fechadas de forma assíncrona: o
+        pool apenas as descarta (`close=False`) e os sockets são liberados com elas.
+        """
+        if loop.is_running():
+            try:
+                current: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+            except RuntimeError:
+                current = None
+            if current is loop:
+                loop.create_task(engine.dispose())
+            else:
+                asyncio.run_coroutine_threadsafe(engine.dispose(), loop)
+            return
+        engine.sync_engine.dispose(close=False)
+
+    @classmethod
+    def pool_stats(cls, url: Optional[str] = None) -> Optional[PoolStats]:
+        """
+        Retorna as métricas do pool da URL, ou None se o engine ainda não foi criado.
+
+        Args:
+            url: URL do banco (default: `Config.DATABASE_URL`).
+        """
+        engine = cls._engines.get(url or Config.DATABASE_URL or "")
+        if engine is None or not isinstance(engine.pool, TimedQueuePool):
+            return None
+        return engine.pool.stats()
+
+    @classmethod
+    def release_inherited(cls) -> None:
+        """
+        Descarta, sem fechar, as conexões herdadas de um processo pai via `fork()`.
+
+        Deve ser chamado no início de processos filhos (ex: `initializer` de um
+        `ProcessPoolExecutor`): fechar os sockets herdados encerraria as conexões
+        que o processo pai ainda está usando.
+        """
+        for engine in list(cls._engines.values()):
+            engine.dispose(close=False)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Fecha todos os pools e esvazia o registro.
+        Útil após `fork()` ou quando a URL do banco muda em tempo de execução.
+        """
+        logger.debug("Resetando engines compartilhados")
+        with cls._lock:
+            for engine in cls._engines.values():
+                engine.dispose()
+            for loop, async_engine in cls._async_engines.values():
+                cls._dispose_async_engine(loop, async_engine)
+            cls._engines.clear()
+            cls._async_engines.clear()
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    Função de conveniência para obter o engine compartilhado.
+
+    Args:
+        url: URL do banco (default: `Config.DATABASE_URL`).
+
+    Returns:
+        Engine compartilhado pelo processo.
+    """
+    return EngineManager.get_engine(url)
+
+
+def get_async_engine(url: Optional[str] = None) -> AsyncEngine:
+    """
+    Função de conveniência para obter o engine assíncrono compartilhado.
+
+    Args:
+        url: URL do banco (default: `Config.DATABASE_URL`).
+
+    Returns:
+        `AsyncEngine` do event loop atual.
+    """
+    return EngineManager.get_async_engine(url)
+
+
+def get_pool_stats(url: Optional[str] = None) -> Optional[PoolStats]:
+    """
+    Função de conveniência para obter as métricas do pool compartilhado.
+
+    Args:
+        url: URL do banco (default: `Config.DATABASE_URL`).
+
+    Returns:
+        `PoolStats`, ou None se nenhuma conexão foi aberta ainda.
+    """
+    return EngineManager.pool_stats(url)
@@ -0,0 +1,220 @@
+"""
+Módulo de Diversificação dos Resultados da Busca
+
+Com `CHUNK_OVERLAP` > 0, chunks vizinhos de uma mesma página costumam aparecer
+juntos no top-k e repetem boa parte do texto no contexto da LLM. Depois da busca,
+os candidatos passam por:
+
+1. MMR (Maximal Marginal Relevance) sobre a matriz de embeddings dos candidatos,
+   já gravados no banco (nenhum trecho é vetorizado de novo), descartando também
+   os quase-duplicados (similaridade de cosseno a partir de `DEDUP_THRESHOLD`);
+2. junção dos chunks selecionados que são consecutivos (`chunk_index`) na mesma
+   fonte e página, removendo o trecho sobreposto.
+
+Todos os cálculos de similaridade são vetorizados com NumPy: uma multiplicação
+de matrizes para as similaridades entre candidatos e uma atualização de vetor
+por documento selecionado.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import Config
+
+
+# Prefixo do chunk seguinte procurado no fim do anterior para encontrar a sobreposição
+OVERLAP_PROBE_CHARS = 20
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def mmr_select(
+    query: Sequence[float],
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7,
+    dedup_threshold: float = 1.0,
+    preserve_order: bool = False,
+) -> list[int]:
+    """
+    Seleciona até `k` candidatos por Maximal Marginal Relevance.
+
+    A cada passo escolhe o candidato que maximiza
+    `lambda * relevância - (1 - lambda) * max(similaridade com os já escolhidos)`.
+    Candidatos com similaridade `>= dedup_threshold` com algum escolhido são descartados.
+
+    Args:
+        query: Embedding da pergunta.
+        candidates: Matriz (n, dim) com os embeddings dos candidatos, na ordem da busca.
+        k: Número máximo de candidatos a selecionar.
+        lambda_mult: Peso da relevância (1.0 = só relevância; 0.0 = só diversidade).
+        dedup_threshold: Similaridade de cosseno a partir da qual um candidato é duplicado.
+        preserve_order: Se True, a relevância é a posição na lista recebida (ex: ordem
+            da fusão RRF), não a similaridade com a pergunta.
+
+    Returns:
+        Índices dos candidatos selecionados, na ordem de seleção.
+
+    Examples:
+        >>> import numpy as np
+        >>> vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]])
+        >>> mmr_select([1.0, 0.0], vectors, k=2, dedup_threshold=0.98)
+        [0, 2]
+    """
+    n = candidates.shape[0]
+    if n == 0 or k <= 0:
+        return []
+
+    normalized = _normalize(np.asarray(candidates, dtype=np.float32))
+    if preserve_order:
+        relevance = np.linspace(1.0, 0.0, num=n, endpoint=False, dtype=np.float32)
+    else:
+        relevance = normalized @ _normalize(np.asarray(query, dtype=np.float32))
+    similarity = normalized @ normalized.T
+
+    selected: list[int] = []
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    for _ in range(min(k, n)):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores = np.where(available, scores, -np.inf)
+        best = int(np.argmax(scores))
+        if not available[best]:
+            break
+        selected.append(best)
+        available[best] = False
+        available &= similarity[best] < dedup_threshold
+        redundancy = similarity[best].copy() if len(selected) == 1 else np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def overlap_length(previous: str, following: str) -> int:
+    """
+    Tamanho (em caracteres) do trecho final de `previous` repetido no início de `following`.
+
+    Returns:
+        0 se não houver sobreposição de pelo menos `OVERLAP_PROBE_CHARS` caracteres.
+
+    Examples:
+        >>> overlap_length("o faturamento anual da empresa foi", "anual da empresa foi de R$ 10 mi")
+        20
+    """
+    probe = following[:OVERLAP_PROBE_CHARS]
+    if len(probe) < OVERLAP_PROBE_CHARS:
+        return 0
+    start = previous.find(probe, max(0, len(previous) - len(following)))
+    while start != -1:
+        if following.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+def _merge_text(previous: str, following: str) -> str:
+    """Concatena dois chunks consecutivos sem repetir o trecho sobreposto."""
+    overlap = overlap_length(previous, following)
+    return previous + following[overlap:] if overlap else previous + "\n" + following
+
+
+def merge_adjacent_chunks(docs: Sequence[Document]) -> list[Document]:
+    """
+    Junta chunks consecutivos (`chunk_index`) da mesma fonte e página em um único documento.
+
+    Os chunks são divididos página a página na ingestão, então só há sobreposição
+    entre vizinhos da mesma página. O documento combinado ocupa a posição do seu
+    chunk mais relevante e mantém o `id` e os metadados do primeiro chunk da sequência.
+
+    Args:
+        docs: Documentos selecionados, do mais para o menos relevante.
+
+    Returns:
+        Documentos com as sequências consecutivas combinadas, na ordem de relevância.
+    """
+    def run_key(doc: Document) -> Optional[tuple[str, object]]:
+        if not isinstance(doc.metadata.get("chunk_index"), int) or doc.metadata.get("source") is None:
+            return None
+        return doc.metadata["source"], doc.metadata.get("page")
+
+    groups: dict[tuple[str, object], list[int]] = {}
+    for position, doc in enumerate(docs):
+        key = run_key(doc)
+        if key is not None:
+            groups.setdefault(key, []).append(position)
+
+    # Sequências de chunks consecutivos (posições na lista recebida, em ordem de chunk_index)
+    runs: list[list[int]] = []
+    for positions in groups.values():
+        positions.sort(key=lambda p: docs[p].metadata["chunk_index"])
+        runs.append([positions[0]])
+        for position in positions[1:]:
+            if docs[position].metadata["chunk_index"] == docs[runs[-1][-1]].metadata["chunk_index"] + 1:
+                runs[-1].append(position)
+            else:
+                runs.append([position])
+
+    # Posição do chunk mais relevante da sequência -> documento combinado
+    merged_at: dict[int, Document] = {}
+    absorbed: set[int] = set()
+    for run in runs:
+        if len(run) < 2:
+            continue
+        first = docs[run[0]]
+        content = first.page_content
+        for member in run[1:]:
+            content = _merge_text(content, docs[member].page_content)
+        metadata = dict(first.metadata)
+        metadata["merged_chunks"] = len(run)
+        merged_at[min(run)] = Document(id=first.id, page_content=content, metadata=metadata)
+        absorbed.update(p for p in run if p != min(run))
+
+    return [merged_at.get(position, doc) for position, doc in enumerate(docs) if position not in absorbed]
+
+
+def diversify_documents(
+    query: Sequence[float],
+    docs: Sequence[Document],
+    embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: Optional[float] = None,
+    dedup_threshold: Optional[float] = None,
+    merge_adjacent: Optional[bool] = None,
+    preserve_order: bool = False,
+) -> list[Document]:
+    """
+    Reduz os candidatos da busca a `k` documentos diversos, sem duplicados.
+
+    Args:
+        query: Embedding da pergunta.
+        docs: Candidatos, do mais para o menos relevante.
+        embeddings: Embeddings gravados dos candidatos, na mesma ordem.
+        k: Número de documentos a retornar (antes da junção de chunks adjacentes).
+        lambda_mult: Peso da relevância no MMR (None usa `Config.MMR_LAMBDA`).
+        dedup_threshold: Limiar de quase-duplicata (None usa `Config.DEDUP_THRESHOLD`).
+        merge_adjacent: Junta chunks consecutivos (None usa `Config.MERGE_ADJACENT_CHUNKS`).
+        preserve_order: Usa a ordem recebida como relevância (ex: busca híbrida).
+
+    Returns:
+        Até `k` documentos (menos, se houver junções ou duplicados), na ordem de seleção.
+    """
+    if not docs:
+        return []
+
+    selected = mmr_select(
+        query,
+        np.asarray(embeddings, dtype=np.float32),
+        k,
+        lambda_mult=Config.MMR_LAMBDA if lambda_mult is None else lambda_mult,
+        dedup_threshold=Config.DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold,
+        preserve_order=preserve_order,
+    )
+    chosen = [docs[i] for i in selected]
+    if Config.MERGE_ADJACENT_CHUNKS if merge_adjacent is None else merge_adjacent:
+        chosen = merge_adjacent_chunks(chosen)
+    return chosen
@@ -0,0 +1,550 @@
+"""
+Módulo de Cache Persistente de Embeddings
+
+Armazena embeddings no PostgreSQL endereçados pelo conteúdo do chunk, de modo que
+re-ingestões de texto idêntico não voltem a chamar o provedor.
+A chave é (provedor, modelo de embedding, SHA-256 do texto).
+
+Também fornece o cache de embeddings de perguntas (`CachedQueryEmbeddings`): um nível
+LRU em memória, com tamanho máximo e TTL, na frente de um nível persistente opcional
+compartilhado entre processos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generic, Hashable, Optional, Sequence, TypedDict, TypeVar
+
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import Config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_TABLE_NAME = "rag_embedding_cache"
+
+# Sufixo do modelo nas entradas de perguntas: provedores como o Google geram vetores
+# diferentes para documentos e consultas (task_type), então as chaves não se misturam.
+# "v2": o modo em lote gravava vetores de documento com o sufixo anterior
+QUERY_MODEL_SUFFIX = "#query:v2"
+
+# task_type de consultas no lote do Google (`embed_documents(..., task_type=...)`)
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class QueryCacheStats(TypedDict):
+    memory_hits: int
+    persistent_hits: int
+    misses: int
+    size: int
+    last: Optional[str]
+
+
+def content_hash(content: str) -> str:
+    """
+    Calcula o hash SHA-256 (hexadecimal) de um texto.
+
+    Args:
+        content: Texto do chunk.
+
+    Returns:
+        Hash hexadecimal de 64 caracteres.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza o texto de uma pergunta para uso como chave de cache.
+
+    Aplica NFC, minúsculas e colapsa espaços, de modo que "Qual o faturamento?"
+    e "  qual o  faturamento? " compartilhem a mesma entrada.
+
+    Args:
+        query: Pergunta do usuário.
+
+    Returns:
+        Texto normalizado.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query)).strip().lower()
+
+
+def embed_queries_batch(embeddings: Any, queries: list[str]) -> list[list[float]]:
+    """
+    Vetoriza várias perguntas com o tipo de tarefa de consulta.
+
+    `embed_documents` não serve: no Google ele gera vetores do tipo documento, que não
+    podem ser usados na busca nem gravados com `QUERY_MODEL_SUFFIX`. Se o lote do
+    provedor aceita `task_type`, as perguntas vão em uma chamada com `QUERY_TASK_TYPE`;
+    caso contrário, `embed_query` é chamado por pergunta em até
+    `Config.BATCH_CONCURRENCY` threads.
+
+    Args:
+        embeddings: Modelo de embeddings original.
+        queries: Perguntas.
+
+    Returns:
+        Vetores na mesma ordem de `queries`.
+    """
+    if not queries:
+        return []
+    try:
+        accepts_task_type = "task_type" in inspect.signature(embeddings.embed_documents).parameters
+    except (TypeError, ValueError):
+        accepts_task_type = False
+    if accepts_task_type:
+        return embeddings.embed_documents(queries, task_type=QUERY_TASK_TYPE)
+    if len(queries) == 1:
+        return [embeddings.embed_query(queries[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(len(queries), Config.BATCH_CONCURRENCY))) as executor:
+        return list(executor.map(embeddings.embed_query, queries))
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Cache LRU em memória, seguro para threads, com tamanho máximo e TTL opcional.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float = 0) -> None:
+        """
+        Args:
+            max_size: Número máximo de entradas (as menos usadas saem primeiro).
+            ttl_seconds: Validade de cada entrada em segundos (0 = sem expiração).
+        """
+        self.max_size: int = max(1, max_size)
+        self.ttl_seconds: float = ttl_seconds
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        """Retorna o valor da chave (e o marca como recém-usado), ou None se ausente/expirado."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        """Armazena o valor, removendo as entradas menos usadas acima de `max_size`."""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove todas as entradas."""
+        with self._lock:
+            self._data.clear()
+
+
+class EmbeddingCache:
+    """
+    Armazenamento persistente de embeddings em uma tabela do PostgreSQL.
+
+    Falhas de banco nunca interrompem a ingestão: leituras com erro são tratadas
+    como cache miss e escritas com erro são apenas registradas no log.
+    """
+
+    def __init__(self, engine: Engine, provider: str, model: str) -> None:
+        """
+        Inicializa o cache para um par (provedor, modelo).
+
+        Args:
+            engine: Engine do SQLAlchemy (normalmente `VectorStoreRepository.engine`).
+            provider: Nome do provedor ('google' ou 'openai').
+            model: Nome do modelo de embedding.
+        """
+        self.engine: Engine = engine
+        self.provider: str = provider
+        self.model: str = model
+        self._schema_ready: bool = False
+
+    def ensure_schema(self) -> bool:
+        """
+        Cria a tabela do cache se ainda não existir.
+
+        Returns:
+            bool: True se a tabela está disponível, False em caso de erro
+        """
+        if self._schema_ready:
+            return True
+
+        query = text(f"""
+            CREATE TABLE IF NOT EXISTS {CACHE_TABLE_NAME} (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedding REAL[] NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (provider, model, content_hash)
+            )
+        """)
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(query)
+            self._schema_ready = True
+            return True
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Cache de embeddings indisponível (erro ao criar tabela): {e}")
+            return False
+
+    def get_many(self, hashes: Sequence[str]) -> dict[str, list[float]]:
+        """
+        Busca embeddings já armazenados.
+
+        Args:
+            hashes: Hashes de conteúdo a consultar.
+
+        Returns:
+            Dicionário hash → embedding apenas para os hashes encontrados.
+        """
+        if not hashes or not self.ensure_schema():
+            return {}
+
+        query = text(f"""
+            SELECT content_hash, embedding
+            FROM {CACHE_TABLE_NAME}
+            WHERE provider = :provider
+            AND model = :model
+            AND content_hash = ANY(:hashes)
+        """)
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {
+                    "provider": self.provider,
+                    "model": self.model,
+                    "hashes": list(set(hashes)),
+                })
+                return {row[0]: list(row[1]) for row in result}
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Erro ao consultar cache de embeddings: {e}")
+            return {}
+
+    def put_many(self, entries: dict[str, list[float]]) -> None:
+        """
+        Armazena novos embeddings (entradas existentes são mantidas).
+
+        Args:
+            entries: Dicionário hash → embedding.
+        """
+        if not entries or not self.ensure_schema():
+            return
+
+        query = text(f"""
+            INSERT INTO {CACHE_TABLE_NAME} (provider, model, content_hash, embedding)
+            VALUES (:provider, :model, :content_hash, CAST(:embedding AS REAL[]))
+            ON CONFLICT (provider, model, content_hash) DO NOTHING
+        """)
+        rows = [
+            {
+                "provider": self.provider,
+                "model": self.model,
+                "content_hash": key,
+                "embedding": [float(v) for v in vector],
+            }
+            for key, vector in entries.items()
+        ]
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(query, rows)
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Erro ao gravar no cache de embeddings: {e}")
+
+
+class CachedEmbeddings:
+    """
+    Envoltório de um modelo de embeddings que consulta o `EmbeddingCache` antes do provedor.
+
+    Apenas os textos ausentes do cache são enviados ao provedor, em uma única chamada
+    por lote. Os contadores de hits/misses são seguros para uso a partir das threads
+    do pool de ingestão.
+    """
+
+    def __init__(self, embeddings: Any, cache: EmbeddingCache) -> None:
+        """
+        Args:
+            embeddings: Modelo de embeddings original (Google ou OpenAI).
+            cache: Cache persistente para o provedor/modelo em uso.
+        """
+        self.embeddings: Any = embeddings
+        self.cache: EmbeddingCache = cache
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fração de textos servidos pelo cache (0.0 se nada foi consultado)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Gera embeddings para uma lista de textos, reaproveitando o cache.
+
+        Args:
+            texts: Textos a vetorizar.
+
+        Returns:
+            Lista de embeddings na mesma ordem de `texts`.
+        """
+        hashes = [content_hash(t) for t in texts]
+        cached = self.cache.get_many(hashes)
+
+        # Textos repetidos dentro do lote são enviados ao provedor uma única vez
+        missing: dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, query: str) -> list[float]:
+        """Delega ao modelo original (consultas não passam pelo cache de ingestão)."""
+        return self.embeddings.embed_query(query)
+
+
+class CachedQueryEmbeddings:
+    """
+    Envoltório de um modelo de embeddings que cacheia os vetores das perguntas.
+
+    `embed_query` consulta primeiro o LRU em memória e depois, se configurado, o
+    `EmbeddingCache` persistente (compartilhado entre processos); só em caso de
+    falha nos dois chama o provedor. `embed_documents` é delegado sem cache.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        memory: LRUCache[str, list[float]],
+        persistent: Optional[EmbeddingCache] = None,
+    ) -> None:
+        """
+        Args:
+            embeddings: Modelo de embeddings original (Google ou OpenAI).
+            memory: Nível LRU em memória.
+            persistent: Nível persistente opcional (modelo com sufixo `QUERY_MODEL_SUFFIX`).
+        """
+        self.embeddings: Any = embeddings
+        self.memory: LRUCache[str, list[float]] = memory
+        self.persistent: Optional[EmbeddingCache] = persistent
+        self.memory_hits: int = 0
+        self.persistent_hits: int = 0
+        self.misses: int = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def stats(self) -> QueryCacheStats:
+        """
+        Retorna os contadores do cache.
+
+        `last` indica como a última pergunta desta thread foi atendida:
+        'memória', 'banco' ou 'provedor'.
+        """
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "size": len(self.memory),
+            "last": getattr(self._local, "last", None),
+        }
+
+    def _count(self, tier: str) -> None:
+        self._local.last = tier
+        with self._lock:
+            if tier == "memória":
+                self.memory_hits += 1
+            elif tier == "banco":
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+
+    def embed_query(self, query: str) -> list[float]:
+        """
+        Gera (ou recupera do cache) o embedding de uma pergunta.
+
+        Args:
+            query: Pergunta do usuário.
+
+        Returns:
+            Vetor da pergunta.
+        """
+        key = content_hash(normalize_query(query))
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self._count("memória")
+            return vector
+
+        if self.persistent is not None:
+            vector = self.persistent.get_many([key]).get(key)
+            if vector is not None:
+                self.memory.put(key, vector)
+                self._count("banco")
+                return vector
+
+        vector = self.embeddings.embed_query(query)
+        self.memory.put(key, vector)
+        if self.persistent is not None:
+            self.persistent.put_many({key: vector})
+        self._count("provedor")
+        return vector
+
+    async def aembed_query(self, query: str) -> list[float]:
+        """
+        Versão assíncrona de `embed_query`.
+
+        O nível persistente é consultado em uma thread (`asyncio.to_thread`), para não
+        bloquear o event loop; o provedor é chamado via `aembed_query`.
+
+        Args:
+            query: Pergunta do usuário.
+
+        Returns:
+            Vetor da pergunta.
+        """
+        key = content_hash(normalize_query(query))
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self._count("memória")
+            return vector
+
+        if self.persistent is not None:
+            vector = (await asyncio.to_thread(self.persistent.get_many, [key])).get(key)
+            if vector is not None:
+                self.memory.put(key, vector)
+                self._count("banco")
+                return vector
+
+        vector = await self.embeddings.aembed_query(query)
+        self.memory.put(key, vector)
+        if self.persistent is not None:
+            await asyncio.to_thread(self.persistent.put_many, {key: vector})
+        self._count("provedor")
+        return vector
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        Gera (ou recupera do cache) os embeddings de várias perguntas de uma vez.
+
+        Usado no modo em lote: o nível persistente é consultado em uma única ida ao
+        banco e as perguntas restantes são vetorizadas como consultas por
+        `embed_queries_batch` (nunca com `embed_documents`, cujos vetores não podem
+        ser gravados com `QUERY_MODEL_SUFFIX`).
+
+        Args:
+            queries: Perguntas, em qualquer ordem (repetições são calculadas uma vez).
+
+        Returns:
+            Vetores na mesma ordem de `queries`.
+        """
+        keys = [content_hash(normalize_query(q)) for q in queries]
+        found: dict[str, list[float]] = {}
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is not None:
+                found[key] = vector
+        memory_hits = len(found)
+
+        if self.persistent is not None:
+            pending = list({key for key in keys if key not in found})
+            if pending:
+                stored = self.persistent.get_many(pending)
+                for key, vector in stored.items():
+                    self.memory.put(key, vector)
+                found.update(stored)
+        persistent_hits = len(found) - memory_hits
+
+        missing: dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            if key not in found and key not in missing:
+                missing[key] = query
+
+        if missing:
+            vectors = embed_queries_batch(self.embeddings, list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            for key, vector in fresh.items():
+                self.memory.put(key, vector)
+            if self.persistent is not None:
+                self.persistent.put_many(fresh)
+            found.update(fresh)
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.persistent_hits += persistent_hits
+            self.misses += len(missing)
+
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Delega ao modelo original (documentos usam o cache de ingestão)."""
+        return self.embeddings.embed_documents(texts)
+
+
+def build_cached_embeddings(embeddings: Any, engine: Engine) -> CachedEmbeddings:
+    """
+    Cria o envoltório com cache para o provedor/modelo ativos.
+
+    Args:
+        embeddings: Modelo de embeddings original.
+        engine: Engine do SQLAlchemy usado para persistir o cache.
+
+    Returns:
+        `CachedEmbeddings` com chave (`Config.PROVIDER`, `Config.EMBEDDING_MODEL`).
+    """
+    return CachedEmbeddings(embeddings, EmbeddingCache(engine, Config.PROVIDER, Config.EMBEDDING_MODEL))
+
+
+def build_query_cached_embeddings(embeddings: Any, engine: Optional[Engine] = None) -> CachedQueryEmbeddings:
+    """
+    Cria o envoltório de cache de perguntas para o provedor/modelo ativos.
+
+    Args:
+        embeddings: Modelo de embeddings original.
+        engine: Engine para o nível persistente (None desativa o nível persistente).
+
+    Returns:
+        `CachedQueryEmbeddings` com LRU de `Config.QUERY_CACHE_SIZE` entradas e
+        TTL de `Config.QUERY_CACHE_TTL` segundos.
+    """
+    memory: LRUCache[str, list[float]] = LRUCache(Config.QUERY_CACHE_SIZE, Config.QUERY_CACHE_TTL)
+    persistent = None
+    if engine is not None:
+        persistent = EmbeddingCache(engine, Config.PROVIDER, Config.EMBEDDING_MODEL + QUERY_MODEL_SUFFIX)
+    return CachedQueryEmbeddings(embeddings, memory, persistent)
@@ -19,6 +19,7 @@ class EmbeddingsManager:
     Gerencia a instância do modelo de embeddings.
     """
     _instance: Optional[Any] = None
+    _query_instance: Optional[Any] = None
 
     @classmethod
     def reset(cls) -> None:
@@ -28,6 +29,35 @@ class EmbeddingsManager:
         """
         logger.debug("Resetando instância de EmbeddingsManager")
         cls._instance = None
+        cls._query_instance = None
+
+    @classmethod
+    def get_query_embeddings(cls) -> Any:
+        """
+        Retorna o modelo de embeddings com cache de perguntas na frente.
+
+        O cache (LRU em memória + nível persistente opcional) é único no processo,
+        de modo que todas as sessões de busca compartilham os vetores já calculados.
+        Com `Config.QUERY_CACHE_SIZE = 0`, retorna o modelo sem cache.
+
+        Returns:
+            `CachedQueryEmbeddings` (ou o modelo original, se o cache estiver desativado).
+
+        Raises:
+            ValueError: Se nenhuma API key estiver configurada em `Config`.
+        """
+        if Config.QUERY_CACHE_SIZE <= 0:
+            return cls.get_embeddings()
+
+        if cls._query_instance is None:
+            from embedding_cache import build_query_cached_embeddings
+
+            engine = None
+            if Config.QUERY_CACHE_PERSISTENT and Config.DATABASE_URL:
+                from db_pool import get_engine
+                engine = get_engine()
+            cls._query_instance = build_query_cached_embeddings(cls.get_embeddings(), engine)
+        return cls._query_instance
 
     @classmethod
     def get_embeddings(cls) -> Any:
@@ -113,3 +143,16 @@ def get_embeddings() -> Any:
         ValueError: Se nenhuma API key estiver configurada.
     """
     return EmbeddingsManager.get_embeddings()
+
+
+def get_query_embeddings() -> Any:
+    """
+    Função de conveniência para obter o modelo de embeddings com cache de perguntas.
+
+    Returns:
+        `CachedQueryEmbeddings` compartilhado pelo processo (ou o modelo original).
+
+    Raises:
+        ValueError: Se nenhuma API key estiver configurada.
+    """
+    return EmbeddingsManager.get_query_embeddings()
@@ -0,0 +1,274 @@
+"""
+Módulo de Filtros de Metadados da Recuperação
+
+Restringe a busca a documentos e páginas específicos. O filtro é aplicado dentro
+da consulta (cláusula WHERE sobre `cmetadata` no PGVector, máscara sobre a matriz
+no backend NumPy), antes da ordenação por similaridade: os `top_k` resultados vêm
+todos dos documentos pedidos, em vez de serem filtrados depois da busca.
+
+Formas de informar o filtro:
+
+- argumentos `sources`/`pages` de `search_with_sources` (ou `metadata_filter` de `SearchSession.ask`);
+- flags `--source` e `--pages` do `chat.py`;
+- na própria pergunta: `in:relatorio.pdf`, `in:"Relatório 2024.pdf"`, `pag:3-7`.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Optional, Sequence, TypedDict
+
+
+class MetadataFilter(TypedDict, total=False):
+    sources: list[str]
+    page_min: int
+    page_max: int
+
+
+# Filtros embutidos na pergunta: in:<arquivo> (com aspas se tiver espaços) e pag:<intervalo>
+INLINE_FILTER_PATTERN = re.compile(
+    r'(?<!\S)(?P<key>in|p[aá]g(?:inas?)?|pages?):(?:"(?P<quoted>[^"]+)"|(?P<value>\S+))',
+    re.IGNORECASE,
+)
+
+# Parte do nome do arquivo (último critério de `resolve_sources`): tamanho mínimo do nome informado
+MIN_PARTIAL_SOURCE_LENGTH = 3
+
+
+class AmbiguousSourceError(ValueError):
+    """Nome de arquivo parcial que corresponde a mais de um documento da base."""
+
+    def __init__(self, name: str, candidates: Sequence[str]) -> None:
+        self.name = name
+        self.candidates = list(candidates)
+        listed = ", ".join(self.candidates[:5])
+        if len(self.candidates) > 5:
+            listed += f" e mais {len(self.candidates) - 5}"
+        super().__init__(f"'{name}' corresponde a vários documentos ({listed}); informe o nome completo do arquivo")
+
+
+def parse_page_range(value: str) -> tuple[Optional[int], Optional[int]]:
+    """
+    Interpreta um intervalo de páginas.
+
+    As páginas seguem a numeração gravada no metadado `page` (a mesma exibida nas fontes).
+
+    Args:
+        value: `"5"`, `"3-7"`, `"3-"` (da 3 em diante) ou `"-7"` (até a 7).
+
+    Returns:
+        Tupla (mínima, máxima); None indica intervalo aberto.
+
+    Raises:
+        ValueError: Se o intervalo for inválido.
+
+    Examples:
+        >>> parse_page_range("3-7")
+        (3, 7)
+        >>> parse_page_range("5")
+        (5, 5)
+    """
+    match = re.fullmatch(r"\s*(\d*)\s*(-?)\s*(\d*)\s*", value or "")
+    if not match or not (match.group(1) or match.group(3)):
+        raise ValueError(f"Intervalo de páginas inválido: '{value}' (use 5, 3-7, 3- ou -7)")
+
+    start = int(match.group(1)) if match.group(1) else None
+    end = int(match.group(3)) if match.group(3) else None
+    if not match.group(2):
+        if end is not None:
+            raise ValueError(f"Intervalo de páginas inválido: '{value}' (use 5, 3-7, 3- ou -7)")
+        end = start
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"Intervalo de páginas invertido: '{value}'")
+    return start, end
+
+
+def build_filter(
+    sources: Optional[Sequence[str]] = None,
+    pages: Optional[str] = None,
+) -> Optional[MetadataFilter]:
+    """
+    Monta um `MetadataFilter` a partir de fontes e de um intervalo de páginas.
+
+    Args:
+        sources: Caminhos gravados em `source` ou apenas nomes de arquivo (resolvidos pela sessão).
+        pages: Intervalo de páginas (ver `parse_page_range`).
+
+    Returns:
+        Filtro, ou None se nenhum critério foi informado.
+
+    Raises:
+        ValueError: Se o intervalo de páginas for inválido.
+    """
+    metadata_filter: MetadataFilter = {}
+    if sources:
+        metadata_filter["sources"] = [s for s in sources if s]
+    if pages:
+        start, end = parse_page_range(pages)
+        if start is not None:
+            metadata_filter["page_min"] = start
+        if end is not None:
+            metadata_filter["page_max"] = end
+    return metadata_filter or None
+
+
+def parse_inline_filters(question: str) -> tuple[str, Optional[MetadataFilter]]:
+    """
+    Extrai os filtros escritos na pergunta (`in:<arquivo>`, `pag:<intervalo>`).
+
+    Args:
+        question: Pergunta do usuário.
+
+    Returns:
+        Tupla (pergunta sem os filtros, filtro ou None). Um `pag:` inválido é
+        mantido no texto da pergunta.
+
+    Examples:
+        >>> parse_inline_filters('Qual o lucro? in:balanco.pdf pag:3-5')
+        ('Qual o lucro?', {'sources': ['balanco.pdf'], 'page_min': 3, 'page_max': 5})
+    """
+    sources: list[str] = []
+    pages: Optional[str] = None
+
+    def consume(match: re.Match[str]) -> str:
+        nonlocal pages
+        value = match.group("quoted") or match.group("value")
+        if match.group("key").lower() == "in":
+            sources.append(value)
+            return ""
+        try:
+            parse_page_range(value)
+        except ValueError:
+            return match.group(0)
+        pages = value
+        return ""
+
+    cleaned = INLINE_FILTER_PATTERN.sub(consume, question)
+    if not sources and pages is None:
+        return question, None
+    return re.sub(r"\s{2,}", " ", cleaned).strip(), build_filter(sources, pages)
+
+
+def resolve_sources(names: Sequence[str], known_sources: Sequence[str]) -> list[str]:
+    """
+    Converte nomes informados pelo usuário nos caminhos gravados em `source`.
+
+    Para cada nome, vale o primeiro critério que encontrar alguma fonte: caminho
+    exato; nome do arquivo (com ou sem `.pdf`, sem diferenciar maiúsculas); início
+    de uma palavra do nome do arquivo, para nomes com ao menos
+    `MIN_PARTIAL_SOURCE_LENGTH` caracteres e um único arquivo correspondente.
+
+    Args:
+        names: Caminhos ou nomes de arquivo (ex: `relatorio.pdf`, `relatorio`).
+        known_sources: Fontes existentes na coleção (`list_sources()`).
+
+    Returns:
+        Caminhos encontrados, sem repetição; vazio se nenhum nome corresponder.
+
+    Raises:
+        AmbiguousSourceError: Se uma parte do nome corresponder a arquivos diferentes.
+
+    Examples:
+        >>> resolve_sources(["balanco"], ["/docs/balanco.pdf", "/docs/dre.pdf"])
+        ['/docs/balanco.pdf']
+        >>> resolve_sources(["2024"], ["/docs/balanco_2024.pdf", "/docs/dre.pdf"])
+        ['/docs/balanco_2024.pdf']
+        >>> resolve_sources(["a"], ["/docs/balanco.pdf", "/docs/dre.pdf"])
+        []
+    """
+    def basename(path: str) -> str:
+        return path.replace("\\", "/").rsplit("/", 1)[-1].lower()
+
+    resolved: list[str] = []
+    for name in names:
+        wanted = basename(name)
+        stem = wanted[:-4] if wanted.endswith(".pdf") else wanted
+        matches = [src for src in known_sources if src == name]
+        if not matches:
+            matches = [src for src in known_sources if basename(src) in (wanted, stem + ".pdf")]
+        if not matches and len(stem) >= MIN_PARTIAL_SOURCE_LENGTH:
+            word_start = re.compile(r"(?:^|[\W_])" + re.escape(stem))
+            matches = [src for src in known_sources if word_start.search(basename(src))]
+            if len({basename(src) for src in matches}) > 1:
+                raise AmbiguousSourceError(name, matches)
+        resolved.extend(src for src in matches if src not in resolved)
+    return resolved
+
+
+def merge_filters(
+    base: Optional[MetadataFilter],
+    override: Optional[MetadataFilter],
+) -> Optional[MetadataFilter]:
+    """
+    Combina dois filtros; cada critério (fontes, intervalo de páginas) presente em
+    `override` substitui o de `base`.
+
+    Returns:
+        Filtro combinado, ou None se ambos forem vazios.
+    """
+    if not base:
+        return override or None
+    merged: MetadataFilter = dict(base)  # type: ignore[assignment]
+    if override and ("page_min" in override or "page_max" in override):
+        merged.pop("page_min", None)
+        merged.pop("page_max", None)
+    merged.update(override or {})
+    return merged
+
+
+def metadata_matches(metadata: dict[str, Any], metadata_filter: Optional[MetadataFilter]) -> bool:
+    """
+    Verifica se os metadados de um chunk atendem ao filtro (mesma semântica do SQL).
+
+    Args:
+        metadata: Metadados do chunk.
+        metadata_filter: Filtro com `sources` já resolvidas para os caminhos gravados.
+
+    Returns:
+        bool: True se o chunk deve participar da busca.
+    """
+    if not metadata_filter:
+        return True
+    if "sources" in metadata_filter and metadata.get("source") not in metadata_filter["sources"]:
+        return False
+    if "page_min" in metadata_filter or "page_max" in metadata_filter:
+        page = metadata.get("page")
+        if not isinstance(page, (int, float)) or isinstance(page, bool):
+            return False
+        if page < metadata_filter.get("page_min", page) or page > metadata_filter.get("page_max", page):
+            return False
+    return True
+
+
+def filter_scope(metadata_filter: Optional[MetadataFilter]) -> str:
+    """
+    Representação canônica do filtro (ex: para separar entradas de cache por filtro).
+
+    Returns:
+        String vazia sem filtro; JSON ordenado caso contrário.
+    """
+    if not metadata_filter:
+        return ""
+    canonical = dict(metadata_filter)
+    if "sources" in canonical:
+        canonical["sources"] = sorted(set(canonical["sources"]))
+    return json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+
+
+def describe_filter(metadata_filter: Optional[MetadataFilter]) -> str:
+    """Descrição curta do filtro para exibição (ex: `balanco.pdf, págs. 3-5`)."""
+    if not metadata_filter:
+        return "nenhum"
+    parts: list[str] = []
+    if "sources" in metadata_filter:
+        names = [source.replace("\\", "/").rsplit("/", 1)[-1] for source in metadata_filter["sources"]]
+        parts.append(", ".join(names) if names else "(nenhuma fonte encontrada)")
+    if "page_min" in metadata_filter or "page_max" in metadata_filter:
+        start = metadata_filter.get("page_min")
+        end = metadata_filter.get("page_max")
+        if start == end:
+            parts.append(f"pág. {start}")
+        else:
+            parts.append(f"págs. {'' if start is None else start}-{'' if end is None else end}")
+    return ", ".join(parts)
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import glob
 import os
-from typing import Any, Optional
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import Any, Iterable, Iterator, Optional, Sequence, TypedDict, TypeVar
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from database import get_vector_store
 from config import Config
+from db_pool import EngineManager
 from embeddings_manager import get_embeddings
+from embedding_cache import CachedEmbeddings, build_cached_embeddings, content_hash
 from logger import get_logger
 
 import logging
@@ -18,6 +27,23 @@ logger = get_logger(__name__)
 DISPLAY_WIDTH = 70
 DEFAULT_BATCH_SIZE = 16
 
+# Lote pronto para persistência: (documentos enriquecidos, IDs correspondentes)
+Batch = tuple[list[Document], list[str]]
+
+T = TypeVar("T")
+
+# Extensões aceitas como manifesto (um caminho de PDF por linha)
+MANIFEST_EXTENSIONS = (".txt", ".lst", ".manifest")
+
+
+class FileIngestResult(TypedDict):
+    path: str
+    success: bool
+    pages: int
+    chunks: int
+    elapsed: float
+    error: Optional[str]
+
 def normalize_pdf_path(path: str) -> str:
     """
     Normaliza o caminho do PDF para persistência consistente no banco.
@@ -41,11 +67,517 @@ def normalize_pdf_path(path: str) -> str:
     
     return abs_path
 
+def enrich_chunk(
+    doc: Document,
+    index: int,
+    filename: str,
+    source: str,
+) -> Document:
+    """
+    Cria uma cópia do chunk com metadados limpos e enriquecidos.
+
+    Args:
+        doc: Chunk gerado pelo text splitter.
+        index: Posição do chunk no documento (base do ID determinístico).
+        filename: Nome do arquivo PDF.
+        source: Caminho normalizado do PDF (`metadata['source']`).
+
+    Returns:
+        Novo `Document` com `chunk_id`, `chunk_index`, `content_hash`, `filename` e `source`.
+    """
+    # Limpar metadados nulos/vazios
+    meta: dict[str, Any] = {k: v for k, v in doc.metadata.items() if v not in ("", None)}
+
+    # Adicionar novos metadados
+    meta["chunk_id"] = f"{filename}-{index}"
+    meta["chunk_index"] = index
+    meta["content_hash"] = content_hash(doc.page_content)
+    meta["filename"] = filename
+    meta["source"] = source
+
+    return type(doc)(page_content=doc.page_content, metadata=meta)
+
+
+def prefetch(iterable: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Consome `iterable` em uma thread produtora, entregando itens por uma fila limitada.
+
+    A fila com `maxsize` posições aplica backpressure: quando o consumidor atrasa,
+    a produtora bloqueia em vez de acumular itens em memória. Exceções levantadas
+    pela produtora são relançadas no consumidor.
+
+    Args:
+        iterable: Fonte de itens (ex.: gerador de lotes extraídos do PDF).
+        maxsize: Número máximo de itens prontos aguardando consumo.
+
+    Yields:
+        Itens de `iterable`, na ordem original.
+    """
+    buffer: queue.Queue[tuple[bool, Any]] = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item: tuple[bool, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((False, item)):
+                    return
+        except BaseException as e:
+            put((True, e))
+            return
+        put((True, None))
+
+    producer = threading.Thread(target=produce, name="ingest-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            done, payload = buffer.get()
+            if done:
+                if payload is not None:
+                    raise payload
+                return
+            yield payload
+    finally:
+        stop.set()
+        producer.join()
+
+
+def iter_pdf_batches(
+    abs_pdf_path: str,
+    text_splitter: RecursiveCharacterTextSplitter,
+    source: str,
+    batch_size: int,
+    counters: dict[str, int],
+) -> Iterator[Batch]:
+    """
+    Extrai, divide e enriquece o PDF página a página, produzindo lotes sob demanda.
+
+    Nenhuma lista com todas as páginas ou todos os chunks é mantida: cada página é
+    carregada via `lazy_load()`, dividida assim que chega e descartada.
+
+    Args:
+        abs_pdf_path: Caminho absoluto do PDF.
+        text_splitter: Splitter configurado com tamanho e overlap dos chunks.
+        source: Caminho normalizado do PDF (`metadata['source']`).
+        batch_size: Número de chunks por lote.
+        counters: Dicionário atualizado com `pages`, `chunks` e `chars` processados.
+
+    Yields:
+        Lotes `(documentos, ids)` prontos para embedding e persistência.
+    """
+    filename = os.path.basename(abs_pdf_path)
+    batch_docs: list[Document] = []
+    batch_ids: list[str] = []
+
+    for page in PyPDFLoader(abs_pdf_path).lazy_load():
+        counters["pages"] += 1
+        # split_documents já processa cada documento isoladamente, então dividir
+        # página a página produz exatamente os mesmos chunks do modo completo
+        for split in text_splitter.split_documents([page]):
+            doc = enrich_chunk(split, counters["chunks"], filename, source)
+            counters["chunks"] += 1
+            counters["chars"] += len(doc.page_content)
+            batch_docs.append(doc)
+            batch_ids.append(doc.metadata["chunk_id"])
+            if len(batch_docs) >= batch_size:
+                yield batch_docs, batch_ids
+                batch_docs, batch_ids = [], []
+
+    if batch_docs:
+        yield batch_docs, batch_ids
+
+
+class IncrementalDiff:
+    """
+    Compara os chunks novos de uma fonte com os já gravados, pelo hash do conteúdo.
+
+    No modo incremental os IDs passam a ser derivados do conteúdo
+    (`<arquivo>-<sha256[:16]>`, com sufixo `-N` para textos repetidos), então um
+    chunk inalterado mantém o mesmo ID mesmo que mude de posição. Assim:
+
+    - chunks com ID já existente não são re-embeddados nem regravados
+      (apenas os metadados são atualizados se a posição/página mudou);
+    - chunks com ID novo seguem para embedding e inserção;
+    - IDs existentes que não aparecem mais são removidos ao final.
+    """
+
+    # Campo gravado em cada chunk por versões anteriores (o total de chunks da fonte
+    # é a contagem das suas linhas); não conta como alteração de metadados
+    _IGNORED_FIELDS = ("total_chunks",)
+
+    def __init__(self, filename: str, existing: dict[str, dict[str, Any]]) -> None:
+        """
+        Args:
+            filename: Nome do arquivo PDF (prefixo dos IDs).
+            existing: Chunks já gravados para a fonte (id → metadados).
+        """
+        self.filename: str = filename
+        self.existing: dict[str, dict[str, Any]] = existing
+        self.claimed: set[str] = set()
+        self.metadata_updates: dict[str, dict[str, Any]] = {}
+        self.inserted: int = 0
+        self._seen: dict[str, int] = {}
+
+    def _content_id(self, digest: str) -> str:
+        occurrence = self._seen.get(digest, 0)
+        self._seen[digest] = occurrence + 1
+        base = f"{self.filename}-{digest[:16]}"
+        return base if occurrence == 0 else f"{base}-{occurrence}"
+
+    def _strip(self, meta: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in meta.items() if k not in self._IGNORED_FIELDS}
+
+    def filter(self, batches: Iterable[Batch], progress: Optional[Any] = None) -> Iterator[Batch]:
+        """
+        Reatribui IDs por conteúdo e repassa apenas os chunks que precisam ser inseridos.
+
+        Args:
+            batches: Lotes `(documentos, ids)` produzidos pela ingestão.
+            progress: Barra `tqdm` opcional, avançada também para chunks inalterados.
+
+        Yields:
+            Lotes contendo somente chunks novos.
+        """
+        for batch_docs, _ in batches:
+            new_docs: list[Document] = []
+            new_ids: list[str] = []
+            for doc in batch_docs:
+                chunk_id = self._content_id(doc.metadata["content_hash"])
+                doc.metadata["chunk_id"] = chunk_id
+
+                if chunk_id in self.existing:
+                    self.claimed.add(chunk_id)
+                    if self._strip(self.existing[chunk_id]) != self._strip(doc.metadata):
+                        self.metadata_updates[chunk_id] = doc.metadata
+                    if progress is not None:
+                        progress.update(1)
+                    continue
+
+                new_docs.append(doc)
+                new_ids.append(chunk_id)
+
+            if new_docs:
+                self.inserted += len(new_docs)
+                yield new_docs, new_ids
+
+    @property
+    def unchanged(self) -> int:
+        """Número de chunks reaproveitados sem novo embedding."""
+        return len(self.claimed)
+
+    @property
+    def vanished_ids(self) -> list[str]:
+        """IDs gravados anteriormente que não fazem mais parte do documento."""
+        return [chunk_id for chunk_id in self.existing if chunk_id not in self.claimed]
+
+
+def _embed_batch(embeddings: Any, batch_docs: list[Document]) -> list[list[float]]:
+    """Gera os embeddings de um lote de documentos (executado nas threads do pool)."""
+    return embeddings.embed_documents([doc.page_content for doc in batch_docs])
+
+
+def write_batches(
+    repo: Any,
+    embeddings: Any,
+    batches: Iterable[Batch],
+    max_in_flight: int = 1,
+    progress: Optional[Any] = None,
+    bulk_size: int = 0,
+) -> int:
+    """
+    Gera embeddings dos lotes em paralelo e grava no banco na ordem original.
+
+    Um pool de threads calcula os embeddings de até `max_in_flight` lotes ao mesmo
+    tempo. A escrita no `VectorStoreRepository` acontece apenas na thread chamadora,
+    sempre do lote mais antigo para o mais novo, de modo que a ordem de inserção e os
+    upserts por ID permanecem determinísticos. Enquanto um lote é gravado, os
+    próximos continuam sendo processados pelo provedor.
+
+    Args:
+        repo: Repositório com os métodos `add_embeddings` e `bulk_add_embeddings`.
+        embeddings: Modelo de embeddings (precisa expor `embed_documents`).
+        batches: Iterável de lotes `(documentos, ids)`; consumido sob demanda.
+        max_in_flight: Limite de requisições de embedding simultâneas (mínimo 1).
+        progress: Barra `tqdm` opcional, atualizada com o número de chunks gravados.
+        bulk_size: Se maior que 0, acumula até `bulk_size` chunks já vetorizados e
+            grava cada bloco com `bulk_add_embeddings` (COPY + merge) em vez de um
+            INSERT do ORM por lote.
+
+    Returns:
+        Número total de chunks gravados.
+    """
+    max_in_flight = max(1, max_in_flight)
+    written = 0
+    pending: deque[tuple[list[Document], list[str], Future[list[list[float]]]]] = deque()
+    buffered: list[tuple[Document, str, list[float]]] = []
+
+    def flush_buffer() -> int:
+        if not buffered:
+            return 0
+        repo.bulk_add_embeddings(
+            texts=[doc.page_content for doc, _, _ in buffered],
+            embeddings=[vector for _, _, vector in buffered],
+            metadatas=[doc.metadata for doc, _, _ in buffered],
+            ids=[chunk_id for _, chunk_id, _ in buffered],
+        )
+        count = len(buffered)
+        buffered.clear()
+        if progress is not None:
+            progress.update(count)
+        return count
+
+    def flush_oldest() -> int:
+        batch_docs, batch_ids, future = pending.popleft()
+        vectors = future.result()
+        if bulk_size > 0:
+            buffered.extend(zip(batch_docs, batch_ids, vectors))
+            return flush_buffer() if len(buffered) >= bulk_size else 0
+
+        repo.add_embeddings(
+            texts=[doc.page_content for doc in batch_docs],
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in batch_docs],
+            ids=batch_ids,
+        )
+        if progress is not None:
+            progress.update(len(batch_docs))
+        return len(batch_docs)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed") as pool:
+        try:
+            for batch_docs, batch_ids in batches:
+                # Backpressure: não submete novo lote enquanto o limite estiver atingido
+                if len(pending) >= max_in_flight:
+                    written += flush_oldest()
+                pending.append((batch_docs, batch_ids, pool.submit(_embed_batch, embeddings, batch_docs)))
+
+            while pending:
+                written += flush_oldest()
+            written += flush_buffer()
+        except BaseException:
+            for _, _, future in pending:
+                future.cancel()
+            raise
+
+    return written
+
+
+def validate_ingest_params(
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> tuple[int, int, int]:
+    """
+    Resolve e valida os parâmetros de chunking e concorrência.
+
+    Args:
+        chunk_size: Tamanho do chunk (None usa `Config.CHUNK_SIZE`).
+        chunk_overlap: Sobreposição do chunk (None usa `Config.CHUNK_OVERLAP`).
+        concurrency: Lotes de embedding simultâneos (None usa `Config.INGEST_CONCURRENCY`).
+
+    Returns:
+        Tupla `(chunk_size, chunk_overlap, concurrency)` resolvida.
+
+    Raises:
+        ValueError: Se algum parâmetro for inválido.
+    """
+    c_size = chunk_size or Config.CHUNK_SIZE
+    c_overlap = chunk_overlap or Config.CHUNK_OVERLAP
+
+    if c_size <= 0:
+        raise ValueError(f"Tamanho do chunk inválido: {c_size}. Deve ser maior que 0.")
+    if c_overlap < 0:
+        raise ValueError(f"Sobreposição do chunk inválida: {c_overlap}. Não pode ser negativa.")
+    if c_overlap >= c_size:
+        raise ValueError(f"Sobreposição ({c_overlap}) deve ser menor que o tamanho do chunk ({c_size}).")
+
+    max_in_flight = concurrency or Config.INGEST_CONCURRENCY
+    if max_in_flight <= 0:
+        raise ValueError(f"Concorrência inválida: {max_in_flight}. Deve ser maior que 0.")
+
+    return c_size, c_overlap, max_in_flight
+
+
+def load_and_split_pdf(abs_pdf_path: str, chunk_size: int, chunk_overlap: int) -> tuple[list[Document], int]:
+    """
+    Carrega o PDF inteiro e divide em chunks.
+
+    Função de nível de módulo (serializável) para poder rodar em um `ProcessPoolExecutor`.
+
+    Args:
+        abs_pdf_path: Caminho absoluto do PDF.
+        chunk_size: Tamanho do chunk em caracteres.
+        chunk_overlap: Sobreposição entre chunks em caracteres.
+
+    Returns:
+        Tupla `(chunks, total_de_paginas)`.
+    """
+    docs: list[Document] = PyPDFLoader(abs_pdf_path).load()
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents(docs), len(docs)
+
+
+def prepare_writer(use_cache: Optional[bool] = None) -> tuple[Any, Any, Optional[CachedEmbeddings]]:
+    """
+    Cria o repositório e o modelo de embeddings compartilhados pela escrita.
+
+    Args:
+        use_cache: Habilita o cache persistente de embeddings
+            (None usa `Config.EMBEDDING_CACHE_ENABLED`).
+
+    Returns:
+        Tupla `(repo, embeddings, cached_embeddings)`; `embeddings` já é o envoltório
+        com cache quando ele está habilitado, e `cached_embeddings` é None caso contrário.
+    """
+    embeddings = get_embeddings()
+
+    # Inicialização via Repositório
+    from database import get_repository
+    repo = get_repository(embeddings)
+
+    # Cache persistente: textos já vetorizados não voltam ao provedor (requer PostgreSQL)
+    cached_embeddings: Optional[CachedEmbeddings] = None
+    if (Config.EMBEDDING_CACHE_ENABLED if use_cache is None else use_cache) and repo.engine is not None:
+        cached_embeddings = build_cached_embeddings(embeddings, repo.engine)
+        embeddings = cached_embeddings
+
+    # Forçar inicialização do vector_store fora do loop para não quebrar o visual da barra de progresso
+    _ = repo.vector_store
+
+    # Índices de suporte (ex.: busca por fonte) criados uma única vez, após as tabelas existirem
+    repo.ensure_schema()
+    return repo, embeddings, cached_embeddings
+
+
+def resolve_bulk_size(bulk: Optional[bool] = None) -> int:
+    """
+    Retorna o tamanho dos blocos de escrita em massa (0 = desativada).
+
+    Args:
+        bulk: Força ativação/desativação; None usa `Config.INGEST_BULK_WRITE`.
+
+    Raises:
+        ValueError: Se a escrita em massa estiver ativa com `BULK_WRITE_SIZE` inválido.
+    """
+    if not (Config.INGEST_BULK_WRITE if bulk is None else bulk):
+        return 0
+    if Config.BULK_WRITE_SIZE <= 0:
+        raise ValueError(f"BULK_WRITE_SIZE inválido: {Config.BULK_WRITE_SIZE}. Deve ser maior que 0.")
+    return Config.BULK_WRITE_SIZE
+
+
+def batch_chunks(docs: list[Document], ids: list[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Batch]:
+    """Divide chunks já enriquecidos em lotes `(documentos, ids)`."""
+    for i in range(0, len(docs), batch_size):
+        yield docs[i : i + batch_size], ids[i : i + batch_size]
+
+
+def persist_source(
+    repo: Any,
+    embeddings: Any,
+    source: str,
+    filename: str,
+    batches: Iterable[Batch],
+    counters: dict[str, int],
+    max_in_flight: int = 1,
+    incremental: bool = False,
+    progress_total: Optional[int] = None,
+    quiet: bool = False,
+    bulk_size: int = 0,
+) -> dict[str, Any]:
+    """
+    Substitui (ou atualiza incrementalmente) os chunks de uma fonte no banco.
+
+    Args:
+        repo: Repositório vetorial compartilhado.
+        embeddings: Modelo de embeddings (com ou sem cache).
+        source: Caminho normalizado do PDF (`metadata['source']`).
+        filename: Nome do arquivo PDF.
+        batches: Lotes a gravar (consumidos sob demanda).
+        counters: Contadores `pages`/`chunks`/`chars`; no modo streaming são
+            preenchidos enquanto os lotes são consumidos.
+        max_in_flight: Limite de lotes de embedding simultâneos.
+        incremental: Se True, aplica o diff por conteúdo (`IncrementalDiff`).
+        progress_total: Total de chunks para a barra de progresso (None se desconhecido).
+        quiet: Se True, desabilita a barra de progresso.
+        bulk_size: Tamanho dos blocos gravados via COPY (0 = INSERT por lote).
+
+    Returns:
+        Dicionário com `inserted`, `deleted`, `unchanged`, `metadata_updates`,
+        `incremental` e `write_elapsed` (segundos).
+    """
+    from tqdm import tqdm
+
+    # 6. Limpeza de dados antigos para esta fonte (Evita chunks órfãos se o número de chunks mudar)
+    diff: Optional[IncrementalDiff] = None
+    if incremental:
+        existing = repo.get_source_chunks(source)
+        if existing is None:
+            logger.warning("Não foi possível ler os chunks existentes; usando re-ingestão completa.")
+        else:
+            logger.info(f"Modo incremental: {len(existing)} chunks existentes para {source}.")
+            diff = IncrementalDiff(filename, existing)
+
+    if diff is None:
+        logger.info(f"Limpando dados antigos da fonte: {source}...")
+        repo.delete_by_source(source)
+
+    # 7. Inserção ou Atualização no Banco (embeddings em paralelo, escrita ordenada)
+    logger.info(
+        f"Enviando fragmentos de {filename} para o PGVector em lotes de {DEFAULT_BATCH_SIZE} "
+        f"(até {max_in_flight} lote(s) simultâneo(s))..."
+    )
+
+    write_start = time.perf_counter()
+    with tqdm(total=progress_total, desc="Gerando embeddings e salvando", unit="chunk", disable=quiet) as progress:
+        if diff is not None:
+            batches = diff.filter(batches, progress=progress)
+        written = write_batches(
+            repo, embeddings, batches, max_in_flight=max_in_flight, progress=progress, bulk_size=bulk_size
+        )
+    write_elapsed = time.perf_counter() - write_start
+
+    deleted = 0
+    if diff is not None:
+        # Remoções só depois das inserções: a fonte nunca fica temporariamente vazia
+        repo.update_metadata(diff.metadata_updates)
+        deleted = repo.delete_by_ids(diff.vanished_ids)
+        logger.info(
+            f"Diff incremental: {diff.inserted} inseridos, {deleted} removidos, "
+            f"{diff.unchanged} inalterados ({len(diff.metadata_updates)} com metadados atualizados)."
+        )
+
+    if written or deleted or (diff is not None and diff.metadata_updates):
+        repo.bump_corpus_version()
+
+    return {
+        "inserted": written,
+        "deleted": deleted,
+        "unchanged": diff.unchanged if diff is not None else 0,
+        "metadata_updates": len(diff.metadata_updates) if diff is not None else 0,
+        "incremental": diff is not None,
+        "write_elapsed": write_elapsed,
+    }
+
+
 def ingest_pdf(
     pdf_path: Optional[str] = None,
     quiet: bool = False,
     chunk_size: Optional[int] = None,
     chunk_overlap: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    use_cache: Optional[bool] = None,
+    incremental: Optional[bool] = None,
+    bulk: Optional[bool] = None,
 ) -> bool:
     """
     Ingere um arquivo PDF, dividindo em chunks e persistindo embeddings no PGVector.
@@ -54,14 +586,27 @@ def ingest_pdf(
     - carregamento do PDF
     - chunking (tamanho e overlap configuráveis)
     - enriquecimento de metadados por chunk
-    - limpeza de dados antigos da mesma fonte (source)
-    - persistência no banco vetorial em lotes
+    - limpeza de dados antigos da mesma fonte (source), ou diff por conteúdo no modo incremental
+    - persistência no banco vetorial em lotes (embeddings gerados em paralelo)
 
     Args:
         pdf_path: Caminho do PDF para ingestão. Se None, usa `Config.PDF_PATH`.
         quiet: Se True, reduz logs e desabilita barras de progresso.
         chunk_size: Sobrescreve `Config.CHUNK_SIZE` (em caracteres) se informado.
         chunk_overlap: Sobrescreve `Config.CHUNK_OVERLAP` (em caracteres) se informado.
+        concurrency: Máximo de lotes de embedding em andamento ao mesmo tempo.
+            Se None, usa `Config.INGEST_CONCURRENCY` (1 = sequencial).
+        streaming: Se True, processa o PDF página a página em um pipeline com filas
+            limitadas (extração, embeddings e escrita sobrepostos, memória constante).
+            Se None, usa `Config.INGEST_STREAMING`.
+        use_cache: Se True, consulta o cache persistente de embeddings (chave: provedor,
+            modelo e SHA-256 do texto) antes de chamar o provedor.
+            Se None, usa `Config.EMBEDDING_CACHE_ENABLED`.
+        incremental: Se True, compara os chunks novos com os já gravados (hash do
+            conteúdo) e grava apenas a diferença, em vez de apagar e reinserir a fonte.
+            Se None, usa `Config.INGEST_INCREMENTAL`.
+        bulk: Se True, grava em blocos de `Config.BULK_WRITE_SIZE` chunks via COPY para
+            tabela temporária + merge único. Se None, usa `Config.INGEST_BULK_WRITE`.
 
     Returns:
         True se o processo concluir com sucesso.
@@ -85,16 +630,8 @@ def ingest_pdf(
     # Validar configuração
     Config.validate_config()
 
-    # Validar parâmetros de chunking
-    c_size = chunk_size or Config.CHUNK_SIZE
-    c_overlap = chunk_overlap or Config.CHUNK_OVERLAP
-
-    if c_size <= 0:
-        raise ValueError(f"Tamanho do chunk inválido: {c_size}. Deve ser maior que 0.")
-    if c_overlap < 0:
-        raise ValueError(f"Sobreposição do chunk inválida: {c_overlap}. Não pode ser negativa.")
-    if c_overlap >= c_size:
-        raise ValueError(f"Sobreposição ({c_overlap}) deve ser menor que o tamanho do chunk ({c_size}).")
+    # Validar parâmetros de chunking e concorrência
+    c_size, c_overlap, max_in_flight = validate_ingest_params(chunk_size, chunk_overlap, concurrency)
     
     # Se modo silencioso, ajustar nível de log globalmente
     if quiet:
@@ -113,6 +650,8 @@ def ingest_pdf(
     # Caminho normalizado (preferencialmente relativo ao projeto) para metadados e logs
     storage_pdf_path = normalize_pdf_path(abs_pdf_path)
 
+    start_time = time.perf_counter()
+
     # 1. Carregamento do PDF
     logger.info(f"Iniciando carregamento do PDF: {storage_pdf_path}")
     if not os.path.exists(abs_pdf_path):
@@ -122,117 +661,424 @@ def ingest_pdf(
     if not abs_pdf_path.lower().endswith('.pdf'):
         raise TypeError(f"O arquivo deve ter extensão .pdf: {storage_pdf_path}")
         
-    loader = PyPDFLoader(abs_pdf_path)
-    docs: list[Document] = loader.load()
-    logger.info(f"PDF carregado com sucesso. Total de páginas: {len(docs)}")
-
-    # 2. Chunking do texto
-    logger.info("Dividindo o texto em fragmentos (chunks)...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size or Config.CHUNK_SIZE,
-        chunk_overlap=chunk_overlap or Config.CHUNK_OVERLAP
-    )
-    splits: list[Document] = text_splitter.split_documents(docs)
-    
-    if not splits:
-        raise ValueError("Nenhum texto pôde ser extraído do PDF. O arquivo pode estar vazio ou protegido.")
-    
-    logger.info(f"Texto dividido em {len(splits)} fragmentos.")
-
-    # 3. Enriquecimento e Limpeza de Metadados
+    use_streaming = Config.INGEST_STREAMING if streaming is None else streaming
+    use_incremental = Config.INGEST_INCREMENTAL if incremental is None else incremental
     filename = os.path.basename(abs_pdf_path)
-    total_chunks = len(splits)
-    logger.info(f"Enriquecendo metadados para {total_chunks} fragmentos...")
-    
+
     from tqdm import tqdm
-    
-    enriched_docs: list[Document] = []
-    ids: list[str] = []
-    
-    # Usando tqdm para mostrar progresso no processamento de metadados
-    for i, doc in enumerate(tqdm(splits, desc="Processando fragmentos", unit="chunk", disable=quiet)):
-        # Limpar metadados nulos/vazios
-        meta: dict[str, Any] = {k: v for k, v in doc.metadata.items() if v not in ("", None)}
-        
-        # Adicionar novos metadados
-        chunk_id = f"{filename}-{i}"
-        meta["chunk_id"] = chunk_id
-        meta["chunk_index"] = i
-        meta["total_chunks"] = total_chunks
-        meta["filename"] = filename
-        meta["source"] = storage_pdf_path
-        
-        # Criar novo objeto documento com metadados enriquecidos
-        enriched_docs.append(type(doc)(
-            page_content=doc.page_content,
-            metadata=meta
-        ))
-        ids.append(chunk_id)
 
-    logger.info(f"Gerados {len(ids)} IDs únicos e metadados enriquecidos para o arquivo {filename}.")
+    if use_streaming:
+        # Pipeline: páginas → chunks → lotes (thread produtora, fila limitada)
+        #           → embeddings (pool limitado) → escrita ordenada (thread atual)
+        logger.info("Modo streaming: extração, chunking, embeddings e escrita em paralelo.")
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=c_size, chunk_overlap=c_overlap)
+        counters: dict[str, int] = {"pages": 0, "chunks": 0, "chars": 0}
+        batches: Iterator[Batch] = prefetch(
+            iter_pdf_batches(abs_pdf_path, text_splitter, storage_pdf_path, DEFAULT_BATCH_SIZE, counters),
+            maxsize=2 * max_in_flight,
+        )
+        first_batch = next(batches, None)
+        if first_batch is None:
+            raise ValueError("Nenhum texto pôde ser extraído do PDF. O arquivo pode estar vazio ou protegido.")
+        batches = chain([first_batch], batches)
+        progress_total: Optional[int] = None
+    else:
+        # 1-2. Carregamento completo do PDF (todas as páginas em memória) e chunking
+        logger.info("Dividindo o texto em fragmentos (chunks)...")
+        splits, num_pages = load_and_split_pdf(abs_pdf_path, c_size, c_overlap)
+        logger.info(f"PDF carregado com sucesso. Total de páginas: {num_pages}")
 
-    # 5. Embeddings e Vetorização
-    logger.info("Preparando inserção no banco de dados vetorial...")
-    embeddings = get_embeddings()
+        if not splits:
+            raise ValueError("Nenhum texto pôde ser extraído do PDF. O arquivo pode estar vazio ou protegido.")
 
-    # Inicialização via Repositório
-    from database import VectorStoreRepository
-    repo = VectorStoreRepository(embeddings)
+        logger.info(f"Texto dividido em {len(splits)} fragmentos.")
 
-    # 6. Limpeza de dados antigos para esta fonte (Evita chunks órfãos se o número de chunks mudar)
-    logger.info(f"Limpando dados antigos da fonte: {storage_pdf_path}...")
-    repo.delete_by_source(storage_pdf_path)
+        # 3. Enriquecimento e Limpeza de Metadados
+        total_chunks = len(splits)
+        logger.info(f"Enriquecendo metadados para {total_chunks} fragmentos...")
 
-    # 7. Inserção ou Atualização no Banco (com barra de progresso e batching)
-    batch_size = DEFAULT_BATCH_SIZE  # Tamanho do lote para enviar ao banco/embedding
-    
-    # Forçar inicialização do vector_store fora do loop para não quebrar o visual da barra de progresso
-    _ = repo.vector_store
-    
-    logger.info(f"Enviando {len(enriched_docs)} fragmentos para o PGVector em lotes de {batch_size}...")
-    
-    for i in tqdm(range(0, len(enriched_docs), batch_size), desc="Gerando embeddings e salvando", unit="batch", disable=quiet):
-        batch_docs = enriched_docs[i : i + batch_size]
-        batch_ids = ids[i : i + batch_size]
-        repo.add_documents(batch_docs, ids=batch_ids)
+        enriched_docs: list[Document] = []
+        ids: list[str] = []
+
+        # Usando tqdm para mostrar progresso no processamento de metadados
+        for i, doc in enumerate(tqdm(splits, desc="Processando fragmentos", unit="chunk", disable=quiet)):
+            enriched = enrich_chunk(doc, i, filename, storage_pdf_path)
+            enriched_docs.append(enriched)
+            ids.append(enriched.metadata["chunk_id"])
+
+        logger.info(f"Gerados {len(ids)} IDs únicos e metadados enriquecidos para o arquivo {filename}.")
+
+        counters = {
+            "pages": num_pages,
+            "chunks": total_chunks,
+            "chars": sum(len(d.page_content) for d in enriched_docs),
+        }
+        batches = batch_chunks(enriched_docs, ids)
+        progress_total = total_chunks
+
+    # 5. Embeddings e Vetorização
+    logger.info("Preparando inserção no banco de dados vetorial...")
+    repo, embeddings, cached_embeddings = prepare_writer(use_cache)
+
+    # 6-7. Limpeza/diff e gravação
+    result = persist_source(
+        repo,
+        embeddings,
+        storage_pdf_path,
+        filename,
+        batches,
+        counters,
+        max_in_flight=max_in_flight,
+        incremental=use_incremental,
+        progress_total=progress_total,
+        quiet=quiet,
+        bulk_size=resolve_bulk_size(bulk),
+    )
+    total_chunks = counters["chunks"]
+    write_elapsed = result["write_elapsed"]
+    total_elapsed = time.perf_counter() - start_time
 
     logger.info("PROCESSO DE INGESTÃO CONCLUÍDO COM SUCESSO! ✅")
     
     # Exibir estatísticas finais (apenas se não estiver em modo silencioso)
     if not quiet:
-        avg_chunk_size = sum(len(d.page_content) for d in enriched_docs) / total_chunks if total_chunks > 0 else 0
+        avg_chunk_size = counters["chars"] / total_chunks if total_chunks > 0 else 0
         
         print("\n" + "=" * DISPLAY_WIDTH)
         print("📊 ESTATÍSTICAS DE INGESTÃO")
         print("=" * DISPLAY_WIDTH)
         print(f"📄 Arquivo:           {filename}")
-        print(f"📑 Total de Páginas:   {len(docs)}")
+        print(f"📑 Total de Páginas:   {counters['pages']}")
         print(f"🧱 Total de Chunks:    {total_chunks}")
         print(f"📏 Tamanho Médio:      {avg_chunk_size:.1f} caracteres")
-        print(f"🆔 Chunks IDs:         {filename}-0 até {filename}-{total_chunks-1}")
+        if not result["incremental"]:
+            print(f"🆔 Chunks IDs:         {filename}-0 até {filename}-{total_chunks-1}")
+        else:
+            print(f"🆔 Chunks IDs:         {filename}-<sha256[:16]> (endereçados por conteúdo)")
+            print(
+                f"🔁 Incremental:        +{result['inserted']} novos | -{result['deleted']} removidos | "
+                f"{result['unchanged']} inalterados ({result['metadata_updates']} metadados atualizados)"
+            )
         print(f"🔗 Banco de Dados:     {Config.PG_VECTOR_COLLECTION_NAME}")
+        print(f"🧵 Concorrência:       {max_in_flight} lote(s) simultâneo(s)")
+        print(f"🌊 Modo:               {'streaming (página a página)' if use_streaming else 'completo'}")
+        print(f"⏱️  Tempo Total:        {total_elapsed:.2f}s (embeddings + escrita: {write_elapsed:.2f}s)")
+        if cached_embeddings is not None:
+            lookups = cached_embeddings.hits + cached_embeddings.misses
+            print(
+                f"♻️  Cache Embeddings:   {cached_embeddings.hits}/{lookups} hits "
+                f"({cached_embeddings.hit_rate:.1%}) | {cached_embeddings.misses} chamadas ao provedor"
+            )
+        print(f"⚡ Throughput:         {total_chunks / write_elapsed if write_elapsed > 0 else 0:.1f} chunks/s")
         print("=" * DISPLAY_WIDTH + "\n")
     
     return True
 
+
+def is_multi_input(path: str) -> bool:
+    """
+    Indica se a entrada representa vários PDFs (diretório, glob ou manifesto).
+
+    Args:
+        path: Caminho informado pelo usuário.
+
+    Returns:
+        True se for diretório, padrão glob (`*`, `?`, `[`) ou arquivo de manifesto.
+    """
+    return (
+        os.path.isdir(path)
+        or glob.has_magic(path)
+        or path.lower().endswith(MANIFEST_EXTENSIONS)
+    )
+
+
+def resolve_pdf_inputs(inputs: Sequence[str]) -> list[str]:
+    """
+    Expande diretórios, padrões glob e manifestos em uma lista de PDFs.
+
+    - Diretório: todos os `*.pdf` recursivamente.
+    - Glob: padrões como `docs/**/*.pdf` (recursivo).
+    - Manifesto (`.txt`, `.lst`, `.manifest`): um caminho por linha; linhas vazias e
+      iniciadas por `#` são ignoradas; caminhos relativos partem do diretório do manifesto.
+    - Demais entradas são tratadas como caminhos de PDF.
+
+    Args:
+        inputs: Entradas informadas pelo usuário.
+
+    Returns:
+        Caminhos absolutos, sem duplicatas, na ordem em que foram encontrados.
+
+    Raises:
+        FileNotFoundError: Se um manifesto informado não existir.
+    """
+    found: list[str] = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            found.extend(sorted(glob.glob(os.path.join(entry, "**", "*.pdf"), recursive=True)))
+        elif glob.has_magic(entry):
+            found.extend(sorted(glob.glob(entry, recursive=True)))
+        elif entry.lower().endswith(MANIFEST_EXTENSIONS):
+            if not os.path.exists(entry):
+                raise FileNotFoundError(f"Manifesto não encontrado: {entry}")
+            base_dir = os.path.dirname(os.path.abspath(entry))
+            with open(entry, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        found.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+        else:
+            found.append(entry)
+
+    unique: dict[str, None] = {}
+    for path in found:
+        unique.setdefault(os.path.abspath(path), None)
+    return list(unique)
+
+
+def ingest_pdfs(
+    pdf_paths: Sequence[str],
+    quiet: bool = False,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    workers: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+    incremental: Optional[bool] = None,
+    bulk: Optional[bool] = None,
+) -> list[FileIngestResult]:
+    """
+    Ingere vários PDFs em uma única execução.
+
+    A extração de texto e o chunking rodam em um `ProcessPoolExecutor` (um PDF por
+    processo, usando vários núcleos). Todos os processos alimentam um único escritor
+    no processo atual, que reaproveita a mesma conexão, o mesmo modelo de embeddings
+    (e cache) e o mesmo limite de lotes simultâneos. No máximo `2 × workers` arquivos
+    ficam em extração ou à espera do escritor; o próximo é enviado a cada conclusão.
+    Uma falha em um arquivo não interrompe os demais.
+
+    Args:
+        pdf_paths: Entradas a ingerir (arquivos, diretórios, globs ou manifestos).
+        quiet: Se True, reduz logs e desabilita barras de progresso e o resumo.
+        chunk_size: Sobrescreve `Config.CHUNK_SIZE` se informado.
+        chunk_overlap: Sobrescreve `Config.CHUNK_OVERLAP` se informado.
+        concurrency: Lotes de embedding simultâneos (None usa `Config.INGEST_CONCURRENCY`).
+        workers: Processos de extração (None usa `Config.INGEST_WORKERS`; 0 = núcleos disponíveis).
+        use_cache: Habilita o cache persistente de embeddings (None usa a configuração).
+        incremental: Aplica o diff por conteúdo em cada fonte (None usa a configuração).
+        bulk: Grava via COPY + merge em blocos (None usa `Config.INGEST_BULK_WRITE`).
+
+    Returns:
+        Lista de `FileIngestResult`, um por PDF, na ordem de conclusão.
+
+    Raises:
+        ValueError: Se a configuração ou os parâmetros forem inválidos, ou se nenhum PDF for encontrado.
+
+    Examples:
+        >>> from ingest import ingest_pdfs
+        >>> results = ingest_pdfs(["arquivo/"], workers=4, concurrency=4)
+        >>> all(r["success"] for r in results)
+        True
+    """
+    Config.validate_config()
+    c_size, c_overlap, max_in_flight = validate_ingest_params(chunk_size, chunk_overlap, concurrency)
+
+    if quiet:
+        from logger import set_global_log_level
+        set_global_log_level(logging.WARNING)
+
+    paths = resolve_pdf_inputs(pdf_paths)
+    if not paths:
+        raise ValueError("Nenhum PDF encontrado nas entradas informadas.")
+
+    use_incremental = Config.INGEST_INCREMENTAL if incremental is None else incremental
+    bulk_size = resolve_bulk_size(bulk)
+    num_workers = workers if workers is not None else Config.INGEST_WORKERS
+    num_workers = min(num_workers or os.cpu_count() or 1, len(paths))
+
+    logger.info(f"Ingerindo {len(paths)} PDF(s) com {num_workers} processo(s) de extração...")
+    start_time = time.perf_counter()
+
+    results: list[FileIngestResult] = []
+    pending: list[str] = []
+    for path in paths:
+        # Todos os resultados (inclusive falhas) usam o mesmo caminho gravado como `source`
+        source = normalize_pdf_path(path)
+        if not os.path.exists(path):
+            results.append(_failed_result(source, "Arquivo não encontrado"))
+        elif not path.lower().endswith(".pdf"):
+            results.append(_failed_result(source, "O arquivo deve ter extensão .pdf"))
+        else:
+            pending.append(path)
+
+    from tqdm import tqdm
+
+    # Extrações em andamento ou concluídas à espera do escritor: limita a memória do
+    # processo principal (listas de páginas prontas) em diretórios ou manifestos grandes
+    max_pending = max(1, num_workers) * 2
+    remaining = iter(pending)
+
+    with ProcessPoolExecutor(max_workers=max(1, num_workers), initializer=EngineManager.release_inherited) as pool:
+        in_flight: dict[Future[tuple[list[Document], int]], str] = {}
+
+        def submit_next() -> None:
+            path = next(remaining, None)
+            if path is not None:
+                in_flight[pool.submit(load_and_split_pdf, path, c_size, c_overlap)] = path
+
+        for _ in range(max_pending):
+            submit_next()
+        # Conexões e clientes são criados só depois dos processos de extração existirem,
+        # para que nenhum socket aberto seja herdado pelos filhos (conexões já abertas
+        # no pool compartilhado, ex: no chat, são descartadas por `release_inherited`)
+        repo, embeddings, cached_embeddings = prepare_writer(use_cache)
+
+        # Backend NumPy: um único snapshot gravado ao final, em vez de um por arquivo
+        with repo.deferred_saves(), tqdm(total=len(pending), desc="Arquivos", unit="pdf", disable=quiet) as progress:
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    # A próxima extração começa enquanto esta fonte é vetorizada e gravada
+                    submit_next()
+                    started_at = time.perf_counter()
+                    source = normalize_pdf_path(path)
+                    filename = os.path.basename(path)
+                    try:
+                        splits, num_pages = future.result()
+                        if not splits:
+                            raise ValueError("Nenhum texto pôde ser extraído do PDF")
+
+                        total_chunks = len(splits)
+                        enriched = [enrich_chunk(doc, i, filename, source) for i, doc in enumerate(splits)]
+                        counters = {
+                            "pages": num_pages,
+                            "chunks": total_chunks,
+                            "chars": sum(len(d.page_content) for d in enriched),
+                        }
+                        persist_source(
+                            repo,
+                            embeddings,
+                            source,
+                            filename,
+                            batch_chunks(enriched, [d.metadata["chunk_id"] for d in enriched]),
+                            counters,
+                            max_in_flight=max_in_flight,
+                            incremental=use_incremental,
+                            quiet=True,
+                            bulk_size=bulk_size,
+                        )
+                        results.append({
+                            "path": source,
+                            "success": True,
+                            "pages": num_pages,
+                            "chunks": total_chunks,
+                            "elapsed": time.perf_counter() - started_at,
+                            "error": None,
+                        })
+                    except Exception as e:
+                        logger.error(f"Falha ao ingerir {source}: {e}")
+                        results.append(_failed_result(source, str(e), time.perf_counter() - started_at))
+                    progress.update(1)
+
+    total_elapsed = time.perf_counter() - start_time
+    logger.info("PROCESSO DE INGESTÃO EM LOTE CONCLUÍDO ✅")
+
+    if not quiet:
+        display_batch_summary(results, total_elapsed, num_workers, max_in_flight, cached_embeddings)
+
+    return results
+
+
+def _failed_result(path: str, error: str, elapsed: float = 0.0) -> FileIngestResult:
+    return {"path": path, "success": False, "pages": 0, "chunks": 0, "elapsed": elapsed, "error": error}
+
+
+def display_batch_summary(
+    results: Sequence[FileIngestResult],
+    total_elapsed: float,
+    workers: int,
+    max_in_flight: int,
+    cached_embeddings: Optional[CachedEmbeddings] = None,
+) -> None:
+    """
+    Exibe o resultado por arquivo e o throughput agregado de uma ingestão em lote.
+
+    Args:
+        results: Resultados por arquivo.
+        total_elapsed: Duração total da execução (segundos).
+        workers: Processos de extração utilizados.
+        max_in_flight: Lotes de embedding simultâneos.
+        cached_embeddings: Envoltório com cache, para exibir a taxa de acerto.
+    """
+    ok = [r for r in results if r["success"]]
+    total_pages = sum(r["pages"] for r in ok)
+    total_chunks = sum(r["chunks"] for r in ok)
+
+    print("\n" + "=" * DISPLAY_WIDTH)
+    print("📊 ESTATÍSTICAS DE INGESTÃO EM LOTE")
+    print("=" * DISPLAY_WIDTH)
+    for r in results:
+        if r["success"]:
+            print(f"✅ {r['path']}: {r['pages']} pág. | {r['chunks']} chunks | {r['elapsed']:.2f}s")
+        else:
+            print(f"❌ {r['path']}: {r['error']}")
+    print("-" * DISPLAY_WIDTH)
+    print(f"📄 Arquivos:           {len(ok)}/{len(results)} com sucesso")
+    print(f"📑 Total de Páginas:   {total_pages}")
+    print(f"🧱 Total de Chunks:    {total_chunks}")
+    print(f"🔗 Banco de Dados:     {Config.PG_VECTOR_COLLECTION_NAME}")
+    print(f"🧵 Paralelismo:        {workers} processo(s) de extração | {max_in_flight} lote(s) de embedding")
+    print(f"⏱️  Tempo Total:        {total_elapsed:.2f}s")
+    if cached_embeddings is not None:
+        lookups = cached_embeddings.hits + cached_embeddings.misses
+        print(f"♻️  Cache Embeddings:   {cached_embeddings.hits}/{lookups} hits ({cached_embeddings.hit_rate:.1%})")
+    print(f"⚡ Throughput:         {total_chunks / total_elapsed if total_elapsed > 0 else 0:.1f} chunks/s | "
+          f"{len(ok) / total_elapsed if total_elapsed > 0 else 0:.2f} arquivos/s")
+    print("=" * DISPLAY_WIDTH + "\n")
+
+
 if __name__ == "__main__":
     import argparse
     import sys
     
     parser = argparse.ArgumentParser(description='Ingestão de PDFs no PGVector')
-    parser.add_argument('pdf_path', nargs='?', help='Caminho do PDF para ingestão', default=Config.PDF_PATH)
+    parser.add_argument('pdf_paths', nargs='*', metavar='pdf_path',
+                        help='PDF(s), diretório(s), glob(s) ou manifesto(s) para ingestão (default: PDF_PATH)')
     parser.add_argument('-q', '--quiet', action='store_true', help='Modo silencioso: oculta logs e progresso')
     parser.add_argument('--chunk-size', type=int, help=f'Tamanho do chunk (default: {Config.CHUNK_SIZE})')
     parser.add_argument('--chunk-overlap', type=int, help=f'Sobreposição do chunk (default: {Config.CHUNK_OVERLAP})')
+    parser.add_argument('--concurrency', type=int, help=f'Lotes de embedding simultâneos (default: {Config.INGEST_CONCURRENCY})')
+    parser.add_argument('--workers', type=int, help='Processos de extração na ingestão de vários PDFs (default: núcleos disponíveis)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', default=None, help='Ignora o cache persistente de embeddings')
+    parser.add_argument('--incremental', action='store_true', default=None, help='Grava apenas os chunks alterados (diff por hash do conteúdo)')
+    parser.add_argument('--bulk', action='store_true', default=None, help='Grava via COPY + merge em blocos (ingestões grandes)')
+    parser.add_argument('--stream', action='store_true', default=None, help='Modo streaming: processa o PDF página a página com memória constante')
     
     args = parser.parse_args()
     
-    pdf_to_ingest = args.pdf_path
+    inputs = args.pdf_paths or ([Config.PDF_PATH] if Config.PDF_PATH else [])
     
     try:
+        if len(inputs) > 1 or (inputs and is_multi_input(inputs[0])):
+            # Vários PDFs: sem confirmação interativa (fontes existentes são sobrescritas ou atualizadas)
+            batch_results = ingest_pdfs(
+                inputs,
+                quiet=args.quiet,
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.chunk_overlap,
+                concurrency=args.concurrency,
+                workers=args.workers,
+                use_cache=args.use_cache,
+                incremental=args.incremental,
+                bulk=args.bulk,
+            )
+            sys.exit(0 if all(r["success"] for r in batch_results) else 1)
+
+        pdf_to_ingest = inputs[0] if inputs else None
+
         if pdf_to_ingest:
-            from database import VectorStoreRepository
-            repo = VectorStoreRepository()
+            from database import get_repository
+            repo = get_repository()
             
             # Normalizar apenas para a busca de existência no banco
             pdf_normalized = normalize_pdf_path(pdf_to_ingest)
@@ -248,7 +1094,17 @@ if __name__ == "__main__":
                     except EOFError:
                         pass
         
-        ingest_pdf(pdf_to_ingest, quiet=args.quiet, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        ingest_pdf(
+            pdf_to_ingest,
+            quiet=args.quiet,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            concurrency=args.concurrency,
+            streaming=args.stream,
+            use_cache=args.use_cache,
+            incremental=args.incremental,
+            bulk=args.bulk,
+        )
     except FileNotFoundError as e:
         print(f"❌ Erro: {e}")
         sys.exit(2)
@@ -0,0 +1,1194 @@
+"""
+Módulo de Backend Vetorial em Memória (NumPy)
+
+Alternativa ao PGVector para coleções que cabem em memória: os embeddings ficam em
+uma matriz `float32` (`embeddings.npy`, aberta com memory-map) e os textos/metadados
+em um arquivo JSON ao lado (`metadata.json`). A busca é exata: um único produto
+matriz-vetor seguido de `argpartition`, sem ida ao banco.
+
+Selecionado com `VECTOR_BACKEND=numpy`; `get_repository()` (em `database`) devolve um
+`NumpyVectorRepository` com a mesma interface do `VectorStoreRepository`, então a
+ingestão, a busca, o chat e o servidor HTTP funcionam sem alterações.
+
+Layout do snapshot (um diretório por coleção em `NUMPY_STORE_DIR`):
+
+    <NUMPY_STORE_DIR>/<coleção>/embeddings.npy   # (N, D) float32, linhas normalizadas (L2)
+    <NUMPY_STORE_DIR>/<coleção>/metadata.json    # ids, documentos, metadados e versão do corpus
+    <NUMPY_STORE_DIR>/<coleção>/log.jsonl        # escritas desde a última compactação (uma por linha)
+    <NUMPY_STORE_DIR>/<coleção>/log_vectors.f32  # embeddings das linhas adicionadas no log
+
+Cada gravação anexa apenas as suas escritas ao log; a matriz e os metadados completos
+só são regravados na compactação (log grande, limpeza ou sincronização).
+
+Uma coleção já ingerida no PostgreSQL pode ser copiada com:
+
+    python src/numpy_store.py sync
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence, TypedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import Config
+from filters import MetadataFilter, metadata_matches
+from logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock dentro do processo
+    fcntl = None  # type: ignore[assignment]
+
+logger = get_logger(__name__)
+
+DISPLAY_WIDTH = 70
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+LOG_FILE = "log.jsonl"
+LOG_VECTORS_FILE = "log_vectors.f32"
+# Arquivo de lock (`flock`) que serializa as gravações de processos diferentes
+LOCK_FILE = ".lock"
+# O log é compactado no snapshot quando passa de max(mínimo, fração das linhas do snapshot)
+LOG_COMPACT_MIN_ROWS = 1000
+LOG_COMPACT_RATIO = 0.25
+# Versão do formato do `metadata.json`
+SNAPSHOT_FORMAT = 1
+# Linhas lidas por vez ao copiar a coleção do PGVector
+SYNC_BATCH_SIZE = 1000
+
+
+class NumpyStoreInfo(TypedDict):
+    path: str
+    rows: int
+    dimension: int
+    size_bytes: int
+    corpus_version: int
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza as linhas (L2) para que o produto interno seja a similaridade de cosseno."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class NumpyVectorIndex:
+    """
+    Matriz de embeddings + metadados de uma coleção, compartilhada pelo processo.
+
+    Escritas são acumuladas em memória (linhas novas em blocos, remoções como marcas)
+    e só chegam ao disco em `save()`, que as anexa ao log (custo proporcional à
+    alteração, não à coleção). Quando o log cresce além de `LOG_COMPACT_RATIO` do
+    snapshot, ou após `clear`/`replace`, `save()` compacta a matriz e regrava o
+    snapshot de forma atômica (arquivo temporário + `os.replace`), reabrindo a matriz
+    com memory-map: processos que só consultam não carregam o arquivo inteiro na RAM.
+
+    Outros processos (ex: uma ingestão em paralelo ao chat) são percebidos pela data de
+    modificação do `metadata.json` e pelo tamanho do log. As escritas locais ainda não
+    gravadas ficam em um diário (por ID de chunk): `refresh()` recarrega o snapshot que mudou e reaplica o
+    diário, e `save()` faz o mesmo sob um lock exclusivo de arquivo (`write_lock`),
+    de modo que um processo nunca grava por cima de chunks gravados por outro.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Args:
+            directory: Diretório do snapshot da coleção (criado no primeiro `save()`).
+        """
+        self.directory: str = directory
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: list[np.ndarray] = []
+        self._ids: list[str] = []
+        self._documents: list[str] = []
+        self._metadatas: list[dict[str, Any]] = []
+        self._positions: dict[str, int] = {}
+        self._deleted: set[int] = set()
+        self._corpus_version: int = 0
+        self._dirty: bool = False
+        # (mtime do metadata.json, tamanho do log) na última leitura ou gravação
+        self._loaded_state: Optional[tuple[Optional[int], int]] = None
+        self._base_rows: int = 0
+        self._log_rows: int = 0
+        # Escritas locais desde o último `save()`, reaplicadas sobre um snapshot mais novo
+        self._journal: list[tuple[Any, ...]] = []
+        self._write_lock = threading.RLock()
+        self._lock_depth: int = 0
+        self._lock_file: Optional[Any] = None
+        self._defer_depth: int = 0
+        self._save_pending: bool = False
+        self._load()
+
+    @property
+    def embeddings_path(self) -> str:
+        return os.path.join(self.directory, EMBEDDINGS_FILE)
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.directory, METADATA_FILE)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, LOG_FILE)
+
+    @property
+    def log_vectors_path(self) -> str:
+        return os.path.join(self.directory, LOG_VECTORS_FILE)
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(self.directory, LOCK_FILE)
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        """
+        Lock exclusivo do snapshot, reentrante: entre threads (RLock) e entre processos
+        (`flock` em `LOCK_FILE`). Envolve leitura, alteração e gravação do snapshot.
+        """
+        with self._write_lock:
+            # A profundidade sobe antes do flock: leitores deste processo não pedem o lock
+            # compartilhado enquanto esperamos o exclusivo (seria um deadlock com o nosso próprio)
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1 and fcntl is not None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._lock_file = open(self.lock_path, "a+")
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    @contextmanager
+    def _read_lock(self) -> Iterator[None]:
+        """Lock compartilhado durante a leitura do snapshot (não lê matriz e metadados de gravações diferentes)."""
+        if fcntl is None or self._lock_depth > 0 or not os.path.isdir(self.directory):
+            # Sem flock, ou um escritor deste processo detém (ou aguarda) o lock exclusivo
+            yield
+            return
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _snapshot_state(self) -> tuple[Optional[int], int]:
+        try:
+            mtime: Optional[int] = os.stat(self.metadata_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        try:
+            log_size = os.stat(self.log_path).st_size
+        except FileNotFoundError:
+            log_size = 0
+        return mtime, log_size
+
+    def _reset(self) -> None:
+        self._matrix = None
+        self._pending = []
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._positions = {}
+        self._deleted = set()
+
+    def _load(self) -> None:
+        """Lê o snapshot do disco, descartando o estado em memória (inclusive o diário)."""
+        with self._lock, self._read_lock():
+            state = self._snapshot_state()
+            self._reset()
+            self._journal = []
+            self._dirty = False
+            self._loaded_state = state
+            self._base_rows = 0
+            self._log_rows = 0
+            self._corpus_version = 0
+            if state[0] is None:
+                return
+
+            with open(self.metadata_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            rows = snapshot.get("rows", [])
+            matrix = np.load(self.embeddings_path, mmap_mode="r") if rows else None
+            if matrix is not None and matrix.shape[0] != len(rows):
+                # Snapshot sendo substituído por outro processo (matriz e metadados de versões diferentes)
+                logger.warning(f"Snapshot inconsistente em {self.directory}; será relido na próxima consulta")
+                self._loaded_state = None
+                return
+
+            self._matrix = matrix
+            self._ids = [row["id"] for row in rows]
+            self._documents = [row["document"] for row in rows]
+            self._metadatas = [dict(row.get("metadata") or {}) for row in rows]
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            self._corpus_version = int(snapshot.get("corpus_version", 0))
+            self._base_rows = len(rows)
+            self._read_log()
+            # As escritas do log já estão no disco: não fazem parte do diário local
+            self._journal = []
+            self._dirty = False
+            logger.info(f"Snapshot NumPy carregado: {self.count()} chunks de {self.directory}")
+
+    def _read_log(self) -> None:
+        """Aplica as escritas anexadas ao log desde a última compactação."""
+        try:
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A última linha sem `\n` é uma gravação interrompida: ignorada
+        for line in data.split(b"\n")[:-1]:
+            record = json.loads(line)
+            operation = record["op"]
+            if operation == "add":
+                ids, dim = record["ids"], record["dim"]
+                block = np.fromfile(
+                    self.log_vectors_path, dtype=np.float32, count=len(ids) * dim, offset=record["offset"]
+                )
+                if block.size != len(ids) * dim:
+                    logger.warning(f"Log NumPy truncado em {self.directory}; escritas restantes ignoradas")
+                    return
+                entry: tuple[Any, ...] = ("add", ids, record["documents"], block.reshape(len(ids), dim), record["metadatas"])
+            elif operation == "delete":
+                entry = ("delete", record["ids"])
+            elif operation == "metadata":
+                entry = ("metadata", record["id"], record["metadata"])
+            else:
+                entry = ("bump",)
+            self._replay(entry)
+            self._log_rows += self._journal_rows(entry)
+
+    def refresh(self) -> None:
+        """
+        Recarrega o snapshot se outro processo o regravou, reaplicando as escritas
+        locais ainda não gravadas. Chamado antes de toda leitura-alteração-gravação.
+        """
+        with self._lock:
+            if self._snapshot_state() == self._loaded_state:
+                return
+            journal = self._journal
+            self._load()
+            for entry in journal:
+                self._replay(entry)
+
+    def _replay(self, entry: tuple[Any, ...]) -> None:
+        """Reaplica uma escrita do diário sobre o estado atual."""
+        operation = entry[0]
+        if operation == "add":
+            self.add(*entry[1:])
+        elif operation == "delete":
+            self.delete([p for p in (self._positions.get(chunk_id) for chunk_id in entry[1]) if p is not None])
+        elif operation == "metadata":
+            position = self._positions.get(entry[1])
+            if position is not None:
+                self.set_metadata(position, entry[2])
+        elif operation == "clear":
+            self.clear()
+        elif operation == "replace":
+            self.replace(*entry[1:])
+        elif operation == "bump":
+            self._corpus_version += 1
+            self._journal.append(entry)
+
+    def _consolidated(self) -> Optional[np.ndarray]:
+        """Junta as linhas pendentes à matriz (uma cópia por rodada de escritas, não por lote)."""
+        if self._pending:
+            blocks = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.vstack(blocks)
+            self._pending = []
+        return self._matrix
+
+    @property
+    def dimension(self) -> Optional[int]:
+        with self._lock:
+            if self._matrix is not None:
+                return int(self._matrix.shape[1])
+            return int(self._pending[0].shape[1]) if self._pending else None
+
+    @property
+    def corpus_version(self) -> int:
+        return self._corpus_version
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._ids) - len(self._deleted)
+
+    def positions_by_source(self, source: str) -> list[int]:
+        with self._lock:
+            return [
+                i for i, meta in enumerate(self._metadatas)
+                if i not in self._deleted and meta.get("source") == source
+            ]
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            found = {
+                meta.get("source") for i, meta in enumerate(self._metadatas)
+                if i not in self._deleted and meta.get("source")
+            }
+        return sorted(found)
+
+    def chunk_id(self, position: int) -> str:
+        return self._ids[position]
+
+    def metadata(self, position: int) -> dict[str, Any]:
+        return dict(self._metadatas[position])
+
+    def add(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[dict[str, Any]],
+    ) -> list[str]:
+        """
+        Adiciona (ou substitui, por ID) chunks com embeddings já calculados.
+
+        Raises:
+            ValueError: Se a dimensão dos vetores diferir da matriz existente.
+        """
+        if not ids:
+            return []
+        block = _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+
+        with self._lock:
+            dimension = self.dimension
+            if dimension is not None and block.shape[1] != dimension:
+                raise ValueError(
+                    f"Dimensão dos embeddings ({block.shape[1]}) difere da coleção ({dimension}). "
+                    f"Limpe a base ao trocar de modelo."
+                )
+            self._journal.append(("add", list(ids), list(texts), block, [dict(meta or {}) for meta in metadatas]))
+            for chunk_id, text_, meta in zip(ids, texts, metadatas):
+                previous = self._positions.get(chunk_id)
+                if previous is not None:
+                    self._deleted.add(previous)
+                self._positions[chunk_id] = len(self._ids)
+                self._ids.append(chunk_id)
+                self._documents.append(text_)
+                self._metadatas.append(dict(meta or {}))
+            self._pending.append(block)
+            self._dirty = True
+        return list(ids)
+
+    def delete(self, positions: Sequence[int]) -> int:
+        with self._lock:
+            removed: list[str] = []
+            for position in positions:
+                if position not in self._deleted:
+                    self._deleted.add(position)
+                    self._positions.pop(self._ids[position], None)
+                    removed.append(self._ids[position])
+            if removed:
+                self._journal.append(("delete", removed))
+                self._dirty = True
+            return len(removed)
+
+    def position(self, chunk_id: str) -> Optional[int]:
+        with self._lock:
+            return self._positions.get(chunk_id)
+
+    def vectors(self, ids: Sequence[str]) -> dict[str, np.ndarray]:
+        """Embeddings (normalizados) dos chunks informados; IDs inexistentes ficam de fora."""
+        with self._lock:
+            matrix = self._consolidated()
+            if matrix is None:
+                return {}
+            return {
+                chunk_id: np.array(matrix[position])
+                for chunk_id in ids
+                if (position := self._positions.get(chunk_id)) is not None and position not in self._deleted
+            }
+
+    def set_metadata(self, position: int, metadata: dict[str, Any]) -> None:
+        with self._lock:
+            self._metadatas[position] = dict(metadata)
+            self._journal.append(("metadata", self._ids[position], dict(metadata)))
+            self._dirty = True
+
+    def _rows(self) -> tuple[list[str], list[str], list[dict[str, Any]]]:
+        """Referências às listas atuais; `save()` cria listas novas em vez de alterá-las."""
+        return self._ids, self._documents, self._metadatas
+
+    @staticmethod
+    def _documents_at(
+        rows: tuple[list[str], list[str], list[dict[str, Any]]],
+        scored: list[tuple[int, float]],
+    ) -> list[tuple[Document, float]]:
+        ids, documents, metadatas = rows
+        return [
+            (Document(id=ids[i], page_content=documents[i], metadata=dict(metadatas[i])), score)
+            for i, score in scored
+        ]
+
+    def _filtered_positions(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """Posições (não removidas) cujos metadados atendem ao filtro."""
+        with self._lock:
+            return np.fromiter(
+                (i for i, meta in enumerate(self._metadatas)
+                 if i not in self._deleted and metadata_matches(meta, metadata_filter)),
+                dtype=np.int64,
+            )
+
+    def search(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca exata dos `k` vizinhos mais próximos (distância de cosseno).
+
+        Com filtro, o produto é calculado só sobre as linhas que passam nele.
+
+        Returns:
+            Lista de `(Document, distância)`, da mais próxima para a mais distante.
+        """
+        with self._lock:
+            matrix = self._consolidated()
+            rows = self._rows()
+            if metadata_filter:
+                candidates: Optional[np.ndarray] = self._filtered_positions(metadata_filter)
+                deleted = np.zeros(0, dtype=np.int64)
+            else:
+                candidates = None
+                deleted = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+        if matrix is None or k <= 0 or (candidates is not None and candidates.size == 0):
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Dimensão da consulta ({query.shape[0]}) difere da coleção ({matrix.shape[1]}).")
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+
+        similarities = (matrix if candidates is None else matrix[candidates]) @ query
+        if deleted.size:
+            similarities[deleted] = -np.inf
+        k = min(k, similarities.shape[0] - int(deleted.size))
+        if k <= 0:
+            return []
+
+        if k < similarities.shape[0]:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(similarities.shape[0])
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        positions = top if candidates is None else candidates[top]
+        return self._documents_at(
+            rows, [(int(p), float(1.0 - similarities[i])) for p, i in zip(positions, top)]
+        )
+
+    def lexical_search(
+        self,
+        query: str,
+        k: int,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca textual simples: conta os termos distintos da pergunta presentes em cada chunk.
+
+        Returns:
+            Lista de `(Document, termos encontrados)`, do maior para o menor.
+        """
+        terms = {t for t in re.findall(r"\w+", query.lower()) if len(t) > 2}
+        if not terms or k <= 0:
+            return []
+        with self._lock:
+            rows = self._rows()
+            deleted = set(self._deleted)
+        scored: list[tuple[int, float]] = []
+        for i, document in enumerate(rows[1]):
+            if i in deleted or not metadata_matches(rows[2][i], metadata_filter):
+                continue
+            text_ = document.lower()
+            hits = sum(1 for term in terms if term in text_)
+            if hits:
+                scored.append((i, float(hits)))
+        scored.sort(key=lambda item: -item[1])
+        return self._documents_at(rows, scored[:k])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._journal.append(("clear",))
+            self._dirty = True
+
+    def replace(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+        matrix: np.ndarray,
+    ) -> None:
+        """Substitui todo o conteúdo (usado pela sincronização com o PGVector)."""
+        with self._lock:
+            self._reset()
+            self._matrix = _normalize_rows(matrix) if len(ids) else None
+            self._ids, self._documents, self._metadatas = ids, documents, metadatas
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+            self._journal.append(("replace", ids, documents, metadatas, matrix))
+            self._dirty = True
+
+    @contextmanager
+    def deferred_saves(self) -> Iterator[None]:
+        """
+        Adia as gravações do bloco para uma única, ao final (ex: ingestão de vários PDFs).
+
+        Dentro do bloco, `save()` só registra a gravação pendente (a versão do corpus é
+        incrementada na hora, para os caches do processo); o snapshot é regravado uma
+        vez na saída do bloco mais externo, em vez de uma vez por fonte.
+        """
+        with self._lock:
+            self._defer_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._defer_depth -= 1
+                flush = self._defer_depth == 0 and self._save_pending
+            if flush:
+                self.save()
+
+    def save(self, bump_version: bool = False) -> None:
+        """
+        Grava as escritas pendentes: anexa-as ao log ou, se for hora, compacta o snapshot.
+
+        Sob `write_lock`: se outro processo gravou depois da última leitura, o snapshot
+        e o log são recarregados e as escritas locais reaplicadas antes da gravação.
+
+        Args:
+            bump_version: Se True, incrementa a versão do corpus antes de gravar.
+        """
+        with self._lock:
+            if bump_version:
+                self._corpus_version += 1
+                self._journal.append(("bump",))
+            if self._defer_depth > 0:
+                self._save_pending = True
+                return
+
+        with self.write_lock(), self._lock:
+            self.refresh()
+            self._save_pending = False
+            if not self._journal:
+                return
+            if self._needs_compaction():
+                self.compact()
+            else:
+                self._append_log()
+
+    @staticmethod
+    def _journal_rows(entry: tuple[Any, ...]) -> int:
+        """Linhas que uma escrita do diário ocupa no log (para decidir a compactação)."""
+        if entry[0] in ("add", "delete"):
+            return len(entry[1])
+        return 1 if entry[0] == "metadata" else 0
+
+    def _needs_compaction(self) -> bool:
+        if self._loaded_state is None or self._loaded_state[0] is None:
+            return True  # Ainda não há snapshot base
+        if any(entry[0] in ("clear", "replace") for entry in self._journal):
+            return True
+        log_rows = self._log_rows + sum(self._journal_rows(entry) for entry in self._journal)
+        return log_rows > max(LOG_COMPACT_MIN_ROWS, LOG_COMPACT_RATIO * self._base_rows)
+
+    def _append_log(self) -> None:
+        """Anexa as escritas do diário ao log (os embeddings antes da linha que os referencia)."""
+        self._discard_partial_log()
+        records: list[bytes] = []
+        with open(self.log_vectors_path, "ab") as vectors_file:
+            vectors_file.seek(0, os.SEEK_END)
+            for entry in self._journal:
+                operation = entry[0]
+                if operation == "add":
+                    _, ids, texts, block, metadatas = entry
+                    record: dict[str, Any] = {
+                        "op": "add", "ids": ids, "documents": texts, "metadatas": metadatas,
+                        "offset": vectors_file.tell(), "dim": int(block.shape[1]),
+                    }
+                    vectors_file.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+                elif operation == "delete":
+                    record = {"op": "delete", "ids": entry[1]}
+                elif operation == "metadata":
+                    record = {"op": "metadata", "id": entry[1], "metadata": entry[2]}
+                else:
+                    record = {"op": "bump"}
+                records.append(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                self._log_rows += self._journal_rows(entry)
+        with open(self.log_path, "ab") as log_file:
+            log_file.write(b"".join(records))
+
+        logger.info(f"Log NumPy: {len(records)} escrita(s) anexada(s) em {self.directory}")
+        self._journal = []
+        self._dirty = False
+        self._loaded_state = self._snapshot_state()
+
+    def _discard_partial_log(self) -> None:
+        """Remove do fim do log uma linha incompleta (gravação interrompida)."""
+        try:
+            with open(self.log_path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def compact(self) -> None:
+        """
+        Regrava a matriz e os metadados completos de forma atômica e esvazia o log.
+
+        Deve ser chamado sob `write_lock`, depois de `refresh()` (como faz `save()`).
+        """
+        with self._lock:
+            matrix = self._consolidated()
+            keep = [i for i in range(len(self._ids)) if i not in self._deleted]
+            if matrix is not None and len(keep) != matrix.shape[0]:
+                matrix = np.take(matrix, keep, axis=0)
+
+            os.makedirs(self.directory, exist_ok=True)
+            if keep and matrix is not None:
+                tmp_embeddings = self.embeddings_path + ".tmp"
+                with open(tmp_embeddings, "wb") as f:
+                    np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+                os.replace(tmp_embeddings, self.embeddings_path)
+            elif os.path.exists(self.embeddings_path):
+                os.remove(self.embeddings_path)
+
+            snapshot = {
+                "format": SNAPSHOT_FORMAT,
+                "collection": Config.PG_VECTOR_COLLECTION_NAME,
+                "corpus_version": self._corpus_version,
+                "rows": [
+                    {"id": self._ids[i], "document": self._documents[i], "metadata": self._metadatas[i]}
+                    for i in keep
+                ],
+            }
+            tmp_metadata = self.metadata_path + ".tmp"
+            with open(tmp_metadata, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_metadata, self.metadata_path)
+            # O snapshot novo já contém o log (reaplicá-lo após uma queda aqui é idempotente,
+            # exceto pela versão do corpus, que apenas avança a mais)
+            for path in (self.log_path, self.log_vectors_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+            logger.info(f"Snapshot NumPy gravado: {len(keep)} chunks em {self.directory}")
+            # Reabre a matriz com memory-map; listas novas (buscas em andamento mantêm as antigas)
+            self._matrix = np.load(self.embeddings_path, mmap_mode="r") if keep else None
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            self._deleted = set()
+            self._journal = []
+            self._dirty = False
+            self._base_rows = len(keep)
+            self._log_rows = 0
+            self._loaded_state = self._snapshot_state()
+
+    def info(self) -> NumpyStoreInfo:
+        with self._lock:
+            size = sum(
+                os.path.getsize(path)
+                for path in (self.embeddings_path, self.metadata_path, self.log_path, self.log_vectors_path)
+                if os.path.exists(path)
+            )
+            return {
+                "path": self.directory,
+                "rows": self.count(),
+                "dimension": self.dimension or 0,
+                "size_bytes": size,
+                "corpus_version": self._corpus_version,
+            }
+
+
+_indexes: dict[str, NumpyVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def store_directory(collection: Optional[str] = None) -> str:
+    """
+    Retorna o diretório do snapshot de uma coleção.
+
+    Args:
+        collection: Nome da coleção (default: `Config.PG_VECTOR_COLLECTION_NAME`).
+    """
+    name = collection or Config.PG_VECTOR_COLLECTION_NAME or "default"
+    return os.path.abspath(os.path.join(Config.NUMPY_STORE_DIR, re.sub(r"[^\w.-]", "_", name)))
+
+
+def get_index(collection: Optional[str] = None) -> NumpyVectorIndex:
+    """
+    Retorna o índice compartilhado da coleção, carregando o snapshot na primeira chamada.
+
+    Todas as instâncias de `NumpyVectorRepository` do processo (sessão de busca,
+    ingestão, comandos do chat) usam o mesmo objeto, e portanto enxergam as mesmas escritas.
+
+    Args:
+        collection: Nome da coleção (default: `Config.PG_VECTOR_COLLECTION_NAME`).
+
+    Returns:
+        `NumpyVectorIndex` da coleção.
+    """
+    directory = store_directory(collection)
+    with _indexes_lock:
+        index = _indexes.get(directory)
+        if index is None:
+            index = NumpyVectorIndex(directory)
+            _indexes[directory] = index
+    return index
+
+
+class NumpyVectorRepository:
+    """
+    Repositório com a interface do `VectorStoreRepository` sobre um `NumpyVectorIndex`.
+
+    As escritas ficam em memória até a versão do corpus ser incrementada (fim da
+    gravação de cada fonte na ingestão), `delete_by_source`, `clear` ou `save()`; dentro
+    de `deferred_saves()` há uma única gravação no final. Toda leitura que precede uma
+    alteração recarrega antes o snapshot (`refresh`). Índices ANN e de suporte não se
+    aplicam: a busca é sempre exata.
+    """
+
+    def __init__(self, embeddings: Optional[Any] = None) -> None:
+        """
+        Inicializa o repositório.
+
+        Args:
+            embeddings: O modelo de embeddings a ser utilizado.
+                       Se None, operações que não exigem embeddings (como count)
+                       ainda funcionarão.
+        """
+        self.embeddings: Optional[Any] = embeddings
+        self.index: NumpyVectorIndex = get_index()
+
+    @property
+    def vector_store(self) -> NumpyVectorRepository:
+        """O próprio repositório (não há objeto de vector store separado a inicializar)."""
+        return self
+
+    @property
+    def engine(self) -> Optional[Any]:
+        """
+        Engine do PostgreSQL, usado apenas pelos caches persistentes.
+
+        Returns:
+            Engine compartilhado se `DATABASE_URL` estiver configurada, senão None.
+        """
+        if not Config.DATABASE_URL:
+            return None
+        from db_pool import get_engine
+        return get_engine()
+
+    # === Esquema e versão do corpus ===
+
+    def missing_indexes(self) -> list[str]:
+        """Não há índices de suporte no backend em memória."""
+        return []
+
+    def ensure_schema(self) -> list[str]:
+        """Não há índices de suporte no backend em memória."""
+        return []
+
+    def bump_corpus_version(self) -> bool:
+        """
+        Incrementa a versão do corpus e grava o snapshot.
+
+        Returns:
+            bool: True se o snapshot foi gravado, False em caso de erro
+        """
+        try:
+            self.index.save(bump_version=True)
+            return True
+        except OSError as e:
+            logger.error(f"Erro ao gravar snapshot NumPy: {e}")
+            return False
+
+    def corpus_version(self) -> Optional[int]:
+        """Retorna a versão atual do corpus (recarregando o snapshot se outro processo o alterou)."""
+        try:
+            self.index.refresh()
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao recarregar snapshot NumPy: {e}")
+        return self.index.corpus_version
+
+    async def acorpus_version(self) -> Optional[int]:
+        """Versão assíncrona de `corpus_version`."""
+        return await asyncio.to_thread(self.corpus_version)
+
+    @contextmanager
+    def deferred_saves(self) -> Iterator[None]:
+        """Uma única gravação do snapshot ao final do bloco (ver `NumpyVectorIndex.deferred_saves`)."""
+        with self.index.deferred_saves():
+            yield
+
+    def save(self) -> bool:
+        """
+        Grava as escritas pendentes sem alterar a versão do corpus.
+
+        Returns:
+            bool: True se o snapshot foi gravado, False em caso de erro
+        """
+        try:
+            self.index.save()
+            return True
+        except OSError as e:
+            logger.error(f"Erro ao gravar snapshot NumPy: {e}")
+            return False
+
+    # === Fontes e chunks ===
+
+    def count(self) -> int:
+        """Conta os chunks da coleção."""
+        self.index.refresh()
+        return self.index.count()
+
+    def count_sources(self) -> int:
+        """Conta as fontes únicas (arquivos) da coleção."""
+        return len(self.list_sources())
+
+    def list_sources(self) -> list[str]:
+        """Lista as fontes únicas (arquivos) da coleção, em ordem alfabética."""
+        self.index.refresh()
+        return self.index.sources()
+
+    def exists(self) -> bool:
+        """Verifica se existem documentos na coleção."""
+        return self.count() > 0
+
+    def clear(self) -> bool:
+        """
+        Remove todos os documentos da coleção e grava o snapshot vazio.
+
+        Returns:
+            bool: True se removido com sucesso, False caso contrário
+        """
+        with self.index.write_lock():
+            self.index.refresh()
+            if self.index.count() == 0:
+                return False
+            self.index.clear()
+            return self.bump_corpus_version()
+
+    def delete_by_source(self, source: str) -> bool:
+        """
+        Remove todos os chunks que tenham o mesmo 'source' no metadados.
+
+        Args:
+            source (str): O caminho/nome do arquivo (metadata['source'])
+
+        Returns:
+            bool: True se a operação foi concluída (mesmo que nada tenha sido deletado)
+        """
+        with self.index.write_lock():
+            self.index.refresh()
+            removed = self.index.delete(self.index.positions_by_source(source))
+            logger.info(f"Removidos {removed} chunks antigos de '{source}'.")
+            return self.bump_corpus_version() if removed else True
+
+    def source_exists(self, source: str) -> bool:
+        """Verifica se já existem documentos de uma fonte específica."""
+        self.index.refresh()
+        return bool(self.index.positions_by_source(source))
+
+    def get_source_chunks(self, source: str) -> Optional[dict[str, dict[str, Any]]]:
+        """Retorna os IDs e metadados de todos os chunks já gravados de uma fonte."""
+        self.index.refresh()
+        return {
+            self.index.chunk_id(position): self.index.metadata(position)
+            for position in self.index.positions_by_source(source)
+        }
+
+    def delete_by_ids(self, ids: Sequence[str]) -> int:
+        """Remove chunks específicos; retorna quantos foram removidos."""
+        self.index.refresh()
+        positions = [p for p in (self.index.position(chunk_id) for chunk_id in ids) if p is not None]
+        return self.index.delete(positions)
+
+    def update_metadata(self, entries: dict[str, dict[str, Any]]) -> int:
+        """Substitui os metadados de chunks existentes, sem tocar nos embeddings."""
+        self.index.refresh()
+        updated = 0
+        for chunk_id, metadata in entries.items():
+            position = self.index.position(chunk_id)
+            if position is not None:
+                self.index.set_metadata(position, metadata)
+                updated += 1
+        return updated
+
+    # === Escrita ===
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[list[float]],
+        metadatas: Sequence[dict[str, Any]],
+        ids: Sequence[str],
+    ) -> list[str]:
+        """
+        Adiciona textos cujos embeddings já foram calculados (upsert por ID).
+
+        Returns:
+            Lista de IDs gravados.
+        """
+        return self.index.add(ids, texts, embeddings, metadatas)
+
+    def bulk_add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[list[float]],
+        metadatas: Sequence[dict[str, Any]],
+        ids: Sequence[str],
+    ) -> int:
+        """Igual a `add_embeddings` (não há caminho de escrita em massa separado em memória)."""
+        return len(self.index.add(ids, texts, embeddings, metadatas))
+
+    def add_documents(self, documents: Sequence[Any], ids: Optional[Sequence[str]] = None) -> list[str]:
+        """Vetoriza e adiciona documentos à coleção."""
+        if self.embeddings is None:
+            raise ValueError("Embeddings não fornecidos. Necessário para operações de Vector Store.")
+        texts = [doc.page_content for doc in documents]
+        chunk_ids = list(ids) if ids is not None else [str(doc.id) for doc in documents]
+        return self.index.add(
+            chunk_ids, texts, self.embeddings.embed_documents(texts), [doc.metadata for doc in documents]
+        )
+
+    # === Busca ===
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """Busca os `k` chunks mais próximos da pergunta (distância de cosseno)."""
+        if self.embeddings is None:
+            raise ValueError("Embeddings não fornecidos. Necessário para operações de Vector Store.")
+        return self.similarity_search_by_vector_with_score(
+            self.embeddings.embed_query(query), k=k, metadata_filter=metadata_filter
+        )
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca exata dos `k` chunks mais próximos de um vetor já calculado.
+
+        Args:
+            embedding: Vetor da consulta.
+            k: Número de documentos a retornar.
+            ef_search: Ignorado (compatibilidade com o backend PGVector).
+            probes: Ignorado (compatibilidade com o backend PGVector).
+            metadata_filter: Restringe a busca a fontes/páginas (opcional).
+
+        Returns:
+            Lista de `(Document, distância)`, da mais próxima para a mais distante.
+        """
+        self.index.refresh()
+        return self.index.search(embedding, k, metadata_filter)
+
+    async def asimilarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """Versão assíncrona de `similarity_search_by_vector_with_score` (em uma thread)."""
+        return await asyncio.to_thread(
+            self.similarity_search_by_vector_with_score, embedding, k, metadata_filter=metadata_filter
+        )
+
+    def similarity_search_with_embeddings(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float, list[float]]]:
+        """
+        Igual a `similarity_search_by_vector_with_score`, trazendo também o embedding de cada chunk.
+
+        Returns:
+            Lista de `(Document, distância, embedding)`, da mais próxima para a mais distante.
+        """
+        scored = self.similarity_search_by_vector_with_score(embedding, k, metadata_filter=metadata_filter)
+        vectors = self.index.vectors([str(doc.id) for doc, _ in scored])
+        return [(doc, score, vectors[str(doc.id)].tolist()) for doc, score in scored if str(doc.id) in vectors]
+
+    async def asimilarity_search_with_embeddings(
+        self,
+        embedding: Sequence[float],
+        k: int = Config.TOP_K,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float, list[float]]]:
+        """Versão assíncrona de `similarity_search_with_embeddings` (em uma thread)."""
+        return await asyncio.to_thread(
+            self.similarity_search_with_embeddings, embedding, k, metadata_filter=metadata_filter
+        )
+
+    def get_embeddings_by_ids(self, ids: Sequence[str]) -> dict[str, list[float]]:
+        """Embeddings gravados dos chunks informados (`id -> embedding`)."""
+        return {chunk_id: vector.tolist() for chunk_id, vector in self.index.vectors(ids).items()}
+
+    async def aget_embeddings_by_ids(self, ids: Sequence[str]) -> dict[str, list[float]]:
+        """Versão assíncrona de `get_embeddings_by_ids` (em uma thread)."""
+        return await asyncio.to_thread(self.get_embeddings_by_ids, ids)
+
+    def lexical_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca textual por termos da pergunta (sem stemming, ao contrário do full-text do PostgreSQL).
+
+        Returns:
+            Lista de `(Document, termos encontrados)`, do maior para o menor score.
+        """
+        return self.index.lexical_search(query, k, metadata_filter)
+
+    async def alexical_search_with_score(
+        self,
+        query: str,
+        k: int = Config.TOP_K,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[tuple[Document, float]]:
+        """Versão assíncrona de `lexical_search_with_score` (em uma thread)."""
+        return await asyncio.to_thread(self.lexical_search_with_score, query, k, metadata_filter)
+
+    # === Índices ANN (não se aplicam) ===
+
+    def embedding_dimension(self) -> Optional[int]:
+        """Dimensão dos vetores da coleção, ou None se estiver vazia."""
+        return self.index.dimension
+
+    def ann_index_info(self, refresh: bool = False) -> None:
+        """Sempre None: a busca em memória é exata."""
+        return None
+
+    async def aann_index_info(self) -> None:
+        """Sempre None: a busca em memória é exata."""
+        return None
+
+    def create_ann_index(self, method: str = "hnsw", **kwargs: Any) -> None:
+        """
+        Raises:
+            ValueError: Sempre; índices ANN só existem no backend PGVector.
+        """
+        raise ValueError("Índices ANN não se aplicam ao backend 'numpy' (a busca em memória já é exata).")
+
+    def rebuild_ann_index(self) -> None:
+        """Não há índice ANN a reconstruir."""
+        return None
+
+    def drop_ann_index(self) -> bool:
+        """Não há índice ANN a remover."""
+        return False
+
+    # === Snapshot ===
+
+    def sync_from_pgvector(self) -> int:
+        """
+        Copia a coleção do PGVector para o snapshot local, substituindo seu conteúdo.
+
+        Os embeddings são lidos como `real[]` em blocos de `SYNC_BATCH_SIZE` linhas
+        (cursor no servidor), sem carregar o resultado inteiro de uma vez no driver.
+
+        Returns:
+            int: Número de chunks copiados.
+
+        Raises:
+            ValueError: Se `DATABASE_URL` não estiver configurada.
+            sqlalchemy.exc.SQLAlchemyError: Em caso de erro de banco.
+        """
+        from sqlalchemy import text
+
+        from database import COLLECTION_UUID_QUERY
+        from db_pool import get_engine
+
+        ids: list[str] = []
+        documents: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+        blocks: list[np.ndarray] = []
+        query = text("""
+            SELECT id, document, cmetadata, CAST(embedding AS real[])
+            FROM langchain_pg_embedding
+            WHERE collection_id = (""" + COLLECTION_UUID_QUERY + """)
+            ORDER BY id
+        """)
+
+        with get_engine().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=SYNC_BATCH_SIZE).execute(
+                query, {"name": Config.PG_VECTOR_COLLECTION_NAME}
+            )
+            for rows in result.partitions():
+                ids.extend(row[0] for row in rows)
+                documents.extend(row[1] or "" for row in rows)
+                metadatas.extend(dict(row[2] or {}) for row in rows)
+                blocks.append(np.asarray([row[3] for row in rows], dtype=np.float32))
+
+        matrix = np.vstack(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+        self.index.replace(ids, documents, metadatas, matrix)
+        self.index.save(bump_version=True)
+        logger.info(f"Sincronizados {len(ids)} chunks do PGVector para {self.index.directory}")
+        return len(ids)
+
+
+def display_store_info(info: NumpyStoreInfo) -> None:
+    """Exibe o tamanho e a localização do snapshot."""
+    print("\n" + "=" * DISPLAY_WIDTH)
+    print("🧮 BACKEND VETORIAL NUMPY")
+    print("=" * DISPLAY_WIDTH)
+    print(f"📁 Diretório:       {info['path']}")
+    print(f"📄 Chunks:          {info['rows']}")
+    print(f"📐 Dimensão:        {info['dimension']}")
+    print(f"💾 Tamanho:         {info['size_bytes'] / (1024 * 1024):.1f} MB")
+    print(f"🔢 Versão do corpus: {info['corpus_version']}")
+    print("=" * DISPLAY_WIDTH + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerencia o snapshot do backend vetorial NumPy")
+    parser.add_argument("action", choices=["info", "sync"], nargs="?", default="info",
+                        help="info: mostra o snapshot | sync: copia a coleção do PGVector")
+    args = parser.parse_args()
+
+    try:
+        repo = NumpyVectorRepository()
+        if args.action == "sync":
+            print(f"🔄 Copiando a coleção '{Config.PG_VECTOR_COLLECTION_NAME}' do PGVector...")
+            total = repo.sync_from_pgvector()
+            print(f"✅ {total} chunks sincronizados.")
+        display_store_info(repo.index.info())
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        sys.exit(1)
@@ -0,0 +1,287 @@
+"""
+Módulo de Cache Exato de Respostas da LLM
+
+Armazena no PostgreSQL a resposta da LLM para um prompt totalmente renderizado.
+A chave é o SHA-256 de (prompt, provedor, modelo, temperatura): com temperatura 0,
+o mesmo contexto recuperado e a mesma pergunta produzem a mesma resposta, então a
+chamada ao provedor pode ser evitada.
+
+A tabela tem tamanho máximo (as entradas menos usadas recentemente são removidas) e
+validade (TTL) por entrada.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Optional, TypedDict
+
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import Config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+RESPONSE_CACHE_TABLE_NAME = "rag_llm_response_cache"
+
+# URLs dos bancos em que a tabela já foi criada neste processo: sessões de uma única
+# pergunta criam um `LLMResponseCache` novo e não repetem o CREATE TABLE
+_schema_ready_urls: set[str] = set()
+_schema_ready_lock = threading.Lock()
+
+
+class CachedResponse(TypedDict):
+    response: str
+    input_tokens: int
+    output_tokens: int
+    latency_ms: float
+
+
+class ResponseCacheStats(TypedDict):
+    hits: int
+    misses: int
+    tokens_saved: int
+    latency_saved_ms: float
+
+
+def response_cache_key(prompt: str, provider: str, model: str, temperature: float) -> str:
+    """
+    Calcula a chave do cache para um prompt renderizado.
+
+    Args:
+        prompt: Prompt completo enviado à LLM.
+        provider: Provedor ('google' ou 'openai').
+        model: Nome do modelo de chat.
+        temperature: Temperatura de geração.
+
+    Returns:
+        Hash hexadecimal de 64 caracteres.
+    """
+    payload = "\x1f".join([provider, model, f"{float(temperature):.4f}", prompt])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache persistente de respostas da LLM em uma tabela do PostgreSQL.
+
+    Como o `EmbeddingCache`, falhas de banco nunca interrompem a resposta: leituras
+    com erro são tratadas como miss e escritas com erro são apenas registradas no log.
+    """
+
+    def __init__(self, engine: Engine, max_entries: int, ttl_seconds: int) -> None:
+        """
+        Args:
+            engine: Engine do SQLAlchemy (pool compartilhado).
+            max_entries: Número máximo de respostas guardadas (LRU por último uso).
+            ttl_seconds: Validade de cada resposta em segundos (0 = sem expiração).
+        """
+        self.engine: Engine = engine
+        self.max_entries: int = max(1, max_entries)
+        self.ttl_seconds: int = ttl_seconds
+        self.hits: int = 0
+        self.misses: int = 0
+        self.tokens_saved: int = 0
+        self.latency_saved_ms: float = 0.0
+        self._lock = threading.Lock()
+
+    def ensure_schema(self) -> bool:
+        """
+        Cria a tabela do cache se ainda não existir.
+
+        Returns:
+            bool: True se a tabela está disponível, False em caso de erro
+        """
+        url = str(self.engine.url)
+        if url in _schema_ready_urls:
+            return True
+
+        query = text(f"""
+            CREATE TABLE IF NOT EXISTS {RESPONSE_CACHE_TABLE_NAME} (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                response TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL DEFAULT 0,
+                output_tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms REAL NOT NULL DEFAULT 0,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                last_used_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(query)
+            with _schema_ready_lock:
+                _schema_ready_urls.add(url)
+            return True
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Cache de respostas indisponível (erro ao criar tabela): {e}")
+            return False
+
+    def stats(self) -> ResponseCacheStats:
+        """Retorna os contadores do cache, incluindo tokens e latência economizados."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+            "latency_saved_ms": self.latency_saved_ms,
+        }
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Busca uma resposta válida e marca a entrada como recém-usada.
+
+        Args:
+            key: Chave calculada por `response_cache_key`.
+
+        Returns:
+            `CachedResponse` ou None se ausente, expirada ou em caso de erro.
+        """
+        if not self.ensure_schema():
+            return None
+
+        query = text(f"""
+            UPDATE {RESPONSE_CACHE_TABLE_NAME}
+            SET last_used_at = now()
+            WHERE key = :key
+            AND (:ttl = 0 OR created_at > now() - make_interval(secs => :ttl))
+            RETURNING response, input_tokens, output_tokens, latency_ms
+        """)
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    row = conn.execute(query, {"key": key, "ttl": self.ttl_seconds}).first()
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Erro ao consultar cache de respostas: {e}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += int(row[1]) + int(row[2])
+            self.latency_saved_ms += float(row[3])
+
+        return {
+            "response": row[0],
+            "input_tokens": int(row[1]),
+            "output_tokens": int(row[2]),
+            "latency_ms": float(row[3]),
+        }
+
+    def put(
+        self,
+        key: str,
+        response: str,
+        provider: str,
+        model: str,
+        temperature: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        latency_ms: float = 0.0,
+    ) -> None:
+        """
+        Armazena uma resposta e remove as entradas excedentes e expiradas.
+
+        Args:
+            key: Chave calculada por `response_cache_key`.
+            response: Texto da resposta.
+            provider: Provedor da LLM.
+            model: Modelo de chat.
+            temperature: Temperatura de geração.
+            input_tokens: Tokens do prompt informados pelo provedor (0 se desconhecido).
+            output_tokens: Tokens da resposta informados pelo provedor (0 se desconhecido).
+            latency_ms: Latência da chamada à LLM em milissegundos.
+        """
+        if not self.ensure_schema():
+            return
+
+        upsert = text(f"""
+            INSERT INTO {RESPONSE_CACHE_TABLE_NAME}
+                (key, provider, model, temperature, response, input_tokens, output_tokens, latency_ms)
+            VALUES (:key, :provider, :model, :temperature, :response, :input_tokens, :output_tokens, :latency_ms)
+            ON CONFLICT (key) DO UPDATE
+            SET response = EXCLUDED.response,
+                input_tokens = EXCLUDED.input_tokens,
+                output_tokens = EXCLUDED.output_tokens,
+                latency_ms = EXCLUDED.latency_ms,
+                created_at = now(),
+                last_used_at = now()
+        """)
+        prune = text(f"""
+            DELETE FROM {RESPONSE_CACHE_TABLE_NAME}
+            WHERE (:ttl > 0 AND created_at <= now() - make_interval(secs => :ttl))
+            OR key IN (
+                SELECT key FROM {RESPONSE_CACHE_TABLE_NAME}
+                ORDER BY last_used_at DESC
+                OFFSET :max_entries
+            )
+        """)
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(upsert, {
+                        "key": key,
+                        "provider": provider,
+                        "model": model,
+                        "temperature": float(temperature),
+                        "response": response,
+                        "input_tokens": int(input_tokens),
+                        "output_tokens": int(output_tokens),
+                        "latency_ms": float(latency_ms),
+                    })
+                    conn.execute(prune, {"ttl": self.ttl_seconds, "max_entries": self.max_entries})
+        except sa.exc.SQLAlchemyError as e:
+            logger.warning(f"Erro ao gravar no cache de respostas: {e}")
+
+
+def response_cache_enabled(temperature: float) -> bool:
+    """
+    Indica se o cache de respostas deve ser usado para a temperatura informada.
+
+    Por padrão o cache só é usado com temperatura 0 (respostas determinísticas);
+    `LLM_CACHE_ANY_TEMPERATURE` estende o uso a qualquer temperatura.
+
+    Args:
+        temperature: Temperatura efetiva da LLM.
+
+    Returns:
+        bool: True se o cache deve ser usado
+    """
+    if not Config.LLM_CACHE_ENABLED or not Config.DATABASE_URL:
+        return False
+    return float(temperature) == 0.0 or Config.LLM_CACHE_ANY_TEMPERATURE
+
+
+def build_response_cache(engine: Engine) -> LLMResponseCache:
+    """
+    Cria o cache de respostas com os limites configurados.
+
+    Args:
+        engine: Engine do SQLAlchemy usado para persistir o cache.
+
+    Returns:
+        `LLMResponseCache` com `Config.LLM_CACHE_MAX_ENTRIES` e `Config.LLM_CACHE_TTL`.
+    """
+    return LLMResponseCache(engine, Config.LLM_CACHE_MAX_ENTRIES, Config.LLM_CACHE_TTL)
+
+
+def usage_tokens(message: Any) -> tuple[int, int]:
+    """
+    Extrai (tokens de entrada, tokens de saída) de uma mensagem da LLM.
+
+    Args:
+        message: `AIMessage` retornada pelo modelo de chat.
+
+    Returns:
+        Tupla de contagens; (0, 0) se o provedor não informar o uso.
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    return int(usage.get("input_tokens", 0) or 0), int(usage.get("output_tokens", 0) or 0)
@@ -1,17 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import math
 import os
-from typing import Any, Optional, TypedDict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence, TypedDict
 
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 from sqlalchemy.exc import SQLAlchemyError
 from database import get_vector_store
 from config import Config
-from embeddings_manager import get_embeddings
+from embeddings_manager import get_embeddings, get_query_embeddings
+from embedding_cache import content_hash
+from adaptive_k import AdaptiveKStats, choose_k
+from diversity import diversify_documents
+from context_packer import ContextStats, TokenCounter, get_token_counter, pack_context
+from filters import (
+    AmbiguousSourceError,
+    MetadataFilter,
+    build_filter,
+    filter_scope,
+    merge_filters,
+    parse_inline_filters,
+    resolve_sources,
+)
 from llm_manager import get_llm
+from answer_cache import CachedAnswer, SemanticAnswerCache
+from response_cache import (
+    LLMResponseCache,
+    build_response_cache,
+    response_cache_enabled,
+    response_cache_key,
+    usage_tokens,
+)
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -44,6 +70,13 @@ PERGUNTA DO USUÁRIO:
 RESPONDA A "PERGUNTA DO USUÁRIO"
 """
 
+# Resposta das regras do prompt para perguntas sem trechos relevantes (dada sem chamar a LLM)
+NO_INFORMATION_ANSWER: str = "Não tenho informações necessárias para responder sua pergunta."
+# Resposta para um filtro de fontes que não corresponde a nenhum documento da base
+NO_MATCHING_SOURCES_ANSWER: str = (
+    "Nenhum documento da base corresponde ao filtro informado. Use o comando 'stats' para ver as fontes disponíveis."
+)
+
 
 def load_prompt_template(template_path: Optional[str] = None) -> str:
     """
@@ -91,7 +124,26 @@ class SourceSpec(TypedDict):
     source: Optional[str]
 
 
-class SearchWithSourcesResult(TypedDict):
+class StageTimings(TypedDict):
+    embed_ms: float
+    retrieve_ms: float
+    generate_ms: float
+
+
+class _SearchResultExtras(TypedDict, total=False):
+    cached: bool
+    cache_similarity: float
+    llm_cached: bool
+    timings: StageTimings
+    error: bool
+    filter: MetadataFilter
+    context: ContextStats
+    no_information: bool
+    adaptive_k: AdaptiveKStats
+    fallback: bool
+
+
+class SearchWithSourcesResult(_SearchResultExtras):
     answer: str
     sources: list[SourceSpec]
 
@@ -99,7 +151,9 @@ class SearchWithSourcesResult(TypedDict):
 def search_prompt(
     top_k: int = Config.TOP_K,
     temperature: Optional[float] = None,
-    template_path: Optional[str] = None
+    template_path: Optional[str] = None,
+    sources: Optional[Sequence[str]] = None,
+    pages: Optional[str] = None,
 ) -> Optional[Any]:
     """
     Cria e retorna uma chain LangChain configurada para realizar busca semântica 
@@ -109,9 +163,15 @@ def search_prompt(
         top_k: Número de documentos a recuperar (default: Config.TOP_K)
         temperature: Temperatura para geração do LLM (opcional)
         template_path: Caminho para template customizado (opcional)
+        sources: Restringe a busca a estas fontes (caminhos ou nomes de arquivo, opcional)
+        pages: Restringe a busca a um intervalo de páginas, ex: "3-7" (opcional)
         
     Returns:
-        Chain configurada do LangChain (pronta para `.invoke()`), ou None em caso de erro.
+        Chain configurada do LangChain (pronta para `.invoke()`), ou None em caso de erro
+        (inclusive com `VECTOR_BACKEND=numpy`: a chain usa o retriever do PGVector;
+        nesse backend, use `SearchSession`). Se `sources` não corresponder a um único
+        documento, a chain só responde que nenhum documento corresponde ao filtro (ou
+        quais são os candidatos), sem consultar a base.
 
     Examples:
         >>> from search import search_prompt
@@ -120,6 +180,9 @@ def search_prompt(
         True
     """
     try:
+        if Config.VECTOR_BACKEND == "numpy":
+            raise ValueError("search_prompt exige o backend 'pgvector'; com VECTOR_BACKEND=numpy, use SearchSession")
+
         # 1. Inicializar Embeddings
         embeddings = get_embeddings()
         
@@ -127,10 +190,29 @@ def search_prompt(
         from database import VectorStoreRepository
         repo = VectorStoreRepository(embeddings)
         
-        # 3. Criar Retriever
+        # 3. Criar Retriever (filtro de metadados aplicado pelo PGVector no WHERE)
+        search_kwargs: dict[str, Any] = {"k": top_k}
+        metadata_filter = build_filter(sources, pages)
+        if metadata_filter:
+            conditions: list[dict[str, Any]] = []
+            if "sources" in metadata_filter:
+                try:
+                    resolved = resolve_sources(metadata_filter["sources"], repo.list_sources())
+                except AmbiguousSourceError as e:
+                    message = str(e)
+                    return RunnableLambda(lambda _: message)
+                if not resolved:
+                    # Sem fontes, o `$in` vazio buscaria em vão: a chain responde direto
+                    return RunnableLambda(lambda _: NO_MATCHING_SOURCES_ANSWER)
+                conditions.append({"source": {"$in": resolved}})
+            if "page_min" in metadata_filter:
+                conditions.append({"page": {"$gte": metadata_filter["page_min"]}})
+            if "page_max" in metadata_filter:
+                conditions.append({"page": {"$lte": metadata_filter["page_max"]}})
+            search_kwargs["filter"] = conditions[0] if len(conditions) == 1 else {"$and": conditions}
         retriever = repo.as_retriever(
             search_type="similarity",
-            search_kwargs={"k": top_k}
+            search_kwargs=search_kwargs
         )
         
         # 4. Inicializar LLM
@@ -145,10 +227,10 @@ def search_prompt(
             input_variables=["contexto", "pergunta"]
         )
         
-        # 7. Função para formatar documentos recuperados
+        # 7. Função para formatar documentos recuperados (dentro do orçamento de tokens)
         def format_docs(docs: list[Document]) -> str:
             """Concatena o conteúdo dos documentos recuperados"""
-            return "\n\n".join(doc.page_content for doc in docs)
+            return pack_context(docs)["context"]
         
         # 8. Criar a Chain (Retriever → Format → Prompt → LLM → Parser)
         chain = (
@@ -177,20 +259,1088 @@ def search_prompt(
         logger.error(f"Erro inesperado ao criar a chain de busca: {e}", exc_info=True)
         return None
 
+def format_docs(docs: list[Document]) -> str:
+    """Concatena o conteúdo dos documentos recuperados"""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def extract_sources(docs: list[Document]) -> list[SourceSpec]:
+    """
+    Extrai as fontes únicas (arquivo + página) dos documentos recuperados.
+
+    Args:
+        docs: Documentos recuperados, na ordem de relevância.
+
+    Returns:
+        Lista de `SourceSpec` sem repetições, na ordem em que aparecem.
+    """
+    sources: list[SourceSpec] = []
+    seen_sources: set[str] = set()
+    for doc in docs:
+        # Criar identificador único para a fonte (arquivo + página)
+        source_id = f"{doc.metadata.get('source', 'desconhecido')}_p{doc.metadata.get('page', '??')}"
+        if source_id not in seen_sources:
+            sources.append({
+                "filename": doc.metadata.get("filename", doc.metadata.get("source")),
+                "page": doc.metadata.get("page") if isinstance(doc.metadata.get("page"), int) else None,
+                "source": doc.metadata.get("source")
+            })
+            seen_sources.add(source_id)
+    return sources
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Document]],
+    limit: int,
+    k: Optional[int] = None,
+) -> list[Document]:
+    """
+    Combina listas ordenadas de documentos por Reciprocal Rank Fusion.
+
+    Cada documento recebe `sum(1 / (k + posição))` sobre as listas em que aparece
+    (posição a partir de 1); apenas a ordem importa, não a escala dos scores, o que
+    permite somar rank textual e distância vetorial.
+
+    Args:
+        rankings: Listas de documentos, cada uma do mais para o menos relevante.
+        limit: Número de documentos a retornar.
+        k: Constante de suavização (None usa `Config.RRF_K`).
+
+    Returns:
+        Até `limit` documentos, do maior para o menor score combinado.
+
+    Examples:
+        >>> from langchain_core.documents import Document
+        >>> a, b, c = (Document(id=i, page_content=i) for i in "abc")
+        >>> [d.id for d in reciprocal_rank_fusion([[a, b], [b, c]], limit=3)]
+        ['b', 'a', 'c']
+    """
+    smoothing = Config.RRF_K if k is None else k
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranking in rankings:
+        for position, doc in enumerate(ranking, start=1):
+            key = doc.id or content_hash(doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (smoothing + position)
+            docs.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [docs[key] for key in ordered[:limit]]
+
+
+def apply_score_threshold(
+    rows: Sequence[tuple[Any, ...]],
+    min_similarity: Optional[float] = None,
+    gap_cutoff: Optional[float] = None,
+) -> list[tuple[Any, ...]]:
+    """
+    Descarta os candidatos da busca vetorial pouco similares à pergunta.
+
+    Args:
+        rows: Tuplas `(Document, distância de cosseno, ...)` da busca vetorial.
+        min_similarity: Similaridade de cosseno mínima (None usa `Config.MIN_SIMILARITY`; <= 0 desativa).
+        gap_cutoff: Queda relativa máxima em relação ao melhor candidato, ex: 0.25 mantém
+            quem tem pelo menos 75% da melhor similaridade (None usa `Config.SCORE_GAP_CUTOFF`; 0 desativa).
+
+    Returns:
+        Os candidatos que passam nos dois critérios, na ordem recebida.
+
+    Examples:
+        >>> rows = [("a", 0.2), ("b", 0.3), ("c", 0.7)]
+        >>> [row[0] for row in apply_score_threshold(rows, min_similarity=0.5, gap_cutoff=0)]
+        ['a', 'b']
+        >>> [row[0] for row in apply_score_threshold(rows, min_similarity=0, gap_cutoff=0.25)]
+        ['a', 'b']
+    """
+    minimum = Config.MIN_SIMILARITY if min_similarity is None else min_similarity
+    gap = Config.SCORE_GAP_CUTOFF if gap_cutoff is None else gap_cutoff
+    if not rows or (minimum <= 0 and gap <= 0):
+        return list(rows)
+
+    similarities = [1.0 - float(row[1]) for row in rows]
+    floor = minimum if minimum > 0 else -math.inf
+    best = max(similarities)
+    if gap > 0 and best > 0:
+        floor = max(floor, best * (1.0 - gap))
+    return [row for row, similarity in zip(rows, similarities) if similarity >= floor]
+
+
+def fallback_answer(contexto: str) -> str:
+    """Monta a resposta de fallback (trechos recuperados) usada quando a LLM falha."""
+    return (
+        "⚠️ **Aviso: O serviço de IA está instável ou indisponível no momento.**\n\n"
+        "Abaixo estão os trechos mais relevantes encontrados nos documentos que podem ajudar:\n\n"
+        "--- Contexto Recuperado ---\n\n"
+    ) + contexto
+
+
+def _is_auth_error(error: Exception) -> bool:
+    error_str = str(error)
+    return "API key not valid" in error_str or "400" in error_str
+
+
+def _auth_error_result() -> SearchWithSourcesResult:
+    return {
+        "answer": "❌ **Erro de Autenticação**: Sua API KEY parece inválida ou expirada. Verifique seu arquivo .env.",
+        "sources": [],
+        "error": True,
+    }
+
+
+def _cached_answer_result(
+    hit: CachedAnswer,
+    timings: StageTimings,
+    metadata_filter: Optional[MetadataFilter] = None,
+) -> SearchWithSourcesResult:
+    result: SearchWithSourcesResult = {
+        "answer": hit["answer"],
+        "sources": hit["sources"],
+        "cached": True,
+        "cache_similarity": hit["similarity"],
+        "timings": timings,
+    }
+    if metadata_filter:
+        result["filter"] = metadata_filter
+    return result
+
+
+def _no_matching_sources_result(
+    metadata_filter: Optional[MetadataFilter],
+    timings: StageTimings,
+    answer: str = NO_MATCHING_SOURCES_ANSWER,
+) -> SearchWithSourcesResult:
+    """Resposta para um filtro de fontes que não corresponde a um único documento da base."""
+    return {
+        "answer": answer,
+        "sources": [],
+        "timings": timings,
+        "filter": metadata_filter,
+    }
+
+
+def _no_information_result(
+    timings: StageTimings,
+    metadata_filter: Optional[MetadataFilter] = None,
+) -> SearchWithSourcesResult:
+    """Resposta padrão para perguntas sem trechos acima do limiar de similaridade."""
+    result: SearchWithSourcesResult = {
+        "answer": NO_INFORMATION_ANSWER,
+        "sources": [],
+        "timings": timings,
+        "no_information": True,
+    }
+    if metadata_filter:
+        result["filter"] = metadata_filter
+    return result
+
+
+def _error_result(error: Exception) -> SearchWithSourcesResult:
+    """Converte um erro da busca na resposta amigável correspondente (e registra no log)."""
+    if isinstance(error, ValueError):
+        logger.error(f"Erro de parâmetros na busca com fontes: {error}")
+        return {
+            "answer": f"Lamento, erro de configuração: {str(error)}",
+            "sources": [],
+            "error": True,
+        }
+    if isinstance(error, SQLAlchemyError):
+        logger.error(f"Erro de banco de dados na busca: {error}")
+        return {
+            "answer": "Lamento, ocorreu um erro ao consultar o banco de dados.",
+            "sources": [],
+            "error": True,
+        }
+    logger.error(f"Erro inesperado na busca com fontes: {error}", exc_info=error)
+    return {
+        "answer": f"Lamento, ocorreu um erro inesperado ao processar sua pergunta.",
+        "sources": [],
+        "error": True,
+    }
+
+
+# Executor da busca textual do modo híbrido, compartilhado por todas as sessões do
+# processo (criado na primeira busca híbrida; cada tarefa usa uma conexão do pool)
+_lexical_pool: Optional[ThreadPoolExecutor] = None
+_lexical_pool_lock = threading.Lock()
+
+
+def _get_lexical_pool() -> ThreadPoolExecutor:
+    """Retorna o executor compartilhado da busca textual, criando-o na primeira chamada."""
+    global _lexical_pool
+    with _lexical_pool_lock:
+        if _lexical_pool is None:
+            _lexical_pool = ThreadPoolExecutor(max_workers=max(1, Config.DB_POOL_SIZE), thread_name_prefix="lexical")
+        return _lexical_pool
+
+
+class SearchSession:
+    """
+    Sessão de busca reutilizável entre perguntas.
+
+    Construída uma vez (ex: no início do chat), mantém aquecidos o modelo de
+    embeddings, o repositório (com o pool de conexões compartilhado), a LLM e o
+    prompt compilado. Cada pergunta faz apenas o trabalho próprio da consulta:
+    vetorizar a pergunta, buscar no banco e chamar a LLM.
+    """
+
+    def __init__(
+        self,
+        top_k: int = Config.TOP_K,
+        temperature: Optional[float] = None,
+        template_path: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        hybrid: Optional[bool] = None,
+        diversify: Optional[bool] = None,
+        context_budget: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+        adaptive_k: Optional[bool] = None,
+        use_answer_cache: bool = True,
+    ) -> None:
+        """
+        Inicializa a sessão.
+
+        Args:
+            top_k: Número padrão de documentos a recuperar
+            temperature: Temperatura da LLM (opcional)
+            template_path: Caminho para template customizado (opcional)
+            ef_search: `hnsw.ef_search` padrão, se houver índice HNSW (opcional)
+            probes: `ivfflat.probes` padrão, se houver índice IVFFlat (opcional)
+            hybrid: Combina busca textual e vetorial com RRF (None usa `Config.HYBRID_SEARCH`)
+            diversify: MMR, remoção de quase-duplicatas e junção de chunks vizinhos
+                sobre os candidatos (None usa `Config.DIVERSIFY_RESULTS`)
+            context_budget: Tokens máximos do contexto no prompt (None usa
+                `Config.CONTEXT_TOKEN_BUDGET`; 0 = sem limite)
+            min_similarity: Similaridade mínima de um trecho para ir ao prompt; sem
+                nenhum, a pergunta é respondida sem a LLM (None usa `Config.MIN_SIMILARITY`)
+            adaptive_k: Escolhe o número de trechos de cada pergunta pela curva de
+                similaridades, ignorando `top_k` (None usa `Config.ADAPTIVE_TOP_K`)
+            use_answer_cache: Usa o cache semântico de respostas se `ANSWER_CACHE_ENABLED`;
+                sessões descartáveis (uma pergunta) passam False e evitam consultar a
+                versão do corpus
+
+        Raises:
+            FileNotFoundError: Se o template informado não existir.
+            ValueError: Se a configuração (API keys, banco) for inválida.
+        """
+        from database import get_repository
+
+        self.top_k: int = top_k
+        self.ef_search: Optional[int] = ef_search
+        self.probes: Optional[int] = probes
+        self.hybrid: bool = Config.HYBRID_SEARCH if hybrid is None else hybrid
+        self.diversify: bool = Config.DIVERSIFY_RESULTS if diversify is None else diversify
+        self.context_budget: int = Config.CONTEXT_TOKEN_BUDGET if context_budget is None else context_budget
+        self.token_counter: TokenCounter = get_token_counter()
+        self.min_similarity: float = Config.MIN_SIMILARITY if min_similarity is None else min_similarity
+        self.score_gap: float = Config.SCORE_GAP_CUTOFF
+        self.adaptive_k: bool = Config.ADAPTIVE_TOP_K if adaptive_k is None else adaptive_k
+        # Perguntas respondidas e quantas foram pelo atalho "sem informações" (sem LLM)
+        self.questions: int = 0
+        self.no_information: int = 0
+        self._stats_lock = threading.Lock()
+
+        self.embeddings: Any = get_query_embeddings()
+        self.repo = get_repository(self.embeddings)
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if use_answer_cache and Config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(Config.ANSWER_CACHE_THRESHOLD, Config.ANSWER_CACHE_SIZE)
+        self.prompt = PromptTemplate(
+            template=load_prompt_template(template_path),
+            input_variables=["contexto", "pergunta"]
+        )
+
+        # Falha ao inicializar a LLM não impede a busca: `ask` responde com o fallback
+        self.llm: Optional[Any] = None
+        self.chain: Optional[Any] = None
+        self.parser = StrOutputParser()
+        try:
+            self.llm = get_llm(temperature=temperature)
+            self.chain = self.prompt | self.llm | self.parser
+        except Exception as e:
+            logger.warning(f"Falha ao inicializar a LLM: {e}. Respostas usarão o Fallback.")
+
+        # Cache exato de respostas (por padrão só com temperatura 0)
+        self.temperature: float = temperature if temperature is not None else Config.RETRIEVAL_TEMPERATURE
+        self.response_cache: Optional[LLMResponseCache] = None
+        if response_cache_enabled(self.temperature):
+            self.response_cache = build_response_cache(self.repo.engine)
+
+    def cache_stats(self) -> dict[str, Any]:
+        """
+        Retorna os contadores dos caches usados pela sessão.
+
+        Returns:
+            Dicionário com as chaves `query_embeddings` (`QueryCacheStats`),
+            `answers` (`AnswerCacheStats`) e `llm_responses` (`ResponseCacheStats`)
+            dos caches ativos, e `no_information` (perguntas respondidas sem a LLM
+            por falta de trechos acima do limiar de similaridade).
+        """
+        stats: dict[str, Any] = {
+            "no_information": {"hits": self.no_information, "questions": self.questions},
+        }
+        if hasattr(self.embeddings, "stats"):
+            stats["query_embeddings"] = self.embeddings.stats()
+        if self.answer_cache is not None:
+            stats["answers"] = self.answer_cache.stats()
+        if self.response_cache is not None:
+            stats["llm_responses"] = self.response_cache.stats()
+        return stats
+
+    def generate(
+        self,
+        contexto: str,
+        question: str,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> tuple[str, bool]:
+        """
+        Gera a resposta da LLM para o contexto e a pergunta, usando o cache exato.
+
+        O prompt é renderizado e, se o cache de respostas estiver ativo, o hash de
+        (prompt, provedor, modelo, temperatura) é consultado antes de chamar a LLM.
+        Com `on_token`, a resposta é gerada via `.stream()` e cada trecho é entregue
+        à callback assim que chega (uma resposta do cache é entregue de uma só vez).
+
+        Args:
+            contexto: Trechos recuperados, já concatenados
+            question: Pergunta do usuário
+            on_token: Callback chamada com cada trecho da resposta (opcional)
+
+        Returns:
+            Tupla (resposta, veio_do_cache).
+
+        Raises:
+            RuntimeError: Se a LLM não foi inicializada.
+            Exception: Erros do provedor são propagados (o chamador aplica o fallback).
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM não inicializada")
+
+        if self.response_cache is None and on_token is None:
+            return self.chain.invoke({"contexto": contexto, "pergunta": question}), False
+
+        rendered = self.prompt.format(contexto=contexto, pergunta=question)
+        key: Optional[str] = None
+        if self.response_cache is not None:
+            key = response_cache_key(rendered, Config.PROVIDER, Config.LLM_MODEL, self.temperature)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached["response"])
+                return cached["response"], True
+
+        start = time.perf_counter()
+        if on_token is None:
+            message = self.llm.invoke(rendered)
+        else:
+            message = None
+            for chunk in self.llm.stream(rendered):
+                # Os chunks são somados para preservar o uso de tokens informado pelo provedor
+                message = chunk if message is None else message + chunk
+                piece = self.parser.invoke(chunk)
+                if piece:
+                    on_token(piece)
+        latency_ms = (time.perf_counter() - start) * 1000
+        answer = self.parser.invoke(message) if message is not None else ""
+
+        if self.response_cache is not None and key is not None:
+            input_tokens, output_tokens = usage_tokens(message)
+            self.response_cache.put(
+                key,
+                answer,
+                Config.PROVIDER,
+                Config.LLM_MODEL,
+                self.temperature,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                latency_ms=latency_ms,
+            )
+        return answer, False
+
+    def warm_up(self) -> None:
+        """
+        Abre a primeira conexão do pool e carrega os metadados do índice ANN,
+        para que a primeira pergunta não pague esses custos.
+        """
+        self.repo.ann_index_info()
+        if self.hybrid:
+            from database import FULLTEXT_INDEX_NAME
+
+            if FULLTEXT_INDEX_NAME in self.repo.missing_indexes():
+                logger.warning(
+                    f"Índice de busca textual ausente ({FULLTEXT_INDEX_NAME}): a busca híbrida fará varredura "
+                    "completa até a próxima ingestão."
+                )
+
+    def resolve_filter(self, metadata_filter: Optional[MetadataFilter]) -> Optional[MetadataFilter]:
+        """
+        Converte os nomes de arquivo do filtro nos caminhos gravados em `source`.
+
+        Args:
+            metadata_filter: Filtro com caminhos ou nomes de arquivo (ver `filters.resolve_sources`).
+
+        Returns:
+            Filtro pronto para o repositório. `sources` vazio indica que nenhum
+            documento corresponde ao filtro.
+
+        Raises:
+            AmbiguousSourceError: Se parte de um nome corresponder a vários documentos.
+        """
+        if not metadata_filter or "sources" not in metadata_filter:
+            return metadata_filter or None
+        resolved: MetadataFilter = dict(metadata_filter)  # type: ignore[assignment]
+        resolved["sources"] = resolve_sources(metadata_filter["sources"], self.repo.list_sources())
+        return resolved
+
+    def retrieve(
+        self,
+        question: str,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[Document]:
+        """
+        Recupera os documentos mais relevantes para a pergunta.
+
+        Args:
+            question: Pergunta do usuário
+            top_k: Número de documentos (None usa o da sessão)
+            ef_search: `hnsw.ef_search` da consulta (None usa o da sessão)
+            probes: `ivfflat.probes` da consulta (None usa o da sessão)
+            metadata_filter: Restringe a busca a fontes/páginas (nomes de arquivo são resolvidos)
+
+        Returns:
+            Documentos recuperados, do mais para o menos relevante.
+        """
+        metadata_filter = self.resolve_filter(metadata_filter)
+        embedding = self.embeddings.embed_query(question)
+        if self.hybrid:
+            return self.retrieve_hybrid(
+                question, embedding, top_k=top_k, ef_search=ef_search, probes=probes, metadata_filter=metadata_filter
+            )
+        return self.retrieve_by_vector(
+            embedding, top_k=top_k, ef_search=ef_search, probes=probes, metadata_filter=metadata_filter
+        )
+
+    def retrieve_by_vector(
+        self,
+        embedding: list[float],
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[Document]:
+        """
+        Recupera os documentos mais próximos de um vetor de pergunta já calculado.
+
+        Args:
+            embedding: Vetor da pergunta
+            top_k: Número de documentos (None usa o da sessão)
+            ef_search: `hnsw.ef_search` da consulta (None usa o da sessão)
+            probes: `ivfflat.probes` da consulta (None usa o da sessão)
+            metadata_filter: Filtro já resolvido (ver `resolve_filter`), aplicado no WHERE da busca
+
+        Returns:
+            Documentos recuperados, do mais para o menos relevante, sem os abaixo do
+            limiar de similaridade (`apply_score_threshold`). Com `diversify`, os
+            candidatos vêm com os embeddings gravados e passam por
+            `diversity.diversify_documents` (podem sobrar menos de `top_k`). Com
+            `adaptive_k`, o número de documentos é escolhido por `adaptive_k.choose_k`.
+        """
+        return self._retrieve_by_vector(embedding, top_k, ef_search, probes, metadata_filter)[0]
+
+    def _retrieve_by_vector(
+        self,
+        embedding: list[float],
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> tuple[list[Document], Optional[AdaptiveKStats]]:
+        """`retrieve_by_vector` retornando também o k escolhido no modo adaptativo."""
+        k = self._max_k(top_k or self.top_k)
+        search = (
+            self.repo.similarity_search_with_embeddings if self.diversify
+            else self.repo.similarity_search_by_vector_with_score
+        )
+        rows = self._above_threshold(search(
+            embedding,
+            k=self._diversity_candidates(k) if self.diversify else k,
+            ef_search=ef_search or self.ef_search,
+            probes=probes or self.probes,
+            metadata_filter=metadata_filter,
+        ))
+        k, adaptive = self._choose_k(rows, k)
+        if not self.diversify:
+            return [row[0] for row in rows[:k]], adaptive
+        return diversify_documents(embedding, [row[0] for row in rows], [row[2] for row in rows], k), adaptive
+
+    def _above_threshold(self, rows: Sequence[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+        return apply_score_threshold(rows, self.min_similarity, self.score_gap)
+
+    def _max_k(self, k: int) -> int:
+        """No modo adaptativo a busca traz até `Config.ADAPTIVE_MAX_K` trechos, não `top_k`."""
+        return Config.ADAPTIVE_MAX_K if self.adaptive_k else k
+
+    def _choose_k(self, rows: Sequence[tuple[Any, ...]], k: int) -> tuple[int, Optional[AdaptiveKStats]]:
+        """Escolhe o k da pergunta pelas similaridades dos candidatos vetoriais (modo adaptativo)."""
+        if not self.adaptive_k or not rows:
+            return k, None
+        chosen = choose_k([1.0 - float(row[1]) for row in rows], max_k=k)
+        return chosen, {"k": chosen, "candidates": len(rows), "method": Config.ADAPTIVE_K_METHOD}
+
+    def _no_information(
+        self,
+        timings: StageTimings,
+        metadata_filter: Optional[MetadataFilter],
+    ) -> SearchWithSourcesResult:
+        with self._stats_lock:
+            self.no_information += 1
+        return _no_information_result(timings, metadata_filter)
+
+    def _candidates(self, k: int) -> int:
+        return max(k, Config.HYBRID_CANDIDATES)
+
+    def _diversity_candidates(self, k: int) -> int:
+        return max(k, Config.DIVERSITY_CANDIDATES)
+
+    @staticmethod
+    def _diversify_fused(
+        embedding: Sequence[float],
+        fused: list[Document],
+        vectors: dict[Any, list[float]],
+        k: int,
+    ) -> list[Document]:
+        """Diversifica o resultado da fusão RRF mantendo a ordem da fusão como relevância."""
+        kept = [doc for doc in fused if doc.id in vectors]
+        return diversify_documents(embedding, kept, [vectors[doc.id] for doc in kept], k, preserve_order=True)
+
+    def retrieve_hybrid(
+        self,
+        question: str,
+        embedding: list[float],
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> list[Document]:
+        """
+        Recuperação híbrida: busca textual (full-text) e vetorial em paralelo,
+        combinadas por Reciprocal Rank Fusion.
+
+        Cada busca retorna até `Config.HYBRID_CANDIDATES` candidatos (no mínimo `top_k`);
+        chunks bem posicionados nas duas listas sobem no resultado final.
+
+        Args:
+            question: Texto da pergunta (usado na busca textual)
+            embedding: Vetor da pergunta (usado na busca vetorial)
+            top_k: Número de documentos (None usa o da sessão)
+            ef_search: `hnsw.ef_search` da consulta (None usa o da sessão)
+            probes: `ivfflat.probes` da consulta (None usa o da sessão)
+            metadata_filter: Filtro já resolvido, aplicado nas duas buscas
+
+        Returns:
+            Documentos recuperados, do mais para o menos relevante; vazio se nenhum
+            candidato vetorial passar no limiar de similaridade. Com `diversify`,
+            a fusão mantém todos os candidatos e a diversificação escolhe os `top_k`
+            (os embeddings dos candidatos só textuais são lidos pelo ID). Com
+            `adaptive_k`, o número de documentos vem da curva de similaridades vetoriais.
+        """
+        return self._retrieve_hybrid(question, embedding, top_k, ef_search, probes, metadata_filter)[0]
+
+    def _retrieve_hybrid(
+        self,
+        question: str,
+        embedding: list[float],
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> tuple[list[Document], Optional[AdaptiveKStats]]:
+        """`retrieve_hybrid` retornando também o k escolhido no modo adaptativo."""
+        k = self._max_k(top_k or self.top_k)
+        candidates = self._candidates(k)
+        # Busca textual em paralelo à vetorial (uma conexão do pool cada)
+        lexical = _get_lexical_pool().submit(self.repo.lexical_search_with_score, question, candidates, metadata_filter)
+        search = (
+            self.repo.similarity_search_with_embeddings if self.diversify
+            else self.repo.similarity_search_by_vector_with_score
+        )
+        vector_rows = self._above_threshold(search(
+            embedding,
+            k=candidates,
+            ef_search=ef_search or self.ef_search,
+            probes=probes or self.probes,
+            metadata_filter=metadata_filter,
+        ))
+        if not vector_rows:
+            # Nenhum trecho semanticamente próximo: termos em comum não bastam
+            return [], None
+        k, adaptive = self._choose_k(vector_rows, k)
+        lexical_docs = [doc for doc, _ in lexical.result()]
+        fused = reciprocal_rank_fusion(
+            [[row[0] for row in vector_rows], lexical_docs], limit=candidates if self.diversify else k
+        )
+        if not self.diversify:
+            return fused, adaptive
+
+        vectors = {row[0].id: row[2] for row in vector_rows}
+        vectors.update(self.repo.get_embeddings_by_ids([doc.id for doc in fused if doc.id not in vectors]))
+        return self._diversify_fused(embedding, fused, vectors, k), adaptive
+
+    def ask(
+        self,
+        question: str,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        embedding: Optional[Sequence[float]] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> SearchWithSourcesResult:
+        """
+        Realiza a busca, gera a resposta e retorna também as fontes utilizadas.
+
+        Se o cache semântico estiver ativo e uma pergunta equivalente já tiver sido
+        respondida na versão atual do corpus, a resposta guardada é retornada sem
+        recuperação nem geração (`cached=True` no resultado).
+
+        Args:
+            question: Pergunta do usuário
+            top_k: Número de documentos a recuperar (None usa o da sessão)
+            ef_search: `hnsw.ef_search` da consulta (opcional)
+            probes: `ivfflat.probes` da consulta (opcional)
+            on_token: Callback para streaming: recebe os trechos da resposta à medida
+                que são gerados (incluindo respostas de cache e de fallback)
+            embedding: Vetor da pergunta já calculado (ex: em lote); pula a etapa de embeddings
+            metadata_filter: Restringe a busca a fontes/páginas. Filtros escritos na
+                pergunta (`in:<arquivo>`, `pag:3-7`) são removidos do texto e têm precedência.
+
+        Returns:
+            Dicionário contendo:
+            - `answer`: resposta gerada
+            - `sources`: lista de metadados das fontes utilizadas (arquivo/página)
+            - `cached`/`cache_similarity`: presentes quando a resposta veio do cache semântico
+            - `timings`: tempo de cada etapa em ms (embeddings, busca e geração)
+            - `filter`: filtro aplicado (com as fontes resolvidas), quando houver
+            - `context`: tokens do contexto enviado à LLM e tokens economizados pelo orçamento
+            - `no_information`: presente (True) quando nenhum trecho passou no limiar de
+              similaridade e a resposta padrão foi dada sem chamar a LLM
+            - `adaptive_k`: k escolhido e candidatos avaliados, no modo de top-k adaptativo
+            - `error`: presente (True) quando a resposta é uma mensagem de erro
+
+        Examples:
+            >>> from search import SearchSession
+            >>> session = SearchSession(top_k=10, temperature=0)
+            >>> result = session.ask("Qual o faturamento?")
+            >>> "answer" in result and "sources" in result
+            True
+        """
+        k = top_k or self.top_k
+        question, inline_filter = parse_inline_filters(question)
+        metadata_filter = merge_filters(metadata_filter, inline_filter)
+        with self._stats_lock:
+            self.questions += 1
+        try:
+            # 1. Vetorizar a pergunta, consultar o cache semântico e recuperar documentos
+            try:
+                timings: StageTimings = {"embed_ms": 0.0, "retrieve_ms": 0.0, "generate_ms": 0.0}
+                try:
+                    metadata_filter = self.resolve_filter(metadata_filter)
+                except AmbiguousSourceError as e:
+                    result = _no_matching_sources_result(metadata_filter, timings, answer=str(e))
+                    if on_token is not None:
+                        on_token(result["answer"])
+                    return result
+                if metadata_filter is not None and metadata_filter.get("sources") == []:
+                    result = _no_matching_sources_result(metadata_filter, timings)
+                    if on_token is not None:
+                        on_token(result["answer"])
+                    return result
+                scope = filter_scope(metadata_filter)
+
+                start = time.perf_counter()
+                vector = list(embedding) if embedding is not None else self.embeddings.embed_query(question)
+                timings["embed_ms"] = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                corpus_version = self.repo.corpus_version() if self.answer_cache is not None else None
+                if self.answer_cache is not None and corpus_version is not None:
+                    hit = self.answer_cache.lookup(vector, corpus_version, k, scope)
+                    if hit is not None:
+                        if on_token is not None:
+                            on_token(hit["answer"])
+                        return _cached_answer_result(hit, timings, metadata_filter)
+
+                if self.hybrid:
+                    docs, adaptive = self._retrieve_hybrid(
+                        question, vector, top_k=k, ef_search=ef_search, probes=probes, metadata_filter=metadata_filter
+                    )
+                else:
+                    docs, adaptive = self._retrieve_by_vector(
+                        vector, top_k=k, ef_search=ef_search, probes=probes, metadata_filter=metadata_filter
+                    )
+                timings["retrieve_ms"] = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                # Se falhar na busca (ex: API key inválida para embeddings), não há documentos para fallback.
+                if _is_auth_error(e):
+                    logger.warning(f"Falha de autenticação na busca: {e}")  # Warning em vez de Error para não alarmar no console
+                    return _auth_error_result()
+
+                logger.error(f"Erro na etapa de busca (Retrieval): {e}")
+                raise e # Relança outros erros para o except geral abaixo
+
+            # Nenhum trecho acima do limiar: a resposta das regras do prompt, sem chamar a LLM
+            if not docs:
+                result = self._no_information(timings, metadata_filter)
+                if on_token is not None:
+                    on_token(result["answer"])
+                return result
+
+            # 2. Montar o contexto dentro do orçamento de tokens (trechos mais relevantes primeiro)
+            packed = pack_context(docs, self.context_budget, self.token_counter)
+            contexto = packed["context"]
+            docs = packed["docs"]
+
+            # 3. Tentar Gerar resposta com LLM (com Fallback)
+            generated = False
+            llm_cached = False
+            start = time.perf_counter()
+            try:
+                answer, llm_cached = self.generate(contexto, question, on_token=on_token)
+                generated = True
+            except Exception as e:
+                logger.warning(f"Falha na execução da LLM: {e}. Ativando Fallback.")
+                answer = fallback_answer(contexto)
+                if on_token is not None:
+                    on_token("\n\n" + answer)
+            timings["generate_ms"] = (time.perf_counter() - start) * 1000
+
+            # 4. Extrair fontes (metadados únicos)
+            sources = extract_sources(docs)
+
+            # Respostas de fallback não são guardadas: a próxima pergunta tenta a LLM de novo
+            if generated and self.answer_cache is not None and corpus_version is not None:
+                self.answer_cache.store(vector, corpus_version, k, answer, sources, scope)
+
+            result: SearchWithSourcesResult = {
+                "answer": answer,
+                "sources": sources,
+                "timings": timings,
+            }
+            if llm_cached:
+                result["llm_cached"] = True
+            if not generated:
+                # Trechos brutos no lugar da resposta: quem grava resultados trata como falha
+                result["fallback"] = True
+            if metadata_filter:
+                result["filter"] = metadata_filter
+            result["context"] = packed["stats"]
+            if adaptive is not None:
+                result["adaptive_k"] = adaptive
+            return result
+
+        except Exception as e:
+            return _error_result(e)
+
+    async def agenerate(self, contexto: str, question: str) -> tuple[str, bool]:
+        """
+        Versão assíncrona de `generate` (via `ainvoke` da LLM).
+
+        O cache de respostas é consultado e gravado em uma thread (`asyncio.to_thread`).
+
+        Args:
+            contexto: Trechos recuperados, já concatenados
+            question: Pergunta do usuário
+
+        Returns:
+            Tupla (resposta, veio_do_cache).
+        """
+        if self.llm is None:
+            raise RuntimeError("LLM não inicializada")
+
+        if self.response_cache is None:
+            return await self.chain.ainvoke({"contexto": contexto, "pergunta": question}), False
+
+        rendered = self.prompt.format(contexto=contexto, pergunta=question)
+        key = response_cache_key(rendered, Config.PROVIDER, Config.LLM_MODEL, self.temperature)
+        cached = await asyncio.to_thread(self.response_cache.get, key)
+        if cached is not None:
+            return cached["response"], True
+
+        start = time.perf_counter()
+        message = await self.llm.ainvoke(rendered)
+        latency_ms = (time.perf_counter() - start) * 1000
+        answer = self.parser.invoke(message)
+
+        input_tokens, output_tokens = usage_tokens(message)
+        await asyncio.to_thread(
+            self.response_cache.put,
+            key,
+            answer,
+            Config.PROVIDER,
+            Config.LLM_MODEL,
+            self.temperature,
+            input_tokens,
+            output_tokens,
+            latency_ms,
+        )
+        return answer, False
+
+    async def aask(
+        self,
+        question: str,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        embedding: Optional[Sequence[float]] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> SearchWithSourcesResult:
+        """
+        Versão assíncrona de `ask`: embeddings via `aembed_query`, busca no engine
+        assíncrono e geração via `ainvoke`. Várias perguntas podem ser atendidas
+        concorrentemente no mesmo event loop, sem uma thread por pergunta.
+
+        Args:
+            question: Pergunta do usuário
+            top_k: Número de documentos a recuperar (None usa o da sessão)
+            ef_search: `hnsw.ef_search` da consulta (opcional)
+            probes: `ivfflat.probes` da consulta (opcional)
+            embedding: Vetor da pergunta já calculado (opcional)
+            metadata_filter: Restringe a busca a fontes/páginas (como em `ask`)
+
+        Returns:
+            O mesmo `SearchWithSourcesResult` de `ask`.
+
+        Examples:
+            >>> import asyncio
+            >>> from search import SearchSession
+            >>> session = SearchSession(top_k=10, temperature=0)
+            >>> result = asyncio.run(session.aask("Qual o faturamento?"))
+            >>> "answer" in result and "sources" in result
+            True
+        """
+        k = top_k or self.top_k
+        question, inline_filter = parse_inline_filters(question)
+        metadata_filter = merge_filters(metadata_filter, inline_filter)
+        with self._stats_lock:
+            self.questions += 1
+        try:
+            # 1. Vetorizar a pergunta, consultar o cache semântico e recuperar documentos
+            try:
+                timings: StageTimings = {"embed_ms": 0.0, "retrieve_ms": 0.0, "generate_ms": 0.0}
+                try:
+                    metadata_filter = await asyncio.to_thread(self.resolve_filter, metadata_filter)
+                except AmbiguousSourceError as e:
+                    return _no_matching_sources_result(metadata_filter, timings, answer=str(e))
+                if metadata_filter is not None and metadata_filter.get("sources") == []:
+                    return _no_matching_sources_result(metadata_filter, timings)
+                scope = filter_scope(metadata_filter)
+
+                start = time.perf_counter()
+                vector = list(embedding) if embedding is not None else await self.embeddings.aembed_query(question)
+                timings["embed_ms"] = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                corpus_version = await self.repo.acorpus_version() if self.answer_cache is not None else None
+                if self.answer_cache is not None and corpus_version is not None:
+                    hit = self.answer_cache.lookup(vector, corpus_version, k, scope)
+                    if hit is not None:
+                        return _cached_answer_result(hit, timings, metadata_filter)
+
+                max_k = self._max_k(k)
+                if self.hybrid:
+                    search_k = self._candidates(max_k)
+                else:
+                    search_k = self._diversity_candidates(max_k) if self.diversify else max_k
+                search = (
+                    self.repo.asimilarity_search_with_embeddings if self.diversify
+                    else self.repo.asimilarity_search_by_vector_with_score
+                )
+                vector_search = search(
+                    vector,
+                    k=search_k,
+                    ef_search=ef_search or self.ef_search,
+                    probes=probes or self.probes,
+                    metadata_filter=metadata_filter,
+                )
+                if self.hybrid:
+                    rows, lexical = await asyncio.gather(
+                        vector_search,
+                        self.repo.alexical_search_with_score(question, search_k, metadata_filter),
+                    )
+                    rows = self._above_threshold(rows)
+                    max_k, adaptive = self._choose_k(rows, max_k)
+                    docs = [] if not rows else reciprocal_rank_fusion(
+                        [[row[0] for row in rows], [doc for doc, _ in lexical]],
+                        limit=search_k if self.diversify else max_k,
+                    )
+                    if self.diversify and docs:
+                        vectors = {row[0].id: row[2] for row in rows}
+                        vectors.update(await self.repo.aget_embeddings_by_ids(
+                            [doc.id for doc in docs if doc.id not in vectors]
+                        ))
+                        docs = self._diversify_fused(vector, docs, vectors, max_k)
+                else:
+                    rows = self._above_threshold(await vector_search)
+                    max_k, adaptive = self._choose_k(rows, max_k)
+                    if self.diversify:
+                        docs = diversify_documents(vector, [row[0] for row in rows], [row[2] for row in rows], max_k)
+                    else:
+                        docs = [row[0] for row in rows[:max_k]]
+                timings["retrieve_ms"] = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                if _is_auth_error(e):
+                    logger.warning(f"Falha de autenticação na busca: {e}")
+                    return _auth_error_result()
+
+                logger.error(f"Erro na etapa de busca (Retrieval): {e}")
+                raise e
+
+            if not docs:
+                return self._no_information(timings, metadata_filter)
+
+            # 2. Montar o contexto dentro do orçamento de tokens (trechos mais relevantes primeiro)
+            packed = pack_context(docs, self.context_budget, self.token_counter)
+            contexto = packed["context"]
+            docs = packed["docs"]
+
+            # 3. Tentar Gerar resposta com LLM (com Fallback)
+            generated = False
+            llm_cached = False
+            start = time.perf_counter()
+            try:
+                answer, llm_cached = await self.agenerate(contexto, question)
+                generated = True
+            except Exception as e:
+                logger.warning(f"Falha na execução da LLM: {e}. Ativando Fallback.")
+                answer = fallback_answer(contexto)
+            timings["generate_ms"] = (time.perf_counter() - start) * 1000
+
+            # 4. Extrair fontes (metadados únicos)
+            sources = extract_sources(docs)
+
+            if generated and self.answer_cache is not None and corpus_version is not None:
+                self.answer_cache.store(vector, corpus_version, k, answer, sources, scope)
+
+            result: SearchWithSourcesResult = {
+                "answer": answer,
+                "sources": sources,
+                "timings": timings,
+            }
+            if llm_cached:
+                result["llm_cached"] = True
+            if not generated:
+                # Trechos brutos no lugar da resposta: quem grava resultados trata como falha
+                result["fallback"] = True
+            if metadata_filter:
+                result["filter"] = metadata_filter
+            result["context"] = packed["stats"]
+            if adaptive is not None:
+                result["adaptive_k"] = adaptive
+            return result
+
+        except Exception as e:
+            return _error_result(e)
+
+
+def create_search_session(
+    top_k: int = Config.TOP_K,
+    temperature: Optional[float] = None,
+    template_path: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    hybrid: Optional[bool] = None,
+    diversify: Optional[bool] = None,
+    context_budget: Optional[int] = None,
+    min_similarity: Optional[float] = None,
+    adaptive_k: Optional[bool] = None,
+) -> Optional[SearchSession]:
+    """
+    Cria e aquece uma `SearchSession`.
+
+    Args:
+        top_k: Número de documentos a recuperar (default: Config.TOP_K)
+        temperature: Temperatura para geração do LLM (opcional)
+        template_path: Caminho para template customizado (opcional)
+        ef_search: `hnsw.ef_search` padrão (opcional)
+        probes: `ivfflat.probes` padrão (opcional)
+        hybrid: Recuperação híbrida textual + vetorial (None usa `Config.HYBRID_SEARCH`)
+        diversify: MMR + remoção de duplicados + junção de chunks vizinhos (None usa `Config.DIVERSIFY_RESULTS`)
+        context_budget: Tokens máximos do contexto (None usa `Config.CONTEXT_TOKEN_BUDGET`; 0 = sem limite)
+        min_similarity: Similaridade mínima dos trechos (None usa `Config.MIN_SIMILARITY`; 0 = desativado)
+        adaptive_k: Top-k escolhido por pergunta pela curva de similaridades (None usa `Config.ADAPTIVE_TOP_K`)
+
+    Returns:
+        Sessão pronta para `.ask()`, ou None em caso de erro.
+
+    Examples:
+        >>> from search import create_search_session
+        >>> session = create_search_session(top_k=10, temperature=0)
+        >>> session is not None
+        True
+    """
+    try:
+        session = SearchSession(
+            top_k=top_k,
+            temperature=temperature,
+            template_path=template_path,
+            ef_search=ef_search,
+            probes=probes,
+            hybrid=hybrid,
+            diversify=diversify,
+            context_budget=context_budget,
+            min_similarity=min_similarity,
+            adaptive_k=adaptive_k,
+        )
+        session.warm_up()
+        logger.info("Sessão de busca criada com sucesso!")
+        return session
+
+    except FileNotFoundError as e:
+        logger.error(f"Erro ao carregar template: {e}")
+        return None
+    except ValueError as e:
+        logger.error(f"Erro de configuração ou parâmetros na busca: {e}")
+        return None
+    except SQLAlchemyError as e:
+        logger.error(f"Erro de banco de dados ao criar sessão de busca: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Erro inesperado ao criar a sessão de busca: {e}", exc_info=True)
+        return None
+
+
 def search_with_sources(
     question: str,
     top_k: int = Config.TOP_K,
     temperature: Optional[float] = None,
     template_path: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    sources: Optional[Sequence[str]] = None,
+    pages: Optional[str] = None,
+    min_similarity: Optional[float] = None,
+    adaptive_k: Optional[bool] = None,
 ) -> SearchWithSourcesResult:
     """
     Realiza a busca, gera a resposta e retorna também as fontes utilizadas.
+
+    Cria uma `SearchSession` descartável a cada chamada; para várias perguntas,
+    prefira criar a sessão uma vez e chamar `SearchSession.ask`.
     
     Args:
         question: Pergunta do usuário
         top_k: Número de documentos a recuperar
         temperature: Temperatura da LLM
         template_path: Caminho para template customizado (opcional)
+        ef_search: `hnsw.ef_search` da consulta, se houver índice HNSW (opcional)
+        probes: `ivfflat.probes` da consulta, se houver índice IVFFlat (opcional)
+        sources: Restringe a busca a estas fontes (caminhos ou nomes de arquivo, opcional)
+        pages: Restringe a busca a um intervalo de páginas, ex: "3-7" (opcional)
+        min_similarity: Similaridade mínima dos trechos; sem nenhum acima dela, a resposta
+            padrão "Não tenho informações..." é dada sem chamar a LLM (None usa `Config.MIN_SIMILARITY`)
+        adaptive_k: Escolhe o número de trechos pela curva de similaridades (None usa `Config.ADAPTIVE_TOP_K`)
         
     Returns:
         Dicionário contendo:
@@ -202,101 +1352,80 @@ def search_with_sources(
         >>> result = search_with_sources("Qual o faturamento?", top_k=10, temperature=0)
         >>> "answer" in result and "sources" in result
         True
+        >>> result = search_with_sources("Qual o lucro líquido?", sources=["balanco.pdf"], pages="3-5")
     """
     try:
-        # 1. Inicializar Embeddings
-        embeddings = get_embeddings()
-        
-        # 2. Conectar ao Repositório
-        from database import VectorStoreRepository
-        repo = VectorStoreRepository(embeddings)
-        
-        # 3. Recuperar documentos
-        # 3. Recuperar documentos
-        try:
-            docs: list[Document] = repo.vector_store.similarity_search(question, k=top_k)
-        except Exception as e:
-            # Se falhar na busca (ex: API key inválida para embeddings), não há documentos para fallback.
-            error_str = str(e)
-            if "API key not valid" in error_str or "400" in error_str:
-                logger.warning(f"Falha de autenticação na busca: {e}")  # Warning em vez de Error para não alarmar no console
-                return {
-                    "answer": "❌ **Erro de Autenticação**: Sua API KEY parece inválida ou expirada. Verifique seu arquivo .env.",
-                    "sources": []
-                }
-            
-            logger.error(f"Erro na etapa de busca (Retrieval): {e}")
-            raise e # Relança outros erros para o except geral abaixo
-        
-        # 4. Formatar contexto
-        def format_docs(docs: list[Document]) -> str:
-            return "\n\n".join(doc.page_content for doc in docs)
-        
-        contexto = format_docs(docs)
-        
-        # 5. Tentar Gerar resposta com LLM (com Fallback)
-        try:
-            # Inicializar LLM
-            llm = get_llm(temperature=temperature)
-            
-            # Carregar template de prompt
-            prompt_template_str = load_prompt_template(template_path)
-            
-            # Criar o Prompt Template
-            prompt = PromptTemplate(
-                template=prompt_template_str,
-                input_variables=["contexto", "pergunta"]
-            )
-            
-            # Gerar resposta
-            chain = prompt | llm | StrOutputParser()
-            answer = chain.invoke({"contexto": contexto, "pergunta": question})
-            
-        except Exception as e:
-            logger.warning(f"Falha na execução da LLM: {e}. Ativando Fallback.")
-            
-            # Construir resposta de fallback
-            answer = (
-                "⚠️ **Aviso: O serviço de IA está instável ou indisponível no momento.**\n\n"
-                "Abaixo estão os trechos mais relevantes encontrados nos documentos que podem ajudar:\n\n"
-                "--- Contexto Recuperado ---\n\n"
-            )
-            answer += contexto
-        
-        # 9. Extrair fontes (metadados únicos)
-        sources: list[SourceSpec] = []
-        seen_sources: set[str] = set()
-        for doc in docs:
-            # Criar identificador único para a fonte (arquivo + página)
-            source_id = f"{doc.metadata.get('source', 'desconhecido')}_p{doc.metadata.get('page', '??')}"
-            if source_id not in seen_sources:
-                sources.append({
-                    "filename": doc.metadata.get("filename", doc.metadata.get("source")),
-                    "page": doc.metadata.get("page") if isinstance(doc.metadata.get("page"), int) else None,
-                    "source": doc.metadata.get("source")
-                })
-                seen_sources.add(source_id)
-        
-        return {
-            "answer": answer,
-            "sources": sources
-        }
-        
-    except ValueError as e:
-        logger.error(f"Erro de parâmetros na busca com fontes: {e}")
-        return {
-            "answer": f"Lamento, erro de configuração: {str(e)}",
-            "sources": []
-        }
-    except SQLAlchemyError as e:
-        logger.error(f"Erro de banco de dados na busca: {e}")
-        return {
-            "answer": "Lamento, ocorreu um erro ao consultar o banco de dados.",
-            "sources": []
-        }
+        metadata_filter = build_filter(sources, pages)
+        session = SearchSession(
+            top_k=top_k,
+            temperature=temperature,
+            template_path=template_path,
+            ef_search=ef_search,
+            probes=probes,
+            min_similarity=min_similarity,
+            adaptive_k=adaptive_k,
+            # Cache vazio numa sessão de uma pergunta nunca acerta
+            use_answer_cache=False,
+        )
     except Exception as e:
-        logger.error(f"Erro inesperado na busca com fontes: {e}", exc_info=True)
-        return {
-            "answer": f"Lamento, ocorreu um erro inesperado ao processar sua pergunta.",
-            "sources": []
-        }
\ No newline at end of file
+        return _error_result(e)
+    return session.ask(question, metadata_filter=metadata_filter)
+
+
+async def asearch_with_sources(
+    question: str,
+    top_k: int = Config.TOP_K,
+    temperature: Optional[float] = None,
+    template_path: Optional[str] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    sources: Optional[Sequence[str]] = None,
+    pages: Optional[str] = None,
+    min_similarity: Optional[float] = None,
+    adaptive_k: Optional[bool] = None,
+) -> SearchWithSourcesResult:
+    """
+    Versão assíncrona de `search_with_sources`.
+
+    Para atender várias perguntas concorrentes, prefira criar uma `SearchSession`
+    e chamar `SearchSession.aask` em cada tarefa.
+
+    Args:
+        question: Pergunta do usuário
+        top_k: Número de documentos a recuperar
+        temperature: Temperatura da LLM
+        template_path: Caminho para template customizado (opcional)
+        ef_search: `hnsw.ef_search` da consulta, se houver índice HNSW (opcional)
+        probes: `ivfflat.probes` da consulta, se houver índice IVFFlat (opcional)
+        sources: Restringe a busca a estas fontes (caminhos ou nomes de arquivo, opcional)
+        pages: Restringe a busca a um intervalo de páginas, ex: "3-7" (opcional)
+        min_similarity: Similaridade mínima dos trechos; sem nenhum acima dela, a resposta
+            padrão "Não tenho informações..." é dada sem chamar a LLM (None usa `Config.MIN_SIMILARITY`)
+        adaptive_k: Escolhe o número de trechos pela curva de similaridades (None usa `Config.ADAPTIVE_TOP_K`)
+
+    Returns:
+        O mesmo `SearchWithSourcesResult` de `search_with_sources`.
+
+    Examples:
+        >>> import asyncio
+        >>> from search import asearch_with_sources
+        >>> result = asyncio.run(asearch_with_sources("Qual o faturamento?", top_k=10))
+        >>> "answer" in result and "sources" in result
+        True
+    """
+    try:
+        metadata_filter = build_filter(sources, pages)
+        session = SearchSession(
+            top_k=top_k,
+            temperature=temperature,
+            template_path=template_path,
+            ef_search=ef_search,
+            probes=probes,
+            min_similarity=min_similarity,
+            adaptive_k=adaptive_k,
+            # Cache vazio numa sessão de uma pergunta nunca acerta
+            use_answer_cache=False,
+        )
+    except Exception as e:
+        return _error_result(e)
+    return await session.aask(question, metadata_filter=metadata_filter)
@@ -0,0 +1,567 @@
+"""
+Serviço HTTP Local de Consultas
+
+Processo de longa duração que mantém uma `SearchSession` aquecida (embeddings, LLM,
+prompt compilado e pool de conexões compartilhado) e atende consultas via HTTP/JSON,
+sem o custo de iniciar um processo por consulta.
+
+Endpoints:
+    POST /ask      {"question": str, "top_k"?: int, "ef_search"?: int, "probes"?: int,
+                    "sources"?: [str], "pages"?: str}
+    GET  /stats    Banco, pool de conexões, caches, fila e agrupamento de perguntas
+    POST /add      {"path": str, "incremental"?: bool}  (PDF, diretório, glob ou manifesto)
+    POST /remove   {"source": str}  (caminho ou nome do arquivo)
+    GET  /health
+
+Perguntas idênticas em andamento (mesmo texto normalizado e parâmetros) compartilham
+uma única busca + chamada à LLM. As perguntas que chegam a executar passam por um
+limitador de concorrência com fila limitada; acima da fila, o serviço responde 503.
+
+Uso:
+    python src/server.py --port 8000 --concurrency 4 --max-queue 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, Optional, TypedDict, TypeVar
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import Config
+from db_pool import get_pool_stats
+from embedding_cache import normalize_query
+from filters import MetadataFilter, build_filter, filter_scope
+from logger import get_logger, set_global_log_level
+from search import SearchSession, SearchWithSourcesResult, create_search_session
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class ServiceOverloaded(Exception):
+    """Exceção lançada quando a fila do limitador está cheia ou a espera expira."""
+    pass
+
+
+class LimiterStats(TypedDict):
+    max_concurrent: int
+    max_queue: int
+    active: int
+    queued: int
+    peak_queued: int
+    admitted: int
+    rejected: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class CoalescerStats(TypedDict):
+    in_flight: int
+    leaders: int
+    coalesced: int
+
+
+class ConcurrencyLimiter:
+    """
+    Limita as execuções simultâneas e mede a fila de espera.
+
+    Até `max_concurrent` execuções rodam ao mesmo tempo; as demais aguardam, no
+    máximo `max_queue` por vez e por até `queue_timeout` segundos.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float) -> None:
+        """
+        Args:
+            max_concurrent: Execuções simultâneas permitidas.
+            max_queue: Máximo de requisições aguardando vaga (acima disso, rejeita).
+            queue_timeout: Espera máxima por uma vaga, em segundos.
+        """
+        self.max_concurrent: int = max(1, max_concurrent)
+        self.max_queue: int = max(0, max_queue)
+        self.queue_timeout: float = queue_timeout
+        self._slots = threading.Semaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self.active: int = 0
+        self.queued: int = 0
+        self.peak_queued: int = 0
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.total_wait_seconds: float = 0.0
+        self.max_wait_seconds: float = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """
+        Ocupa uma vaga durante o bloco `with`.
+
+        Yields:
+            Tempo de espera na fila, em milissegundos.
+
+        Raises:
+            ServiceOverloaded: Se a fila estiver cheia ou a espera exceder `queue_timeout`.
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.queued >= self.max_queue:
+                    self.rejected += 1
+                    raise ServiceOverloaded("Fila de consultas cheia")
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self.queued -= 1
+                if not acquired:
+                    self.rejected += 1
+            if not acquired:
+                raise ServiceOverloaded(f"Nenhuma vaga livre em {self.queue_timeout:.0f}s")
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.active += 1
+            self.admitted += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            yield waited * 1000
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def stats(self) -> LimiterStats:
+        """Retorna um retrato da ocupação e da fila."""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.total_wait_seconds / self.admitted * 1000 if self.admitted else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+class _InFlightCall:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """
+    Agrupa chamadas idênticas em andamento ("single flight").
+
+    A primeira chamada com uma chave executa a função; as que chegam enquanto ela
+    não termina aguardam e recebem o mesmo resultado (ou a mesma exceção). Nada é
+    guardado depois que a chamada termina: isso é papel dos caches da sessão.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Any, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.leaders: int = 0
+        self.coalesced: int = 0
+
+    def run(self, key: Any, fn: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Executa `fn` ou aguarda a execução idêntica já em andamento.
+
+        Args:
+            key: Chave que identifica chamadas equivalentes (hashable).
+            fn: Função a executar.
+
+        Returns:
+            Tupla (resultado, agrupada): `agrupada` é True se o resultado veio de outra chamada.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> CoalescerStats:
+        """Retorna os contadores de agrupamento."""
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class QueryService:
+    """
+    Operações do serviço HTTP sobre uma `SearchSession` compartilhada.
+    """
+
+    def __init__(self, session: SearchSession, limiter: ConcurrencyLimiter) -> None:
+        """
+        Args:
+            session: Sessão de busca aquecida, compartilhada por todas as requisições.
+            limiter: Limitador de concorrência das perguntas.
+        """
+        self.session: SearchSession = session
+        self.limiter: ConcurrencyLimiter = limiter
+        self.coalescer: RequestCoalescer = RequestCoalescer()
+        # Ingestões e remoções são serializadas (uma escrita por vez)
+        self._write_lock = threading.Lock()
+        self.started_at: float = time.time()
+
+    def ask(
+        self,
+        question: str,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> dict[str, Any]:
+        """
+        Responde uma pergunta, agrupando-a com perguntas idênticas em andamento.
+
+        Args:
+            question: Pergunta do usuário.
+            top_k: Número de documentos a recuperar (None usa o da sessão).
+            ef_search: `hnsw.ef_search` da consulta (opcional).
+            probes: `ivfflat.probes` da consulta (opcional).
+            metadata_filter: Restringe a busca a documentos/páginas (opcional).
+
+        Returns:
+            O `SearchWithSourcesResult` da pergunta, mais `coalesced`, `queue_ms` e `elapsed_ms`.
+
+        Raises:
+            ServiceOverloaded: Se a pergunta não conseguir vaga no limitador.
+        """
+        start = time.perf_counter()
+        key = (normalize_query(question), top_k or self.session.top_k, ef_search, probes, filter_scope(metadata_filter))
+
+        def execute() -> tuple[SearchWithSourcesResult, float]:
+            with self.limiter.slot() as queue_ms:
+                result = self.session.ask(
+                    question, top_k=top_k, ef_search=ef_search, probes=probes, metadata_filter=metadata_filter
+                )
+                return result, queue_ms
+
+        (result, queue_ms), coalesced = self.coalescer.run(key, execute)
+        response: dict[str, Any] = dict(result)
+        response["coalesced"] = coalesced
+        response["queue_ms"] = queue_ms
+        response["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Reúne as métricas do banco, do pool, dos caches, do limitador e do agrupamento.
+
+        Returns:
+            Dicionário serializável em JSON.
+        """
+        repo = self.session.repo
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "database": {
+                "collection": Config.PG_VECTOR_COLLECTION_NAME,
+                "chunks": repo.count(),
+                "sources": repo.list_sources(),
+            },
+            "pool": get_pool_stats(),
+            "caches": self.session.cache_stats(),
+            "limiter": self.limiter.stats(),
+            "coalescing": self.coalescer.stats(),
+        }
+
+    def add(self, path: str, incremental: Optional[bool] = None) -> dict[str, Any]:
+        """
+        Ingere um PDF, diretório, glob ou manifesto (sobrescreve fontes existentes).
+
+        Args:
+            path: Entrada a ingerir.
+            incremental: Grava apenas os chunks alterados (None usa a configuração).
+
+        Returns:
+            Dicionário com `success` e, na ingestão em lote, o resultado por arquivo.
+
+        Raises:
+            FileNotFoundError: Se um PDF único não existir.
+            ValueError: Se a entrada for inválida.
+        """
+        from ingest import ingest_pdf, ingest_pdfs, is_multi_input, normalize_pdf_path
+
+        with self._write_lock:
+            if is_multi_input(path):
+                results = ingest_pdfs([path], quiet=True, incremental=incremental)
+                return {"success": all(r["success"] for r in results), "files": results}
+
+            pdf_path = normalize_pdf_path(path)
+            if not os.path.exists(pdf_path):
+                raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+            if not pdf_path.lower().endswith(".pdf"):
+                raise ValueError("O arquivo deve ser um PDF (.pdf)")
+            return {"success": ingest_pdf(pdf_path, quiet=True, incremental=incremental), "source": pdf_path}
+
+    def remove(self, source: str) -> Optional[dict[str, Any]]:
+        """
+        Remove todos os chunks de uma fonte (pelo caminho ou pelo nome do arquivo).
+
+        Args:
+            source: Caminho gravado no metadado `source` ou apenas o nome do arquivo.
+
+        Returns:
+            Dicionário com `removed` e a fonte encontrada, ou None se a fonte não existir.
+        """
+        repo = self.session.repo
+        with self._write_lock:
+            target = next(
+                (src for src in repo.list_sources() if src == source or os.path.basename(src) == source),
+                None,
+            )
+            if target is None:
+                return None
+            return {"removed": repo.delete_by_source(target), "source": target}
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    Traduz requisições HTTP/JSON para o `QueryService` do servidor.
+    """
+    server_version = "RAGQueryService/1.0"
+    service: QueryService  # definido em `build_server`
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("O corpo da requisição deve ser um objeto JSON")
+        return payload
+
+    def _dispatch(self, route: Callable[[], tuple[HTTPStatus, Any]]) -> None:
+        try:
+            status, payload = route()
+        except ServiceOverloaded as e:
+            status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        except json.JSONDecodeError as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": f"JSON inválido: {e}"}
+        except (ValueError, TypeError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except FileNotFoundError as e:
+            status, payload = HTTPStatus.NOT_FOUND, {"error": str(e)}
+        except SQLAlchemyError as e:
+            logger.error(f"Erro de banco de dados no serviço: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Erro ao consultar o banco de dados"}
+        except Exception as e:
+            logger.error(f"Erro inesperado no serviço: {e}", exc_info=True)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Erro inesperado"}
+        self._send_json(status, payload)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/stats":
+            self._dispatch(lambda: (HTTPStatus.OK, self.service.stats()))
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Rota desconhecida: {self.path}"})
+
+    def do_POST(self) -> None:
+        routes: dict[str, Callable[[], tuple[HTTPStatus, Any]]] = {
+            "/ask": self._ask,
+            "/add": self._add,
+            "/remove": self._remove,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Rota desconhecida: {self.path}"})
+            return
+        self._dispatch(route)
+
+    def _ask(self) -> tuple[HTTPStatus, Any]:
+        payload = self._read_json()
+        question = str(payload.get("question") or "").strip()
+        if not question:
+            raise ValueError("Campo 'question' obrigatório")
+        result = self.service.ask(
+            question,
+            top_k=_optional_int(payload, "top_k"),
+            ef_search=_optional_int(payload, "ef_search"),
+            probes=_optional_int(payload, "probes"),
+            metadata_filter=_metadata_filter(payload),
+        )
+        return HTTPStatus.OK, result
+
+    def _add(self) -> tuple[HTTPStatus, Any]:
+        payload = self._read_json()
+        path = str(payload.get("path") or "").strip()
+        if not path:
+            raise ValueError("Campo 'path' obrigatório")
+        incremental = payload.get("incremental")
+        result = self.service.add(path, incremental=bool(incremental) if incremental is not None else None)
+        return (HTTPStatus.OK if result["success"] else HTTPStatus.UNPROCESSABLE_ENTITY), result
+
+    def _remove(self) -> tuple[HTTPStatus, Any]:
+        payload = self._read_json()
+        source = str(payload.get("source") or "").strip()
+        if not source:
+            raise ValueError("Campo 'source' obrigatório")
+        result = self.service.remove(source)
+        if result is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Arquivo '{source}' não encontrado na base de dados"}
+        return (HTTPStatus.OK if result["removed"] else HTTPStatus.INTERNAL_SERVER_ERROR), result
+
+
+def _optional_int(payload: dict[str, Any], field: str) -> Optional[int]:
+    value = payload.get(field)
+    if value is None:
+        return None
+    value = int(value)
+    if value < 1:
+        raise ValueError(f"'{field}' deve ser positivo")
+    return value
+
+
+def _metadata_filter(payload: dict[str, Any]) -> Optional[MetadataFilter]:
+    sources = payload.get("sources")
+    if isinstance(sources, str):
+        sources = [sources]
+    if sources is not None and not (isinstance(sources, list) and all(isinstance(s, str) for s in sources)):
+        raise ValueError("'sources' deve ser uma lista de nomes de arquivo")
+    pages = payload.get("pages")
+    return build_filter(sources, str(pages) if pages is not None else None)
+
+
+def build_server(
+    service: QueryService,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+) -> ThreadingHTTPServer:
+    """
+    Cria o servidor HTTP (uma thread por conexão) ligado ao serviço.
+
+    Args:
+        service: Serviço de consultas.
+        host: Endereço de escuta (None usa `Config.SERVER_HOST`).
+        port: Porta (None usa `Config.SERVER_PORT`).
+
+    Returns:
+        `ThreadingHTTPServer` pronto para `serve_forever()`.
+    """
+    handler = type("BoundQueryRequestHandler", (QueryRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host or Config.SERVER_HOST, port or Config.SERVER_PORT), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    """
+    Função principal do serviço.
+    """
+    parser = argparse.ArgumentParser(description='Serviço HTTP local de consultas RAG')
+    parser.add_argument('--host', type=str, help=f'Endereço de escuta (default: {Config.SERVER_HOST})')
+    parser.add_argument('--port', type=int, help=f'Porta (default: {Config.SERVER_PORT})')
+    parser.add_argument('--concurrency', type=int, help=f'Perguntas executadas simultaneamente (default: {Config.SERVER_MAX_CONCURRENCY})')
+    parser.add_argument('--max-queue', type=int, help=f'Perguntas aguardando vaga antes de responder 503 (default: {Config.SERVER_MAX_QUEUE})')
+    parser.add_argument('--provider', type=str, choices=['google', 'openai'], default=None, help='Forçar provedor de IA (google/openai)')
+    parser.add_argument('--top-k', type=int, help=f'Número de documentos a recuperar (default: {Config.TOP_K})')
+    parser.add_argument('--temperature', type=float, help='Temperatura para geração (default: conforme Config)')
+    parser.add_argument('--ef-search', type=int, help=f'Candidatos por busca no índice HNSW (default: {Config.HNSW_EF_SEARCH})')
+    parser.add_argument('--probes', type=int, help=f'Listas visitadas por busca no índice IVFFlat (default: {Config.IVFFLAT_PROBES})')
+    parser.add_argument('--hybrid', action=argparse.BooleanOptionalAction, default=None, help=f'Busca textual + vetorial combinadas por RRF (default: {Config.HYBRID_SEARCH})')
+    parser.add_argument('--diversify', action=argparse.BooleanOptionalAction, default=None, help=f'MMR, remoção de trechos duplicados e junção de chunks vizinhos (default: {Config.DIVERSIFY_RESULTS})')
+    parser.add_argument('--context-tokens', type=int, help=f'Tokens máximos do contexto enviado à LLM, 0 = sem limite (default: {Config.CONTEXT_TOKEN_BUDGET})')
+    parser.add_argument('--min-similarity', type=float, help=f'Similaridade mínima dos trechos; abaixo dela a resposta padrão é dada sem a LLM, 0 = desativado (default: {Config.MIN_SIMILARITY})')
+    parser.add_argument('--adaptive-k', action=argparse.BooleanOptionalAction, default=None, help=f'Escolhe o número de trechos de cada pergunta pela curva de similaridades, entre ADAPTIVE_MIN_K e ADAPTIVE_MAX_K (default: {Config.ADAPTIVE_TOP_K})')
+    parser.add_argument('--prompt-template', type=str, help='Caminho para arquivo de template de prompt customizado')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Modo silencioso: oculta logs de inicialização')
+    args = parser.parse_args()
+
+    if args.quiet:
+        set_global_log_level(logging.WARNING)
+
+    try:
+        if args.provider:
+            Config.set_provider(args.provider)
+        Config.validate_config()
+    except ValueError as e:
+        print(f"\n❌ Erro de configuração: {e}\n")
+        sys.exit(1)
+
+    search_kwargs: dict[str, Any] = {}
+    if args.top_k is not None: search_kwargs['top_k'] = args.top_k
+    if args.temperature is not None: search_kwargs['temperature'] = args.temperature
+    if args.prompt_template is not None: search_kwargs['template_path'] = args.prompt_template
+    if args.ef_search is not None: search_kwargs['ef_search'] = args.ef_search
+    if args.probes is not None: search_kwargs['probes'] = args.probes
+    if args.hybrid is not None: search_kwargs['hybrid'] = args.hybrid
+    if args.diversify is not None: search_kwargs['diversify'] = args.diversify
+    if args.context_tokens is not None: search_kwargs['context_budget'] = args.context_tokens
+    if args.min_similarity is not None: search_kwargs['min_similarity'] = args.min_similarity
+    if args.adaptive_k is not None: search_kwargs['adaptive_k'] = args.adaptive_k
+
+    session = create_search_session(**search_kwargs)
+    if session is None:
+        print("❌ Não foi possível iniciar o serviço. Verifique as configurações no .env\n")
+        sys.exit(1)
+
+    limiter = ConcurrencyLimiter(
+        args.concurrency or Config.SERVER_MAX_CONCURRENCY,
+        args.max_queue if args.max_queue is not None else Config.SERVER_MAX_QUEUE,
+        Config.SEARCH_TIMEOUT,
+    )
+    server = build_server(QueryService(session, limiter), args.host, args.port)
+    host, port = server.server_address[:2]
+    if not args.quiet:
+        print(f"🚀 Serviço de consultas em http://{host}:{port} "
+              f"(concorrência {limiter.max_concurrent}, fila {limiter.max_queue})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        if not args.quiet:
+            print("\n👋 Serviço encerrado.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
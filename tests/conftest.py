@@ -0,0 +1,13 @@
+"""
+Configuração dos testes unitários (pytest).
+
+Os módulos do projeto ficam em `src/` e se importam pelo nome (`from config import
+Config`), como nos scripts; o diretório é adicionado ao `sys.path` aqui.
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,68 @@
+"""Testes da escolha do top-k pela curva de similaridades (`adaptive_k.choose_k`)."""
+
+import pytest
+
+from adaptive_k import choose_k
+
+# Três trechos muito similares e uma queda clara para o resto
+STEP = [0.91, 0.89, 0.88, 0.52, 0.50, 0.49, 0.47]
+# Similaridades parecidas: nenhum ponto de corte
+FLAT = [0.80, 0.79, 0.78, 0.77, 0.76]
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_cuts_at_the_drop(method):
+    assert choose_k(STEP, min_k=1, max_k=7, method=method) == 3
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_flat_curve_keeps_all_candidates(method):
+    assert choose_k(FLAT, min_k=1, max_k=5, method=method) == 5
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_never_below_min_k(method):
+    assert choose_k(STEP, min_k=5, max_k=7, method=method) >= 5
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_never_above_max_k(method):
+    assert choose_k(FLAT + [0.75, 0.74], min_k=1, max_k=4, method=method) == 4
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_fewer_candidates_than_min_k(method):
+    assert choose_k([0.9, 0.2], min_k=3, max_k=10, method=method) == 2
+    assert choose_k([], min_k=2, max_k=10, method=method) == 0
+
+
+@pytest.mark.parametrize("method", ["knee", "gap"])
+def test_drop_at_the_last_candidate(method):
+    # Curva côncava: o último ponto fica sobre a reta e não forma cotovelo
+    assert choose_k([0.90, 0.89, 0.88, 0.87, 0.30], min_k=1, max_k=5, method=method) == 4
+
+
+def test_knee_before_the_largest_drop_wins():
+    # Cotovelo após o 2º candidato; a maior queda destacada vem depois
+    scores = [0.95, 0.90, 0.70, 0.68, 0.66, 0.64, 0.40]
+
+    assert choose_k(scores, min_k=1, max_k=7, method="gap") == 6
+    assert choose_k(scores, min_k=1, max_k=7, method="knee") == 2
+
+
+def test_gap_ignores_small_drops():
+    # Maior queda (0.04) não chega a 2x a média (0.03)
+    assert choose_k([0.90, 0.87, 0.84, 0.80, 0.78], min_k=1, max_k=5, method="gap") == 5
+
+
+def test_gap_considers_only_drops_after_min_k():
+    # A queda logo após o 1º candidato é ignorada com min_k=2; vale a seguinte
+    scores = [0.95, 0.60, 0.58, 0.30, 0.29, 0.28]
+
+    assert choose_k(scores, min_k=1, max_k=6, method="gap") == 1
+    assert choose_k(scores, min_k=2, max_k=6, method="gap") == 3
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        choose_k(STEP, min_k=1, max_k=7, method="média")
@@ -0,0 +1,122 @@
+"""Testes dos filtros de metadados (`filters.parse_inline_filters`, `filters.merge_filters`, `filters.resolve_sources`)."""
+
+import pytest
+
+from filters import AmbiguousSourceError, merge_filters, parse_inline_filters, resolve_sources
+
+SOURCES = ["/docs/balanco_2024.pdf", "/docs/balanco_2023.pdf", "/docs/dre.pdf", "/outros/dre.pdf", "/docs/ata.pdf"]
+
+
+class TestParseInlineFilters:
+    def test_without_filters_returns_question_unchanged(self):
+        assert parse_inline_filters("Qual o  lucro?") == ("Qual o  lucro?", None)
+
+    def test_source_and_pages(self):
+        question, metadata_filter = parse_inline_filters("Qual o lucro? in:balanco.pdf pag:3-5")
+
+        assert question == "Qual o lucro?"
+        assert metadata_filter == {"sources": ["balanco.pdf"], "page_min": 3, "page_max": 5}
+
+    def test_quoted_source_with_spaces(self):
+        question, metadata_filter = parse_inline_filters('in:"Relatório 2024.pdf" Qual a receita?')
+
+        assert question == "Qual a receita?"
+        assert metadata_filter == {"sources": ["Relatório 2024.pdf"]}
+
+    def test_several_sources(self):
+        _, metadata_filter = parse_inline_filters("Compare in:a.pdf com in:b.pdf")
+
+        assert metadata_filter == {"sources": ["a.pdf", "b.pdf"]}
+
+    def test_filter_in_the_middle_of_the_question(self):
+        question, _ = parse_inline_filters("Qual o lucro in:dre.pdf em 2024?")
+
+        assert question == "Qual o lucro em 2024?"
+
+    def test_page_key_variants(self):
+        for key in ("pag", "pág", "pagina", "páginas", "page", "pages", "PAG"):
+            _, metadata_filter = parse_inline_filters(f"Resumo {key}:7")
+            assert metadata_filter == {"page_min": 7, "page_max": 7}, key
+
+    def test_open_page_ranges(self):
+        assert parse_inline_filters("x pag:3-")[1] == {"page_min": 3}
+        assert parse_inline_filters("x pag:-7")[1] == {"page_max": 7}
+
+    def test_invalid_page_range_stays_in_question(self):
+        question, metadata_filter = parse_inline_filters("O que diz pag:abc?")
+
+        assert question == "O que diz pag:abc?"
+        assert metadata_filter is None
+
+    def test_inverted_page_range_stays_in_question(self):
+        question, metadata_filter = parse_inline_filters("Resumo pag:7-3 in:a.pdf")
+
+        assert question == "Resumo pag:7-3"
+        assert metadata_filter == {"sources": ["a.pdf"]}
+
+    def test_key_must_start_a_word(self):
+        # "login:admin" não é um filtro `in:`
+        assert parse_inline_filters("Qual o login:admin?") == ("Qual o login:admin?", None)
+
+
+class TestMergeFilters:
+    def test_both_empty(self):
+        assert merge_filters(None, None) is None
+        assert merge_filters({}, {}) is None
+
+    def test_only_one_side(self):
+        assert merge_filters({"sources": ["a.pdf"]}, None) == {"sources": ["a.pdf"]}
+        assert merge_filters(None, {"page_min": 2}) == {"page_min": 2}
+
+    def test_independent_criteria_are_combined(self):
+        merged = merge_filters({"sources": ["a.pdf"]}, {"page_min": 3, "page_max": 5})
+
+        assert merged == {"sources": ["a.pdf"], "page_min": 3, "page_max": 5}
+
+    def test_override_replaces_sources(self):
+        merged = merge_filters({"sources": ["a.pdf"], "page_min": 2}, {"sources": ["b.pdf"]})
+
+        assert merged == {"sources": ["b.pdf"], "page_min": 2}
+
+    def test_override_replaces_the_whole_page_range(self):
+        # Um `pag:5-` na pergunta não herda o limite superior da sessão
+        merged = merge_filters({"page_min": 1, "page_max": 10}, {"page_min": 5})
+
+        assert merged == {"page_min": 5}
+
+    def test_base_is_not_modified(self):
+        base = {"sources": ["a.pdf"], "page_min": 1, "page_max": 10}
+
+        merge_filters(base, {"sources": ["b.pdf"], "page_max": 3})
+
+        assert base == {"sources": ["a.pdf"], "page_min": 1, "page_max": 10}
+
+
+class TestResolveSources:
+    def test_exact_path(self):
+        assert resolve_sources(["/docs/dre.pdf"], SOURCES) == ["/docs/dre.pdf"]
+
+    def test_file_name_with_or_without_extension(self):
+        assert resolve_sources(["DRE.pdf"], SOURCES) == ["/docs/dre.pdf", "/outros/dre.pdf"]
+        assert resolve_sources(["ata"], SOURCES) == ["/docs/ata.pdf"]
+
+    def test_part_of_the_name_at_a_word_start(self):
+        assert resolve_sources(["2023"], SOURCES) == ["/docs/balanco_2023.pdf"]
+
+    def test_part_inside_a_word_does_not_match(self):
+        # "anco" aparece dentro de "balanco", não no início de uma palavra
+        assert resolve_sources(["anco"], SOURCES) == []
+
+    def test_short_names_do_not_match_parts(self):
+        assert resolve_sources(["a"], SOURCES) == []
+        assert resolve_sources(["dr"], SOURCES) == []
+
+    def test_ambiguous_part_is_reported(self):
+        with pytest.raises(AmbiguousSourceError) as excinfo:
+            resolve_sources(["balanco"], SOURCES)
+
+        assert excinfo.value.candidates == ["/docs/balanco_2024.pdf", "/docs/balanco_2023.pdf"]
+        assert "balanco_2024.pdf" in str(excinfo.value)
+
+    def test_no_match(self):
+        assert resolve_sources(["inexistente.pdf"], SOURCES) == []
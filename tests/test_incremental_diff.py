@@ -0,0 +1,128 @@
+"""Testes do diff por conteúdo da ingestão incremental (`ingest.IncrementalDiff`)."""
+
+from langchain_core.documents import Document
+
+from ingest import IncrementalDiff, enrich_chunk
+
+FILENAME = "relatorio.pdf"
+SOURCE = "docs/relatorio.pdf"
+
+
+def make_chunks(texts, pages=None):
+    """Chunks enriquecidos como na ingestão, em um único lote."""
+    pages = pages or [1] * len(texts)
+    docs = [
+        enrich_chunk(Document(page_content=text, metadata={"page": page}), i, FILENAME, SOURCE)
+        for i, (text, page) in enumerate(zip(texts, pages))
+    ]
+    return [(docs, [d.metadata["chunk_id"] for d in docs])]
+
+
+def run_diff(texts, existing, pages=None):
+    """Aplica o diff e retorna (diff, IDs enviados para inserção, documentos gerados)."""
+    batches = make_chunks(texts, pages)
+    diff = IncrementalDiff(FILENAME, existing)
+    inserted_ids = [chunk_id for _, ids in diff.filter(batches) for chunk_id in ids]
+    return diff, inserted_ids, batches[0][0]
+
+
+def stored(docs):
+    """Simula os metadados gravados de uma ingestão anterior (id → metadados)."""
+    return {d.metadata["chunk_id"]: dict(d.metadata) for d in docs}
+
+
+def test_first_ingestion_inserts_everything():
+    diff, inserted, docs = run_diff(["a", "b", "c"], existing={})
+
+    assert inserted == [d.metadata["chunk_id"] for d in docs]
+    assert diff.inserted == 3
+    assert diff.unchanged == 0
+    assert diff.vanished_ids == []
+    assert diff.metadata_updates == {}
+
+
+def test_rows_do_not_carry_the_source_total():
+    # Inserir ou remover um chunk não pode exigir regravar as demais linhas da fonte
+    _, _, docs = run_diff(["a", "b"], existing={})
+
+    assert all("total_chunks" not in d.metadata for d in docs)
+
+
+def test_appended_chunk_leaves_existing_rows_untouched():
+    _, _, previous = run_diff(["a", "b"], existing={})
+
+    diff, inserted, docs = run_diff(["a", "b", "c"], existing=stored(previous))
+
+    assert inserted == [docs[2].metadata["chunk_id"]]
+    assert diff.metadata_updates == {}
+
+
+def test_ids_derive_from_content():
+    _, _, docs = run_diff(["a", "b"], existing={})
+
+    for doc in docs:
+        assert doc.metadata["chunk_id"] == f"{FILENAME}-{doc.metadata['content_hash'][:16]}"
+
+
+def test_unchanged_chunks_are_claimed_and_removed_ones_vanish():
+    _, _, previous = run_diff(["a", "b", "c"], existing={})
+    old = stored(previous)
+    id_a, id_b, id_c = (d.metadata["chunk_id"] for d in previous)
+
+    # "b" sai do documento e "d" entra; "a" e "c" continuam iguais
+    diff, inserted, docs = run_diff(["a", "c", "d"], existing=old)
+
+    assert diff.claimed == {id_a, id_c}
+    assert diff.unchanged == 2
+    assert inserted == [docs[2].metadata["chunk_id"]]
+    assert diff.vanished_ids == [id_b]
+
+
+def test_moved_chunk_only_updates_metadata():
+    _, _, previous = run_diff(["a", "b"], existing={}, pages=[1, 2])
+    old = stored(previous)
+    id_b = previous[1].metadata["chunk_id"]
+
+    # Mesmo conteúdo em outra posição/página: sem novo embedding, só metadados
+    diff, inserted, docs = run_diff(["novo", "a", "b"], existing=old, pages=[1, 1, 3])
+
+    assert inserted == [docs[0].metadata["chunk_id"]]
+    assert set(diff.metadata_updates) == {previous[0].metadata["chunk_id"], id_b}
+    assert diff.metadata_updates[id_b]["page"] == 3
+    assert diff.metadata_updates[id_b]["chunk_index"] == 2
+    assert diff.vanished_ids == []
+
+
+def test_legacy_total_chunks_is_not_a_metadata_update():
+    _, _, previous = run_diff(["a", "b"], existing={})
+    old = stored(previous)
+    # Linhas gravadas por versões anteriores traziam o total de chunks da fonte
+    for meta in old.values():
+        meta["total_chunks"] = 99
+
+    diff, inserted, _ = run_diff(["a", "b"], existing=old)
+
+    assert inserted == []
+    assert diff.metadata_updates == {}
+    assert diff.unchanged == 2
+
+
+def test_duplicate_content_gets_distinct_ids():
+    diff, inserted, docs = run_diff(["igual", "outro", "igual"], existing={})
+
+    first, _, second = (d.metadata["chunk_id"] for d in docs)
+    assert second == f"{first}-1"
+    assert len(set(inserted)) == 3
+
+
+def test_duplicate_content_removed_once():
+    _, _, previous = run_diff(["igual", "igual", "b"], existing={})
+    old = stored(previous)
+    first, second, id_b = (d.metadata["chunk_id"] for d in previous)
+
+    # Uma das repetições sai: a primeira ocorrência continua com o mesmo ID
+    diff, inserted, _ = run_diff(["igual", "b"], existing=old)
+
+    assert inserted == []
+    assert diff.claimed == {first, id_b}
+    assert diff.vanished_ids == [second]
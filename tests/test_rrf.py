@@ -0,0 +1,53 @@
+"""Testes da fusão das buscas textual e vetorial (`search.reciprocal_rank_fusion`)."""
+
+from langchain_core.documents import Document
+
+from search import reciprocal_rank_fusion
+
+
+def doc(doc_id, text=None):
+    return Document(id=doc_id, page_content=text or doc_id)
+
+
+class TestReciprocalRankFusion:
+    def test_documents_in_both_rankings_come_first(self):
+        a, b, c = doc("a"), doc("b"), doc("c")
+
+        fused = reciprocal_rank_fusion([[a, b], [b, c]], limit=3, k=60)
+
+        assert [d.id for d in fused] == ["b", "a", "c"]
+
+    def test_respects_limit(self):
+        docs = [doc(str(i)) for i in range(5)]
+
+        assert [d.id for d in reciprocal_rank_fusion([docs], limit=2, k=60)] == ["0", "1"]
+
+    def test_only_rank_matters(self):
+        a, b = doc("a"), doc("b")
+
+        # Empate: a soma de 1/(k+pos) é a mesma para os dois
+        fused = reciprocal_rank_fusion([[a, b], [b, a]], limit=2, k=60)
+
+        assert {d.id for d in fused} == {"a", "b"}
+
+    def test_smoothing_constant_changes_the_order(self):
+        a, b, c = doc("a"), doc("b"), doc("c")
+        # "a" e "c" são o 1º de uma lista cada; "b" é o 3º das duas
+        rankings = [[a, doc("x1"), b], [c, doc("x2"), b]]
+
+        # k pequeno favorece o topo de cada lista; k grande, quem aparece em mais listas
+        assert [d.id for d in reciprocal_rank_fusion(rankings, limit=3, k=0)] == ["a", "c", "b"]
+        assert reciprocal_rank_fusion(rankings, limit=1, k=60)[0].id == "b"
+
+    def test_documents_without_id_are_merged_by_content(self):
+        first = Document(page_content="mesmo texto")
+        again = Document(page_content="mesmo texto")
+        other = doc("x")
+
+        fused = reciprocal_rank_fusion([[other, first], [again]], limit=3, k=60)
+
+        assert len(fused) == 2
+        assert fused[0] is first
+
+    def test_empty_rankings(self):
+        assert reciprocal_rank_fusion([[], []], limit=3) == []
@@ -0,0 +1,46 @@
+"""Testes do limiar de similaridade da busca vetorial (`search.apply_score_threshold`)."""
+
+import pytest
+
+from search import apply_score_threshold
+
+
+class TestApplyScoreThreshold:
+    # (documento, distância de cosseno): similaridades 0.9, 0.8, 0.5, 0.2
+    ROWS = [("a", 0.1), ("b", 0.2), ("c", 0.5), ("d", 0.8)]
+
+    def test_disabled_keeps_everything(self):
+        assert apply_score_threshold(self.ROWS, min_similarity=0, gap_cutoff=0) == self.ROWS
+
+    def test_min_similarity(self):
+        kept = apply_score_threshold(self.ROWS, min_similarity=0.5, gap_cutoff=0)
+
+        assert [row[0] for row in kept] == ["a", "b", "c"]
+
+    def test_gap_cutoff_is_relative_to_the_best(self):
+        kept = apply_score_threshold(self.ROWS, min_similarity=0, gap_cutoff=0.25)
+
+        # Pelo menos 75% da melhor similaridade (0.9 * 0.75 = 0.675)
+        assert [row[0] for row in kept] == ["a", "b"]
+
+    def test_both_criteria_apply(self):
+        kept = apply_score_threshold(self.ROWS, min_similarity=0.85, gap_cutoff=0.5)
+
+        assert [row[0] for row in kept] == ["a"]
+
+    def test_nothing_above_threshold(self):
+        assert apply_score_threshold(self.ROWS, min_similarity=0.95, gap_cutoff=0) == []
+
+    def test_keeps_received_order_and_extra_columns(self):
+        rows = [("b", 0.4, [0.1]), ("a", 0.1, [0.2])]
+
+        assert apply_score_threshold(rows, min_similarity=0.5, gap_cutoff=0) == rows
+
+    def test_empty_rows(self):
+        assert apply_score_threshold([], min_similarity=0.5, gap_cutoff=0.5) == []
+
+    @pytest.mark.parametrize("gap_cutoff", [0.1, 0.9])
+    def test_gap_ignored_when_best_is_not_positive(self, gap_cutoff):
+        rows = [("a", 1.0), ("b", 1.2)]
+
+        assert apply_score_threshold(rows, min_similarity=0, gap_cutoff=gap_cutoff) == rows